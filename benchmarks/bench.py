@@ -0,0 +1,298 @@
+# Copyright (C) 2025 5IGI0 / Ethan L. C. Lorenzetti
+#
+# This file is part of PyWarc.
+# 
+# PyWarc is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License,
+# or (at your option) any later version.
+#
+# PyWarc is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+# without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License along with PyWarc.
+# If not, see <https://www.gnu.org/licenses/>. 
+
+"""
+Benchmarks of the reader and writer hot paths on synthetic archives.
+
+    python benchmarks/bench.py -o results.json
+    python benchmarks/bench.py -o new.json --compare results.json
+
+Each benchmark runs in its own process so its peak RSS can be measured,
+it is given relative to the RSS once pywarc is imported.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import random
+import resource
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from pywarc import WarcReader, WarcWriter
+from pywarc.constants import PY_WARC_VERSION
+
+SMALL_RECORDS = 50000
+HUGE_RECORDS = 4
+HUGE_RECORD_SIZE = 32 << 20
+CHUNK_SIZE = 65536
+READ_AT_COUNT = 20000
+READ_AT_SIZE = 4096
+SKIP_TO_POINTS = 4
+
+def _payload(size:int, rng:random.Random) -> bytes:
+    """ something compressible, like text """
+    return rng.randbytes(size).translate(bytes(97 + i % 26 for i in range(256)))
+
+def _small_records(scale:float):
+    rng = random.Random(42)
+    for i in range(int(SMALL_RECORDS*scale)):
+        yield ("response", b"HTTP/1.1 200 OK\r\nContent-Type: text/html\r\n\r\n" + _payload(rng.randint(200, 2000), rng),
+            {"record_headers": {"WARC-Target-URI": f"http://example.com/{i}", "Content-Type": "application/http;msgtype=response"}})
+
+def _huge_records(scale:float):
+    rng = random.Random(42)
+    chunk = _payload(CHUNK_SIZE, rng)
+    size = int(HUGE_RECORD_SIZE*scale) // CHUNK_SIZE * CHUNK_SIZE
+    for i in range(HUGE_RECORDS):
+        yield ("resource", size, chunk)
+
+def generate(directory:str, scale:float) -> dict:
+    """ writes the datasets, returns name -> path """
+    datasets = {}
+    for compress in (False, True):
+        suffix = ".warc.gz" if compress else ".warc"
+        path = datasets["small"+suffix] = os.path.join(directory, "small"+suffix)
+        writer = WarcWriter(path, truncate=True, compress=compress)
+        writer.write_blocks(_small_records(scale))
+        writer.close()
+
+        path = datasets["huge"+suffix] = os.path.join(directory, "huge"+suffix)
+        writer = WarcWriter(path, truncate=True, compress=compress)
+        for record_type, size, chunk in _huge_records(scale):
+            writer.start_block(record_type, size)
+            for _ in range(size // CHUNK_SIZE):
+                writer.write_block_body(chunk)
+        writer.close()
+    return datasets
+
+def _pipe(path:str):
+    """ returns a (non-seekable) pipe fed with the file by a thread """
+    rfd, wfd = os.pipe()
+    def feed():
+        try:
+            with open(path, "rb") as src, open(wfd, "wb") as dst:
+                shutil.copyfileobj(src, dst, 1 << 20)
+        except BrokenPipeError: # the benchmark didn't read everything
+            pass
+    threading.Thread(target=feed, daemon=True).start()
+    return open(rfd, "rb")
+
+def _open(path:str, pipe:bool):
+    return _pipe(path) if pipe else open(path, "rb")
+
+# each benchmark does its setup and returns a function running it,
+# which returns the number of records and bytes processed.
+def bench_get_next_block(path, pipe, scale):
+    reader = WarcReader(_open(path, pipe), compressed=path.endswith(".gz"))
+    def run():
+        records = 0
+        while reader.get_next_block() is not None:
+            records += 1
+        return records, os.path.getsize(path)
+    return run
+
+def bench_skip_to(path, pipe, scale):
+    # offsets recorded beforehand (SKIP_TO_POINTS per body, in order so it works on pipes too)
+    offsets = []
+    for block in WarcReader(path, compressed=path.endswith(".gz")):
+        offsets.extend(block.block_content_pos + block.content_length * i // SKIP_TO_POINTS for i in range(SKIP_TO_POINTS))
+    reader = WarcReader(_open(path, pipe), compressed=path.endswith(".gz"))
+    def run():
+        for offset in offsets:
+            reader.skip_to(offset)
+            reader.read_at(1, offset)
+        return len(offsets), offsets[-1] if offsets else 0
+    return run
+
+def bench_read(path, pipe, scale):
+    reader = WarcReader(_open(path, pipe), compressed=path.endswith(".gz"))
+    def run():
+        records = nbytes = 0
+        for block in reader:
+            nbytes += len(block.read())
+            records += 1
+        return records, nbytes
+    return run
+
+def bench_get_as_stream(path, pipe, scale):
+    reader = WarcReader(_open(path, pipe), compressed=path.endswith(".gz"))
+    def run():
+        records = nbytes = 0
+        buf = bytearray(CHUNK_SIZE)
+        for block in reader:
+            stream = block.get_as_stream()
+            while True:
+                n = stream.readinto(buf)
+                if not n:
+                    break
+                nbytes += n
+            records += 1
+        return records, nbytes
+    return run
+
+def bench_read_at(path, pipe, scale):
+    reader = WarcReader(_open(path, False))
+    rng = random.Random(42)
+    size = os.path.getsize(path)
+    offsets = [rng.randrange(0, size - READ_AT_SIZE) for _ in range(int(READ_AT_COUNT*scale))]
+    def run():
+        for offset in offsets:
+            reader.read_at(READ_AT_SIZE, offset)
+        return len(offsets), len(offsets)*READ_AT_SIZE
+    return run
+
+def bench_write_block(path, pipe, scale):
+    writer = WarcWriter(tempfile.TemporaryFile(), compress=path.endswith(".gz"))
+    records = list(_small_records(scale))
+    def run():
+        for record_type, content, kwargs in records:
+            writer.write_block(record_type, content, **kwargs)
+        writer.flush()
+        return len(records), sum(len(r[1]) for r in records)
+    return run
+
+def bench_write_blocks(path, pipe, scale):
+    writer = WarcWriter(tempfile.TemporaryFile(), compress=path.endswith(".gz"))
+    records = list(_small_records(scale))
+    def run():
+        writer.write_blocks(records)
+        writer.flush()
+        return len(records), sum(len(r[1]) for r in records)
+    return run
+
+def bench_write_block_body(path, pipe, scale):
+    writer = WarcWriter(tempfile.TemporaryFile(), compress=path.endswith(".gz"))
+    records = list(_huge_records(scale))
+    def run():
+        nbytes = 0
+        for record_type, size, chunk in records:
+            writer.start_block(record_type, size)
+            for _ in range(size // CHUNK_SIZE):
+                writer.write_block_body(chunk)
+            nbytes += size
+        writer.flush()
+        return len(records), nbytes
+    return run
+
+# name -> (function, datasets, with pipe input too)
+BENCHMARKS = {
+    "get_next_block": (bench_get_next_block, ("small",), True),
+    "read": (bench_read, ("small", "huge"), True),
+    "get_as_stream": (bench_get_as_stream, ("huge",), True),
+    "skip_to": (bench_skip_to, ("huge",), True),
+    "read_at": (bench_read_at, ("small",), False),
+    "write_block": (bench_write_block, ("small",), False),
+    "write_blocks": (bench_write_blocks, ("small",), False),
+    "write_block_body": (bench_write_block_body, ("huge",), False),
+}
+
+def _max_rss() -> int:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == "darwin" else rss * 1024
+
+def _run(name, path, pipe, scale, queue):
+    # pywarc (and the interpreter) are already loaded, only what the benchmark uses is counted
+    base_rss = _max_rss()
+    func = BENCHMARKS[name][0](path, pipe, scale)
+    start = time.perf_counter()
+    records, nbytes = func()
+    elapsed = time.perf_counter() - start
+    queue.put({"seconds": elapsed, "records": records, "bytes": nbytes, "peak_rss": _max_rss() - base_rss, "base_rss": base_rss})
+
+def run(name:str, path:str, pipe:bool, scale:float, repeat:int) -> dict:
+    """ runs a benchmark repeat times (each one in a fresh process), keeps the fastest run """
+    ctx = multiprocessing.get_context("spawn")
+    best = None
+    for _ in range(repeat):
+        queue = ctx.Queue()
+        process = ctx.Process(target=_run, args=(name, path, pipe, scale, queue))
+        process.start()
+        result = queue.get()
+        process.join()
+        if best is None or result["seconds"] < best["seconds"]:
+            best = result
+    best["records_per_s"] = best["records"] / best["seconds"]
+    best["mb_per_s"] = best["bytes"] / best["seconds"] / 1e6
+    return best
+
+def compare(results:dict, previous:dict):
+    print(f"\n{'benchmark':<40} {'before':>10} {'after':>10} {'change':>8}  (MB/s)")
+    for key, result in results.items():
+        if key not in previous:
+            continue
+        before, after = previous[key]["mb_per_s"], result["mb_per_s"]
+        print(f"{key:<40} {before:>10.1f} {after:>10.1f} {(after/before-1)*100:>+7.1f}%")
+
+def main():
+    parser = argparse.ArgumentParser(description="benchmarks PyWarc's reader and writer")
+    parser.add_argument("-o", "--output", help="where to save the results (JSON)")
+    parser.add_argument("--compare", help="results (JSON) of a previous run to compare with")
+    parser.add_argument("--scale", type=float, default=1.0, help="datasets' size factor (default: 1)")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per benchmark, the fastest is kept (default: 3)")
+    parser.add_argument("--data-dir", help="where to generate the datasets (default: a temporary directory)")
+    parser.add_argument("benchmarks", nargs="*", help=f"benchmarks to run (default: all), among: {', '.join(BENCHMARKS)}")
+    args = parser.parse_args()
+
+    for name in args.benchmarks:
+        if name not in BENCHMARKS:
+            parser.error(f"unknown benchmark: {name}")
+
+    directory = args.data_dir or tempfile.mkdtemp(prefix="pywarc-bench-")
+    os.makedirs(directory, exist_ok=True)
+    try:
+        print(f"generating datasets in {directory}...", file=sys.stderr)
+        datasets = generate(directory, args.scale)
+
+        results = {}
+        for name in args.benchmarks or BENCHMARKS:
+            _, kinds, with_pipe = BENCHMARKS[name]
+            for kind in kinds:
+                for suffix in (".warc", ".warc.gz"):
+                    if name == "read_at" and suffix == ".warc.gz":
+                        continue # read_at() works on the uncompressed stream
+                    for pipe in ((False, True) if with_pipe else (False,)):
+                        key = f"{name}/{kind}{suffix}/{'pipe' if pipe else 'file'}"
+                        results[key] = run(name, datasets[kind+suffix], pipe, args.scale, args.repeat)
+                        r = results[key]
+                        print(f"{key:<40} {r['records_per_s']:>12.0f} rec/s {r['mb_per_s']:>9.1f} MB/s {r['peak_rss']/2**20:>8.1f} MiB RSS")
+    finally:
+        if args.data_dir is None:
+            shutil.rmtree(directory)
+
+    if args.output is not None:
+        with open(args.output, "w") as fp:
+            json.dump({
+                "pywarc_version": PY_WARC_VERSION,
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "date": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+                "scale": args.scale,
+                "results": results,
+            }, fp, indent=2)
+
+    if args.compare is not None:
+        with open(args.compare) as fp:
+            compare(results, json.load(fp)["results"])
+
+if __name__ == "__main__":
+    main()
@@ -14,5 +14,16 @@
 # You should have received a copy of the GNU Lesser General Public License along with PyWarc.
 # If not, see <https://www.gnu.org/licenses/>. 
 
-from .reader import WarcReader, InvalidWarcError, MissingWarcHeaderError, WarcHeaderBadValueError, NotSeekableError
-from .writer import WarcWriter, PreviousBlockNotTerminatedError, CurrentBlockOverflowError
\ No newline at end of file
+from .reader import WarcReader, WarcHeaders, InvalidWarcError, MissingWarcHeaderError, WarcHeaderBadValueError, NotSeekableError, DigestMismatchError
+from .writer import WarcWriter, PreviousBlockNotTerminatedError, CurrentBlockOverflowError
+from .cdx import index_warc, sort_cdxj, CdxjIndex, CdxjEntry, CdxjWriter, surt
+from .parallel import ParallelWarcScanner
+from .payload import HttpPayload, InvalidHttpPayloadError, UnsupportedEncodingError
+from .aio import AsyncWarcReader, AsyncWarcWriter, AsyncWarcBlock
+from .digest import RecordDigester, format_digest, parse_digest
+from .dedup import DedupWarcWriter, DedupStore
+from .columnar import iter_column_batches, export_columns, read_columns
+from .rolling import RollingWarcWriter
+from .shared import SharedWarcWriter, StagedRecord
+from .recovery import recover_warc
+from .tools import merge_warcs, split_warc, filter_warc
\ No newline at end of file
@@ -0,0 +1,276 @@
+# Copyright (C) 2025 5IGI0 / Ethan L. C. Lorenzetti
+#
+# This file is part of PyWarc.
+# 
+# PyWarc is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License,
+# or (at your option) any later version.
+#
+# PyWarc is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+# without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License along with PyWarc.
+# If not, see <https://www.gnu.org/licenses/>. 
+
+
+import asyncio
+import zlib
+from datetime import datetime
+from uuid import uuid4
+
+from .reader import WarcBlock, InvalidWarcError, NotSeekableError, _parse_headers
+from .writer import _serialize_block_header, _serialize_warcinfo, PreviousBlockNotTerminatedError, CurrentBlockOverflowError
+
+ASYNC_READ_SIZE = 65536
+# chunks smaller than that are compressed on the event loop thread
+MIN_EXECUTOR_COMPRESS = 16384
+
+class AsyncWarcBlock(object):
+    """ same as WarcBlock, but read() must be awaited and blocks can only be read sequentially """
+    def __init__(self, warc_reader, headers, block_content_pos):
+        self.warc_reader = warc_reader
+        self.block_content_pos = block_content_pos
+        self.read_offset = 0
+        self.headers = headers
+        self.content_length = int(headers.get_raw("Content-Length"))
+
+    async def read(self, nread=None) -> bytes:
+        unread_data = self.content_length - self.read_offset
+
+        if nread is None or nread > unread_data:
+            nread = unread_data
+
+        ret = await self.warc_reader.read_at(nread, self.block_content_pos + self.read_offset)
+        self.read_offset += len(ret)
+        return ret
+
+    type=WarcBlock.type
+    date=WarcBlock.date
+    content_type=WarcBlock.content_type
+    record_id=WarcBlock.record_id
+    warcinfo_id=WarcBlock.warcinfo_id
+
+class AsyncWarcReader(object):
+    """ reads a WARC from an asyncio.StreamReader (or anything with an awaitable read(n)) """
+    def __init__(self, stream, compressed=False):
+        self.stream = stream
+        self.decompressor = zlib.decompressobj(31) if compressed else None
+        self.member_started = False
+        # unconsumed data, starts at buf_pos
+        self.buf = b""
+        self.buf_pos = 0
+        self.next_block = 0
+
+    def _decompress(self, data:bytes) -> bytes:
+        ret = []
+        while data:
+            if not self.member_started:
+                # members may be followed by zero padding
+                data = data.lstrip(b"\0")
+                if not data:
+                    break
+                self.member_started = True
+            ret.append(self.decompressor.decompress(data))
+            data = b""
+            if self.decompressor.eof:
+                data = self.decompressor.unused_data
+                self.decompressor = zlib.decompressobj(31)
+                self.member_started = False
+        return b"".join(ret)
+
+    async def _fill(self) -> int:
+        """ appends data to the buffer, returns 0 on EOF """
+        while True:
+            data = await self.stream.read(ASYNC_READ_SIZE)
+            if not data:
+                if self.member_started:
+                    raise EOFError("Compressed file ended before the end-of-stream marker was reached")
+                return 0
+            if self.decompressor is not None:
+                data = self._decompress(data)
+            if data:
+                self.buf += data
+                return len(data)
+
+    async def skip_to(self, at:int):
+        if at < self.buf_pos:
+            raise NotSeekableError("stream not seekable (you can't read previous blocks once readed/skipped)")
+        while at > self.buf_pos + len(self.buf):
+            self.buf_pos += len(self.buf)
+            self.buf = b""
+            if await self._fill() == 0:
+                return
+        self.buf = self.buf[at - self.buf_pos:]
+        self.buf_pos = at
+
+    async def read_at(self, nread:int, at:int) -> bytes:
+        await self.skip_to(at)
+        while len(self.buf) < nread:
+            if await self._fill() == 0:
+                break
+        ret = self.buf[:nread]
+        self.buf = self.buf[len(ret):]
+        self.buf_pos += len(ret)
+        return ret
+
+    async def get_next_block(self) -> [AsyncWarcBlock|None]:
+        await self.skip_to(self.next_block)
+
+        searched = 0
+        while True:
+            if len(self.buf) >= 10 and not self.buf.startswith(b"WARC/1.1\r\n"):
+                raise InvalidWarcError(f"invalid WARC header: {self.buf[:16]}")
+
+            end = self.buf.find(b"\r\n\r\n", searched)
+            if end != -1:
+                break
+
+            searched = max(0, len(self.buf) - 3)
+            if await self._fill() == 0:
+                if self.buf == b"": # no block anymore
+                    return None
+                raise InvalidWarcError(f"truncated WARC header: {self.buf[:16]}")
+
+        headers = _parse_headers(self.buf[:end + 4])
+        content_pos = self.buf_pos + len(headers.raw)
+        self.next_block = content_pos + int(headers.get_raw("Content-Length")) + 4
+        await self.skip_to(content_pos)
+        return AsyncWarcBlock(self, headers, content_pos)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> AsyncWarcBlock:
+        ret = await self.get_next_block()
+        if ret is None:
+            raise StopAsyncIteration
+        return ret
+
+class AsyncWarcWriter(object):
+    """
+    Writes a WARC to an asyncio.StreamWriter (or anything with write() and an awaitable drain()).
+    Same API as WarcWriter but methods must be awaited, compression of big chunks
+    is done in the loop's default executor so it doesn't block the event loop.
+    The warcinfo block is written with the first block (or on close()).
+    Tasks can share a writer, their blocks are written one after the other.
+    """
+    def __init__(
+        self, stream,
+        warc_meta={}, software_name="unknown", software_version="unkown",
+        compress:bool=False, uncompress_pos:int=0, compress_pos:int=0,
+        compresslevel:int=9
+    ):
+        self.stream = stream
+        self.compress = compress
+        self.compresslevel = compresslevel
+        self.compressor = None
+        self.uncompress_pos = uncompress_pos
+        self.compress_pos = compress_pos
+        self.warc_info_id = uuid4().urn
+        self.warcinfo = _serialize_warcinfo(software_name, software_version, warc_meta)
+        # how many bytes we are waiting to complete the current block
+        self.body_remaining_length = 0
+        # held while a block is written, so concurrent tasks don't interleave their records
+        self.lock = asyncio.Lock()
+        self.block_owner = None # task which started the block being written with start_block()
+
+    async def _write(self, data:bytes):
+        self.uncompress_pos += len(data)
+        if self.compressor is not None:
+            if len(data) >= MIN_EXECUTOR_COMPRESS:
+                data = await asyncio.get_running_loop().run_in_executor(None, self.compressor.compress, data)
+            else:
+                data = self.compressor.compress(data)
+        self.compress_pos += len(data)
+        self.stream.write(data)
+        await self.stream.drain()
+
+    async def _end_block(self):
+        await self._write(b"\r\n\r\n")
+        if self.compressor is not None:
+            data = self.compressor.flush()
+            self.compressor = None
+            self.compress_pos += len(data)
+            self.stream.write(data)
+            await self.stream.drain()
+
+    async def _write_warcinfo(self):
+        if self.warcinfo is not None:
+            warcinfo = self.warcinfo
+            self.warcinfo = None
+            await self._start_block("warcinfo", len(warcinfo), self.warc_info_id, None, {"Content-Type": "application/warc-fields"})
+            await self._write_block_body(warcinfo)
+
+    async def write_block(self, record_type:str, content:bytes, record_id:[str|None]=None, record_date:[datetime|None]=None, record_headers:dict={}) -> (int, int):
+        async with self.lock:
+            ret = await self._start_block(record_type, len(content), record_id, record_date, record_headers)
+            await self._write_block_body(content)
+            return ret
+
+    async def start_block(self, record_type:str, content_length:int, record_id:[str|None]=None, record_date:[datetime|None]=None, record_headers:dict={}) -> (int, int):
+        """ the writer is locked until the block's body is complete, other tasks wait for it to start theirs """
+        if self.block_owner is asyncio.current_task(): # would wait for itself
+            raise PreviousBlockNotTerminatedError(f"previous blocks not terminated: {self.body_remaining_length} bytes missing")
+        await self.lock.acquire()
+        try:
+            ret = await self._start_block(record_type, content_length, record_id, record_date, record_headers)
+        except BaseException:
+            self.lock.release()
+            raise
+        if self.body_remaining_length == 0:
+            self.lock.release()
+        else:
+            self.block_owner = asyncio.current_task()
+        return ret
+
+    async def write_block_body(self, content:bytes):
+        await self._write_block_body(content)
+        if self.block_owner is not None and self.body_remaining_length == 0:
+            self.block_owner = None
+            self.lock.release()
+
+    async def _start_block(self, record_type:str, content_length:int, record_id:[str|None], record_date:[datetime|None], record_headers:dict) -> (int, int):
+        if self.body_remaining_length != 0:
+            raise PreviousBlockNotTerminatedError(f"previous blocks not terminated: {self.body_remaining_length} bytes missing")
+
+        await self._write_warcinfo()
+
+        ret = (self.uncompress_pos, self.compress_pos)
+        if self.compress:
+            # one gzip member per record
+            self.compressor = zlib.compressobj(self.compresslevel, zlib.DEFLATED, 31)
+
+        if record_id is None:
+            record_id = uuid4().urn
+        if record_date is None:
+            record_date = datetime.utcnow()
+
+        await self._write(_serialize_block_header(record_type, content_length, record_id, record_date, self.warc_info_id, record_headers))
+
+        self.body_remaining_length = content_length
+        if content_length == 0:
+            await self._end_block()
+
+        return ret
+
+    async def _write_block_body(self, content:bytes):
+        if len(content) == 0:
+            return
+        if self.body_remaining_length < len(content):
+            raise CurrentBlockOverflowError(f"current block overflows by {len(content)-self.body_remaining_length} bytes")
+        await self._write(content)
+        self.body_remaining_length -= len(content)
+        if self.body_remaining_length == 0:
+            await self._end_block()
+
+    async def close(self):
+        if self.block_owner is asyncio.current_task():
+            await self._write_warcinfo()
+        else:
+            async with self.lock: # waits for the blocks being written
+                await self._write_warcinfo()
+        self.stream.close()
+        if hasattr(self.stream, "wait_closed"):
+            await self.stream.wait_closed()
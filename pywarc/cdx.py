@@ -0,0 +1,224 @@
+# Copyright (C) 2025 5IGI0 / Ethan L. C. Lorenzetti
+#
+# This file is part of PyWarc.
+# 
+# PyWarc is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License,
+# or (at your option) any later version.
+#
+# PyWarc is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+# without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License along with PyWarc.
+# If not, see <https://www.gnu.org/licenses/>. 
+
+
+import json
+import mmap
+from datetime import datetime
+from urllib.parse import urlsplit
+
+from .reader import WarcReader
+
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+
+def surt(url:str) -> str:
+    """
+    Returns the SURT (Sort-friendly URI Reordering Transform) form of url used as CDX key
+    e.g. "http://www.Example.com/Path?b=2&a=1" -> "com,example)/path?a=1&b=2"
+    """
+    url = url.strip().lower()
+    if "://" not in url:
+        # dns:, urn:, etc. are kept as is
+        return url
+
+    parts = urlsplit(url)
+    host = parts.hostname or ""
+    if host.startswith("www.") or (host.startswith("www") and host.split(".")[0][3:].isdigit()):
+        host = host.split(".", 1)[-1]
+
+    key = ",".join(reversed(host.split(".")))
+    try:
+        port = parts.port
+    except ValueError:
+        port = None
+    if port is not None and port != _DEFAULT_PORTS.get(parts.scheme):
+        key += f":{port}"
+
+    key += ")" + (parts.path or "/")
+    if parts.query:
+        key += "?" + "&".join(sorted(parts.query.split("&")))
+    return key
+
+def _cdxj_line(uri:str, date:datetime, record_type:str, digest:[str|None], offset:int, length:int, filename:[str|None]) -> str:
+    fields = {"url": uri, "type": record_type}
+    if digest is not None:
+        fields["digest"] = digest
+    fields["offset"] = offset
+    fields["length"] = length
+    if filename is not None:
+        fields["filename"] = filename
+    return f"{surt(uri)} {date.strftime('%Y%m%d%H%M%S')} {json.dumps(fields)}\n"
+
+def sort_cdxj(input, output):
+    """ sorts a CDXJ file (e.g. written by CdxjWriter) so it can be used by CdxjIndex """
+    if isinstance(input, str):
+        with open(input, "rb") as fp:
+            lines = fp.readlines()
+    else:
+        lines = input.readlines()
+
+    lines.sort()
+
+    if isinstance(output, str):
+        with open(output, "wb") as fp:
+            fp.writelines(lines)
+    else:
+        output.writelines(lines)
+
+class CdxjWriter(object):
+    """
+    Appends a CDXJ line per record while it is written (see WarcWriter's index parameter).
+    Lines are in writing order, use sort_cdxj() before looking them up with CdxjIndex.
+    """
+    def __init__(self, file, filename:[str|None]=None, truncate=False):
+        if isinstance(file, str):
+            self.is_fp_self_managed = True
+            self.fp = open(file, "ab" if truncate == False else "wb")
+        else:
+            self.is_fp_self_managed = False
+            self.fp = file
+        self.filename = filename
+
+    def write_entry(self, uri:str, date:datetime, record_type:str, digest:[str|None], offset:int, length:int):
+        self.fp.write(_cdxj_line(uri, date, record_type, digest, offset, length, self.filename).encode())
+
+    def flush(self):
+        self.fp.flush()
+
+    def close(self):
+        if self.is_fp_self_managed:
+            self.fp.close()
+
+class CdxjEntry(object):
+    def __init__(self, line:[str|bytes]):
+        if isinstance(line, bytes):
+            line = line.decode()
+        self.urlkey, self.timestamp, fields = line.rstrip("\n").split(" ", 2)
+        self.fields = json.loads(fields)
+
+    url=property(lambda self: self.fields.get("url"))
+    type=property(lambda self: self.fields.get("type"))
+    digest=property(lambda self: self.fields.get("digest"))
+    offset=property(lambda self: int(self.fields["offset"]))
+    length=property(lambda self: int(self.fields["length"]))
+    filename=property(lambda self: self.fields.get("filename"))
+
+def index_warc(file, output, filename:[str|None]=None, compressed=None) -> int:
+    """
+    Indexes every record having a WARC-Target-URI in one pass and writes a sorted CDXJ index to output.
+    offset/length are the ones in the underlying file, they can be passed to WarcReader.read_record_at().
+    Returns the number of indexed records.
+    """
+    if filename is None and isinstance(file, str):
+        filename = file.rsplit("/", 1)[-1]
+
+    reader = WarcReader(file, compressed=compressed)
+    lines = []
+    previous = None # (offset, entry without its length)
+
+    def _flush_previous(end):
+        if previous is not None and previous[1] is not None:
+            lines.append(_cdxj_line(*previous[1], previous[0], end - previous[0], filename))
+
+    for block in reader:
+        offset = reader.get_compressed_offset(block.block_pos)
+        if offset is None:
+            raise ValueError("records are not stored in separate gzip members, they can't be indexed")
+        _flush_previous(offset)
+
+        uri = block.headers.get("WARC-Target-URI")
+        if uri is None:
+            previous = (offset, None)
+            continue
+
+        digest = block.headers.get("WARC-Payload-Digest", block.headers.get("WARC-Block-Digest", [None]))[0]
+        previous = (offset, (uri[0], block.date, block.type, digest))
+
+    end = reader.get_compressed_offset(reader.next_block)
+    if end is None:
+        raise ValueError("couldn't find the end of the last record")
+    _flush_previous(end)
+
+    lines.sort()
+
+    if isinstance(output, str):
+        with open(output, "wb") as fp:
+            fp.write("".join(lines).encode())
+    else:
+        output.write("".join(lines).encode())
+    return len(lines)
+
+class CdxjIndex(object):
+    """ binary search over a sorted CDXJ file, the file is memory-mapped """
+    def __init__(self, file:[str|bytes]):
+        if isinstance(file, bytes):
+            self.fp = None
+            self.map = file
+        else:
+            self.fp = open(file, "rb")
+            try:
+                self.map = mmap.mmap(self.fp.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError: # empty file
+                self.map = b""
+
+    def _bisect(self, key:bytes) -> int:
+        """ returns the offset of the first line >= key """
+        lo, hi = 0, len(self.map)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            start = self.map.rfind(b"\n", 0, mid) + 1
+            end = self.map.find(b"\n", start)
+            if end == -1:
+                end = len(self.map)
+            if self.map[start:end] < key:
+                lo = end + 1
+            else:
+                hi = start
+        return lo
+
+    def _iter_from(self, pos:int, prefix:bytes):
+        while pos < len(self.map):
+            end = self.map.find(b"\n", pos)
+            if end == -1:
+                end = len(self.map)
+            line = self.map[pos:end]
+            if not line.startswith(prefix):
+                return
+            yield CdxjEntry(line)
+            pos = end + 1
+
+    def lookup(self, url:str, match_prefix:bool=False):
+        """
+        yields the entries of url sorted by date.
+        if match_prefix is True, url is matched as a prefix (e.g. every page under a path).
+        """
+        key = surt(url).encode()
+        if not match_prefix:
+            key += b" "
+        return self._iter_from(self._bisect(key), key)
+
+    def close(self):
+        if self.fp is not None:
+            if isinstance(self.map, mmap.mmap):
+                self.map.close()
+            self.fp.close()
+            self.fp = None
+
+    def __iter__(self):
+        return self._iter_from(0, b"")
+
+    def __del__(self):
+        self.close()
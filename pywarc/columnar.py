@@ -0,0 +1,221 @@
+# Copyright (C) 2025 5IGI0 / Ethan L. C. Lorenzetti
+#
+# This file is part of PyWarc.
+# 
+# PyWarc is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License,
+# or (at your option) any later version.
+#
+# PyWarc is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+# without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License along with PyWarc.
+# If not, see <https://www.gnu.org/licenses/>. 
+
+import json
+import os
+import sys
+from array import array
+from calendar import timegm
+
+from .reader import WarcReader, InvalidWarcError
+from .payload import InvalidHttpPayloadError
+from .digest import has_http_payload
+
+DEFAULT_BATCH_SIZE = 65536
+# HTTP headers smaller than that are parsed without HttpPayload
+HTTP_HEAD_SIZE = 8192
+# "type" column's codes
+WARC_TYPES = ("warcinfo", "response", "resource", "request", "metadata", "revisit", "conversion", "continuation")
+OTHER_TYPE = 255
+# missing values of integer columns
+NULL_DATE = -(1 << 63)
+NULL_STATUS = -1
+
+# name -> array typecode ("str" for utf8 strings)
+COLUMNS = {
+    "type": "B",
+    "uri": "str",
+    "date": "q", # seconds since epoch (UTC)
+    "offset": "q",
+    "length": "q",
+    "content_length": "q",
+    "status": "h",
+    "mime": "str",
+}
+_TYPE_CODES = {t: i for i, t in enumerate(WARC_TYPES)}
+_NUMPY_TYPES = {"B": "uint8", "h": "int16", "q": "int64"}
+
+def _new_batch() -> dict:
+    return {name: [] if typecode == "str" else array(typecode) for name, typecode in COLUMNS.items()}
+
+def _record_type(block) -> [str|None]:
+    try:
+        return block.type
+    except InvalidWarcError: # missing
+        return None
+
+def _record_date(block) -> int:
+    try:
+        date = block.date
+    except InvalidWarcError: # missing or invalid
+        return NULL_DATE
+    if date.tzinfo is None:
+        return timegm(date.timetuple())
+    return int(date.timestamp())
+
+def _http_metadata(block, record_type:[str|None]) -> (int, [str|None]):
+    """ returns the status and the mime type of the HTTP message, or the block's mime type """
+    mime = block.content_type
+    status = NULL_STATUS
+    if record_type is not None and has_http_payload(record_type, mime):
+        # most of the time the HTTP header is small, parse it from a single read
+        head = bytes(block.warc_reader.read_at(min(block.content_length, HTTP_HEAD_SIZE), block.block_content_pos))
+        end = head.find(b"\r\n\r\n")
+        if end != -1:
+            lines = head[:end].split(b"\r\n")
+            parts = lines[0].split(b" ", 2)
+            if parts[0].startswith(b"HTTP/") and len(parts) > 1 and parts[1].isdigit():
+                status = int(parts[1])
+            mime = None
+            for line in lines[1:]:
+                name, _, value = line.partition(b":")
+                if name.strip().lower() == b"content-type":
+                    mime = value.strip().decode("latin-1")
+                    break
+        else:
+            try:
+                payload = block.get_http_payload()
+                mime = payload.content_type
+                status = payload.status or NULL_STATUS
+            except InvalidHttpPayloadError:
+                mime = None
+    if mime is not None:
+        mime = mime.split(";", 1)[0].strip().lower()
+    return status, mime
+
+def iter_column_batches(file, compressed=None, batch_size:int=DEFAULT_BATCH_SIZE):
+    """
+    Walks the archive and yields the records' metadata by batches of (at most) batch_size rows,
+    as dicts of columns (see COLUMNS): array.array for integers, lists for strings (None if missing).
+    offset/length are the ones in the underlying file (see WarcReader.read_record_at()).
+    """
+    reader = WarcReader(file, compressed=compressed)
+    columns = _new_batch()
+
+    for block in reader:
+        offset = reader.get_compressed_offset(block.block_pos)
+        if offset is None:
+            raise ValueError("records are not stored in separate gzip members, they can't be exported")
+        # a record's length is known once the next one is found
+        if columns["offset"]:
+            columns["length"][-1] = offset - columns["offset"][-1]
+        if len(columns["offset"]) == batch_size:
+            yield columns
+            columns = _new_batch()
+
+        record_type = _record_type(block)
+        status, mime = _http_metadata(block, record_type)
+        uri = block.headers.get_raw("WARC-Target-URI")
+        columns["type"].append(_TYPE_CODES.get(record_type, OTHER_TYPE))
+        columns["uri"].append(uri.decode() if uri is not None else None)
+        columns["date"].append(_record_date(block))
+        columns["offset"].append(offset)
+        columns["length"].append(0)
+        columns["content_length"].append(block.content_length)
+        columns["status"].append(status)
+        columns["mime"].append(mime)
+
+    if columns["offset"]:
+        end = reader.get_compressed_offset(reader.next_block)
+        if end is None:
+            raise ValueError("couldn't find the end of the last record")
+        columns["length"][-1] = end - columns["offset"][-1]
+        yield columns
+
+def export_columns(file, directory:str, compressed=None, batch_size:int=DEFAULT_BATCH_SIZE) -> int:
+    """
+    Writes the records' metadata in directory, one file per column (Arrow-like layout):
+    <name>.bin holds the integers (native byte order), strings are stored as utf8 in <name>.data
+    and their int64 boundaries in <name>.offsets (n+1 values, a missing string is empty).
+    schema.json describes them. Records are processed by batches so memory usage stays constant.
+    Returns the number of rows.
+    """
+    os.makedirs(directory, exist_ok=True)
+    files = {}
+    string_pos = {}
+    for name, typecode in COLUMNS.items():
+        if typecode == "str":
+            files[name] = (open(os.path.join(directory, name+".offsets"), "wb"), open(os.path.join(directory, name+".data"), "wb"))
+            files[name][0].write(array("q", [0]).tobytes())
+            string_pos[name] = 0
+        else:
+            files[name] = open(os.path.join(directory, name+".bin"), "wb")
+
+    rows = 0
+    try:
+        for columns in iter_column_batches(file, compressed, batch_size):
+            rows += len(columns["offset"])
+            for name, values in columns.items():
+                if COLUMNS[name] != "str":
+                    values.tofile(files[name])
+                    continue
+
+                data = [v.encode() if v is not None else b"" for v in values]
+                offsets = array("q")
+                pos = string_pos[name]
+                for v in data:
+                    pos += len(v)
+                    offsets.append(pos)
+                string_pos[name] = pos
+                offsets.tofile(files[name][0])
+                files[name][1].write(b"".join(data))
+    finally:
+        for f in files.values():
+            for fp in (f if isinstance(f, tuple) else (f,)):
+                fp.close()
+
+    with open(os.path.join(directory, "schema.json"), "w") as fp:
+        json.dump({
+            "rows": rows,
+            "byteorder": sys.byteorder,
+            "columns": {name: "utf8" if typecode == "str" else _NUMPY_TYPES[typecode] for name, typecode in COLUMNS.items()},
+            "types": WARC_TYPES,
+            "null_date": NULL_DATE,
+            "null_status": NULL_STATUS,
+        }, fp)
+    return rows
+
+def read_columns(directory:str, columns:[list|None]=None) -> dict:
+    """
+    Loads the columns written by export_columns() as numpy arrays (needs numpy),
+    integers are memory-mapped and strings are loaded in object arrays.
+    """
+    try:
+        import numpy # imported here, it is slow to import and only needed to read the columns
+    except ImportError:
+        raise ImportError("read_columns() needs the 'numpy' module")
+
+    with open(os.path.join(directory, "schema.json")) as fp:
+        schema = json.load(fp)
+    if schema["byteorder"] != sys.byteorder:
+        raise ValueError("columns were written on a machine with a different byte order")
+
+    ret = {}
+    for name in columns if columns is not None else schema["columns"]:
+        dtype = schema["columns"][name]
+        if dtype != "utf8":
+            path = os.path.join(directory, name+".bin")
+            ret[name] = numpy.memmap(path, dtype=dtype, mode="r") if schema["rows"] else numpy.empty(0, dtype)
+            continue
+
+        offsets = numpy.fromfile(os.path.join(directory, name+".offsets"), dtype="int64")
+        with open(os.path.join(directory, name+".data"), "rb") as fp:
+            data = fp.read()
+        values = numpy.empty(schema["rows"], dtype=object)
+        for i in range(schema["rows"]):
+            values[i] = data[offsets[i]:offsets[i+1]].decode()
+        ret[name] = values
+    return ret
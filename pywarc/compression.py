@@ -15,6 +15,33 @@
 # If not, see <https://www.gnu.org/licenses/>. 
 
 import gzip
+import zlib
+import os
+from array import array
+from bisect import bisect_right
+from concurrent.futures import Future, ThreadPoolExecutor
+from queue import Queue
+from threading import Thread
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+GZIP_READ_CHUNK = 65536
+# how much is decompressed at once when skipping data (it is discarded right away)
+GZIP_SKIP_CHUNK = 1 << 20
+DEFAULT_ZSTD_LEVEL = 3
+# skippable frame holding the dictionary at the start of .warc.zst files
+ZSTD_DICT_MAGIC = 0x184D2A5D
+ZSTD_FRAME_MAGIC = b"\x28\xb5\x2f\xfd"
+GZIP_MEMBER_MAGIC = b"\x1f\x8b\x08"
+# how much is read at once when looking for the next member/record after a corrupted one
+RESYNC_READ_SIZE = 1 << 20
+# members remembered when the file is not seekable (only recent ones can be looked up)
+MAX_UNSEEKABLE_MEMBERS = 1024
+# raised by decompressors on corrupted data
+DECOMPRESSION_ERRORS = (OSError, zlib.error) + ((zstandard.ZstdError,) if zstandard is not None else ())
 
 def MakeFakeTellable(obj):
     if hasattr(obj, 'seekable') and obj.seekable():
@@ -47,6 +74,76 @@ def FakeSeekableWriter(fp):
     
     return fp
 
+def WriteParts(fp, parts:list) -> list:
+    """
+    Writes several parts (each one in its own member if fp compresses) with a single write.
+    Returns the (compressed) offset of each part, followed by the end offset.
+    """
+    if hasattr(fp, 'compress_part'):
+        sub_fp = fp.sub_fp
+        data = [fp.compress_part(part) for part in parts]
+    else:
+        sub_fp = fp
+        data = parts
+
+    pos = sub_fp.tell()
+    offsets = [pos]
+    for chunk in data:
+        pos += len(chunk)
+        offsets.append(pos)
+    sub_fp.write(b"".join(data))
+
+    if sub_fp is not fp:
+        # keeps the (fake) uncompressed position right
+        fp.abc_pos += sum(len(part) for part in parts)
+    return offsets
+
+def ReadAt(fp, nread:int, at:int) -> bytes:
+    """ reads nread bytes at the given offset, using pread() when the file has a descriptor """
+    try:
+        fd = fp.fileno()
+    except (AttributeError, OSError):
+        fd = None
+
+    if fd is not None and hasattr(os, 'pread'):
+        return os.pread(fd, nread, at)
+
+    pos = fp.tell()
+    fp.seek(at)
+    ret = fp.read(nread)
+    fp.seek(pos)
+    return ret
+
+def _require_zstandard():
+    if zstandard is None:
+        raise ImportError("zstd compression needs the 'zstandard' module")
+
+def ReadMember(fp, at:int, length:[int|None]=None, decompressor=None) -> bytes:
+    """
+    Decompresses the single gzip member (or zstd frame if a zstd decompressor is given)
+    starting at the given offset. If length is provided, the member is fetched with one read.
+    """
+    if decompressor is None:
+        decompressor = zlib.decompressobj(31)
+    ret = []
+    pos = at
+    while not decompressor.eof:
+        nread = GZIP_READ_CHUNK if length is None else at + length - pos
+        if nread <= 0:
+            break
+        chunk = ReadAt(fp, nread, pos)
+        if not chunk:
+            break
+        pos += len(chunk)
+        try:
+            ret.append(decompressor.decompress(chunk))
+        except zlib.error as e:
+            raise gzip.BadGzipFile(str(e))
+
+    if not decompressor.eof:
+        raise EOFError("Compressed file ended before the end-of-stream marker was reached")
+    return b"".join(ret)
+
 class _NonClosableFP(object):
     def __init__(self, fp):
         self.fp = fp
@@ -58,14 +155,15 @@ class _NonClosableFP(object):
         return
 
 class SeekableGZipWriter(object):
-    def __init__(self, fp):
+    def __init__(self, fp, compresslevel:int=9):
         self.sub_fp = MakeFakeTellable(fp)
+        self.compresslevel = compresslevel
         self.gzip_fp = None
     
     def start_part(self) -> int:
         assert(self.gzip_fp is None)
         pos = self.sub_fp.tell()
-        self.gzip_fp = gzip.GzipFile(fileobj=_NonClosableFP(self.sub_fp), mode="w")
+        self.gzip_fp = gzip.GzipFile(fileobj=_NonClosableFP(self.sub_fp), mode="w", compresslevel=self.compresslevel)
         return pos
 
     def end_part(self) -> int:
@@ -78,6 +176,14 @@ class SeekableGZipWriter(object):
         assert(self.gzip_fp is not None)
         return self.gzip_fp.write(*args, **kwargs)
 
+    def compress_part(self, data:bytes) -> bytes:
+        """ compresses a whole part at once, see WriteParts() """
+        assert(self.gzip_fp is None)
+        return gzip.compress(data, self.compresslevel)
+
+    def flush(self):
+        self.sub_fp.flush()
+
     def close(self):
         if self.gzip_fp is not None:
             self.end_part()
@@ -85,4 +191,459 @@ class SeekableGZipWriter(object):
         self.sub_fp.close()
     
     def __del__(self):
-        self.close()
+        # the underlying file is closed by whoever owns it (see WarcWriter.__del__)
+        if self.gzip_fp is not None:
+            self.end_part()
+
+class SeekableZstdWriter(object):
+    """
+    Same as SeekableGZipWriter but each part is a zstd frame (.warc.zst).
+    If a trained dictionary is given, it is written in a skippable frame
+    at the start of the file, so readers can find it.
+    """
+    def __init__(self, fp, compresslevel:int=DEFAULT_ZSTD_LEVEL, dictionary:[bytes|None]=None):
+        _require_zstandard()
+        self.sub_fp = MakeFakeTellable(fp)
+        self.compressobj = None
+
+        if dictionary is not None:
+            if self.sub_fp.tell() == 0: # otherwise we are appending and it is already there
+                self.sub_fp.write(ZSTD_DICT_MAGIC.to_bytes(4, "little") + len(dictionary).to_bytes(4, "little") + dictionary)
+            self.compressor = zstandard.ZstdCompressor(level=compresslevel, dict_data=zstandard.ZstdCompressionDict(dictionary))
+        else:
+            self.compressor = zstandard.ZstdCompressor(level=compresslevel)
+
+    def start_part(self) -> int:
+        assert(self.compressobj is None)
+        self.compressobj = self.compressor.compressobj()
+        return self.sub_fp.tell()
+
+    def end_part(self) -> int:
+        assert(self.compressobj is not None)
+        self.sub_fp.write(self.compressobj.flush())
+        self.compressobj = None
+        return self.sub_fp.tell()
+
+    def write(self, data) -> int:
+        assert(self.compressobj is not None)
+        self.sub_fp.write(self.compressobj.compress(data))
+        return len(data)
+
+    def compress_part(self, data:bytes) -> bytes:
+        """ compresses a whole part at once, see WriteParts() """
+        assert(self.compressobj is None)
+        return self.compressor.compress(data)
+
+    def flush(self):
+        self.sub_fp.flush()
+
+    def close(self):
+        if self.compressobj is not None:
+            self.end_part()
+
+        self.sub_fp.close()
+
+    def __del__(self):
+        # the underlying file is closed by whoever owns it (see WarcWriter.__del__)
+        if self.compressobj is not None:
+            self.end_part()
+
+def _compress_member(chunks:list, compresslevel:int) -> list:
+    """ compresses the chunks into a gzip member, dropping each one once compressed (no joined copy) """
+    compressor = zlib.compressobj(compresslevel, zlib.DEFLATED, 31)
+    chunks.reverse()
+    ret = []
+    while chunks:
+        data = compressor.compress(chunks.pop())
+        if data:
+            ret.append(data)
+    ret.append(compressor.flush())
+    return ret
+
+class ThreadedGZipWriter(object):
+    """
+    Same as SeekableGZipWriter, but parts are compressed by a thread pool.
+    Each part is buffered (as the written chunks) until end_part(), compressed chunk by chunk
+    into its own gzip member by a worker and written in order by a sink thread, so start_part() and end_part()
+    return futures of the compressed offsets instead of the offsets.
+    At most max_pending parts are waiting to be written at once.
+    Once a part fails (compression or write), nothing else is written: every pending
+    future gets the error and flush()/close() raise it.
+    """
+    def __init__(self, fp, workers:[int|None]=None, compresslevel:int=9, max_pending:int=64):
+        self.sub_fp = MakeFakeTellable(fp)
+        self.compresslevel = compresslevel
+        self.executor = ThreadPoolExecutor(workers)
+        self.queue = Queue(max_pending)
+        self.part = None
+        self.error = None # first error of the sink, nothing is written after it
+        self.sink = Thread(target=self._sink, daemon=True)
+        self.sink.start()
+
+    def _sink(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                self.queue.task_done()
+                return
+
+            compressed, start_pos, end_pos = item
+            try:
+                if self.error is not None:
+                    raise self.error
+                data = compressed.result()
+                pos = self.sub_fp.tell()
+                for chunk in data:
+                    self.sub_fp.write(chunk)
+                # only known once the part was written
+                start_pos.set_result(pos)
+                end_pos.set_result(self.sub_fp.tell())
+            except BaseException as e:
+                if self.error is None:
+                    self.error = e
+                if not start_pos.done():
+                    start_pos.set_exception(self.error)
+                end_pos.set_exception(self.error)
+            self.queue.task_done()
+
+    def start_part(self) -> Future:
+        assert(self.part is None)
+        self.part = ([], Future())
+        return self.part[1]
+
+    def end_part(self) -> Future:
+        assert(self.part is not None)
+        chunks, start_pos = self.part
+        self.part = None
+        end_pos = Future()
+        compressed = self.executor.submit(_compress_member, chunks, self.compresslevel)
+        self.queue.put((compressed, start_pos, end_pos))
+        return end_pos
+
+    def write(self, data) -> int:
+        assert(self.part is not None)
+        self.part[0].append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        """ waits for every terminated part to be written, raises the sink's error if any """
+        self.queue.join()
+        if self.error is not None:
+            raise self.error
+        self.sub_fp.flush()
+
+    def _stop(self):
+        """ writes what is pending and stops the threads """
+        if self.sink is None:
+            return
+        if self.part is not None:
+            self.end_part()
+        self.queue.put(None)
+        self.sink.join()
+        self.sink = None
+        self.executor.shutdown()
+
+    def close(self):
+        if self.sink is None:
+            return
+        self._stop()
+        self.sub_fp.close()
+        if self.error is not None:
+            raise self.error
+
+    def __del__(self):
+        # the underlying file is closed by whoever owns it (see WarcWriter.__del__)
+        self._stop()
+
+class SeekableGZipReader(object):
+    """
+    Read a (multi-member) gzip file while keeping track of where each member starts.
+
+    Seeking backward only rewinds to the start of the member holding the
+    wanted position instead of the start of the file, so with one member
+    per record (as written by SeekableGZipWriter) random access costs the
+    size of the record rather than the size of the archive.
+
+    If resync is set, corrupted (or truncated) members are skipped: the next one is
+    searched for from the start of the corrupted one, what was skipped is added to
+    skipped as (start, end) offsets in the underlying file.
+    """
+    # what starts a member, see resync
+    MEMBER_MAGIC = GZIP_MEMBER_MAGIC
+
+    def __init__(self, fp):
+        self.sub_fp = fp
+        self.resync = False
+        self.skipped = []
+        self.is_seekable = hasattr(fp, 'seekable') and fp.seekable()
+        start = fp.tell() if self.is_seekable else 0
+
+        # members[i] starts at member_upos[i] once uncompressed
+        # and at member_cpos[i] in the underlying file.
+        # (only the last ones are kept if the file is not seekable, see _add_member())
+        self.member_upos = array("Q", [0])
+        self.member_cpos = array("Q", [start])
+
+        self.pos = 0
+        self._reset(0, start)
+
+    def new_decompressor(self):
+        return zlib.decompressobj(31)
+
+    def _skip_padding(self) -> bool:
+        """ called before a member starts, returns False if more data is needed """
+        # members may be followed by zero padding
+        self.pending = self.pending.lstrip(b"\0")
+        return len(self.pending) != 0
+
+    def _decompress(self, max_length:int=GZIP_READ_CHUNK) -> (bytes, bool):
+        """ decompresses pending data, returns the data and whether the member ended """
+        try:
+            data = self.decompressor.decompress(self.pending, max_length)
+        except zlib.error as e:
+            raise gzip.BadGzipFile(str(e))
+
+        if self.decompressor.eof:
+            self.pending = self.decompressor.unused_data
+            return data, True
+        self.pending = self.decompressor.unconsumed_tail
+        return data, False
+
+    def _reset(self, upos, cpos):
+        self.decompressor = self.new_decompressor()
+        self.member_started = False
+        self.member_start = cpos
+        self.pending = b""
+        self.raw_pos = cpos
+        self.buf = b""
+        self.buf_pos = upos
+
+    def _add_member(self, upos, cpos):
+        if upos > self.member_upos[-1]:
+            self.member_upos.append(upos)
+            self.member_cpos.append(cpos)
+            if not self.is_seekable and len(self.member_upos) > 2 * MAX_UNSEEKABLE_MEMBERS:
+                # we can't seek back to them anyway
+                del self.member_upos[:-MAX_UNSEEKABLE_MEMBERS]
+                del self.member_cpos[:-MAX_UNSEEKABLE_MEMBERS]
+
+    def _fill(self) -> bool:
+        """ decompress the next chunk into the buffer, returns False on EOF """
+        # far from the position (i.e. skipping), bigger chunks mean less calls
+        max_length = GZIP_SKIP_CHUNK if self.pos - self.buf_pos - len(self.buf) >= GZIP_SKIP_CHUNK else GZIP_READ_CHUNK
+        need_data = not self.pending
+        while True:
+            if need_data:
+                data = self.sub_fp.read(GZIP_READ_CHUNK)
+                self.raw_pos += len(data)
+                if not data:
+                    if self.member_started:
+                        if not self.resync:
+                            raise EOFError("Compressed file ended before the end-of-stream marker was reached")
+                        self._add_skipped(self.member_start, self.raw_pos)
+                        self.member_started = False
+                    return False
+                self.pending += data
+
+            if not self.member_started:
+                need_data = not self._skip_padding()
+                if need_data:
+                    continue
+                self.member_started = True
+                self.member_start = self.raw_pos - len(self.pending)
+
+            try:
+                data, member_ended = self._decompress(max_length)
+            except DECOMPRESSION_ERRORS:
+                if not self.resync:
+                    raise
+                self._skip_member()
+                need_data = not self.pending
+                continue
+            if member_ended:
+                self.decompressor = self.new_decompressor()
+                self.member_started = False
+                self._add_member(self.buf_pos + len(self.buf) + len(data), self.raw_pos - len(self.pending))
+            need_data = not self.pending
+
+            if data:
+                end = self.buf_pos + len(self.buf)
+                if self.pos >= end:
+                    self.buf = data
+                    self.buf_pos = end
+                elif self.pos > self.buf_pos:
+                    self.buf = self.buf[self.pos - self.buf_pos:] + data
+                    self.buf_pos = self.pos
+                else:
+                    self.buf += data
+                return True
+
+    def _add_skipped(self, start:int, end:int):
+        if self.skipped and start < self.skipped[-1][1]:
+            return # seeked back, already known
+        if self.skipped and self.skipped[-1][1] == start:
+            start = self.skipped.pop()[0]
+        self.skipped.append((start, end))
+
+    def _skip_member(self):
+        """ drops the corrupted member, looking for the next one from its start """
+        pending_pos = self.raw_pos - len(self.pending)
+        searched = max(0, self.member_start + 1 - pending_pos)
+        while True:
+            idx = self.pending.find(self.MEMBER_MAGIC, searched)
+            if idx != -1:
+                break
+            # the magic may be split between two reads
+            keep = max(searched, len(self.pending) - len(self.MEMBER_MAGIC) + 1)
+            self.pending = self.pending[keep:]
+            searched = 0
+            data = self.sub_fp.read(RESYNC_READ_SIZE)
+            if not data:
+                idx = len(self.pending)
+                break
+            self.raw_pos += len(data)
+            self.pending += data
+
+        self.pending = self.pending[idx:]
+        end = self.raw_pos - len(self.pending)
+        self._add_skipped(self.member_start, end)
+        self.decompressor = self.new_decompressor()
+        self.member_started = False
+        self._add_member(self.buf_pos + len(self.buf), end)
+
+    def _sync(self):
+        """ make the buffer start at (or before) the logical position """
+        end = self.buf_pos + len(self.buf)
+        if self.buf_pos <= self.pos <= end:
+            return
+
+        if self.pos < self.buf_pos and not self.is_seekable:
+            raise OSError("underlying file is not seekable")
+
+        i = bisect_right(self.member_upos, self.pos) - 1
+        if self.pos < self.buf_pos or (self.is_seekable and end < self.member_upos[i]):
+            # the current member is not the one holding the position,
+            # jump directly to the right one.
+            self.sub_fp.seek(self.member_cpos[i])
+            self._reset(self.member_upos[i], self.member_cpos[i])
+
+        while self.buf_pos + len(self.buf) < self.pos:
+            if not self._fill():
+                break
+
+    def read(self, size=-1) -> bytes:
+        self._sync()
+        while size is None or size < 0 or self.buf_pos + len(self.buf) - self.pos < size:
+            if not self._fill():
+                break
+
+        start = self.pos - self.buf_pos
+        if start < 0 or start > len(self.buf):
+            return b""
+        ret = self.buf[start:] if size is None or size < 0 else self.buf[start:start+size]
+        self.pos += len(ret)
+        return ret
+
+    def readline(self, size=-1) -> bytes:
+        if size is None:
+            size = -1
+        self._sync()
+        searched = self.pos
+        while True:
+            idx = self.buf.find(b"\n", searched - self.buf_pos)
+            if idx != -1:
+                nread = self.buf_pos + idx + 1 - self.pos
+                break
+            searched = self.buf_pos + len(self.buf)
+            if 0 <= size <= searched - self.pos or not self._fill():
+                nread = searched - self.pos
+                break
+
+        if size >= 0:
+            nread = min(nread, size)
+        return self.read(nread)
+
+    def seek(self, offset, whence=0) -> int:
+        if whence == 1:
+            offset += self.pos
+        elif whence != 0:
+            raise ValueError("only SEEK_SET and SEEK_CUR are supported")
+        if offset < 0:
+            raise ValueError("negative seek value")
+        # the actual work is deferred to the next read so that seeking
+        # back and forth (see WarcReader.read_at) costs nothing.
+        self.pos = offset
+        return self.pos
+
+    def tell(self) -> int:
+        return self.pos
+
+    def seekable(self) -> bool:
+        return self.is_seekable
+
+    def readable(self) -> bool:
+        return True
+
+    def compressed_offset(self, pos:int) -> [int|None]:
+        """ returns the compressed offset of the member starting at pos if known """
+        i = bisect_right(self.member_upos, pos) - 1
+        if i >= 0 and self.member_upos[i] == pos:
+            return self.member_cpos[i]
+        return None
+
+    def close(self):
+        self.sub_fp.close()
+
+class SeekableZstdReader(SeekableGZipReader):
+    """ same as SeekableGZipReader but for zstd frames, using the dictionary at the start of the file if any """
+    MEMBER_MAGIC = ZSTD_FRAME_MAGIC
+
+    def __init__(self, fp):
+        _require_zstandard()
+        self.dctx = zstandard.ZstdDecompressor()
+
+        header = fp.read(8)
+        consumed = len(header)
+        dictionary = None
+        if len(header) == 8 and int.from_bytes(header[:4], "little") == ZSTD_DICT_MAGIC:
+            dictionary = fp.read(int.from_bytes(header[4:], "little"))
+            consumed += len(dictionary)
+            if dictionary.startswith(ZSTD_FRAME_MAGIC): # the dictionary may be compressed
+                dictionary = zstandard.ZstdDecompressor().decompressobj().decompress(dictionary)
+            self.dctx = zstandard.ZstdDecompressor(dict_data=zstandard.ZstdCompressionDict(dictionary))
+            header = b""
+        elif hasattr(fp, 'seekable') and fp.seekable():
+            fp.seek(-len(header), 1)
+            header = b""
+
+        super().__init__(fp)
+        if not self.is_seekable:
+            # offsets count what was already read, header (if any) is given back as pending data
+            self.raw_pos = consumed
+            self.member_cpos[0] = self.member_start = consumed - len(header)
+        self.pending = header
+
+    def new_decompressor(self):
+        return self.dctx.decompressobj()
+
+    def _skip_padding(self) -> bool:
+        # skip skippable frames (magic 0x184D2A5?)
+        while len(self.pending) >= 4:
+            if int.from_bytes(self.pending[:4], "little") & 0xFFFFFFF0 != 0x184D2A50:
+                return True
+            if len(self.pending) < 8:
+                return False
+            size = int.from_bytes(self.pending[4:8], "little")
+            if len(self.pending) < 8 + size:
+                return False
+            self.pending = self.pending[8 + size:]
+        return False
+
+    def _decompress(self, max_length:int=GZIP_READ_CHUNK) -> (bytes, bool):
+        # zstandard's decompressobj() has no output limit
+        data = self.decompressor.decompress(self.pending)
+        if self.decompressor.eof:
+            self.pending = self.decompressor.unused_data
+            return data, True
+        self.pending = b""
+        return data, False
@@ -0,0 +1,146 @@
+# Copyright (C) 2025 5IGI0 / Ethan L. C. Lorenzetti
+#
+# This file is part of PyWarc.
+# 
+# PyWarc is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License,
+# or (at your option) any later version.
+#
+# PyWarc is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+# without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License along with PyWarc.
+# If not, see <https://www.gnu.org/licenses/>. 
+
+import sqlite3
+from collections import OrderedDict
+from datetime import datetime
+from uuid import uuid4
+
+from .digest import RecordDigester, has_http_payload, DEFAULT_DIGEST_ALGORITHM
+from .writer import WarcWriter
+
+DEFAULT_CACHE_SIZE = 100000
+REVISIT_PROFILE = "http://netpreserve.org/warc/1.1/revisit/identical-payload-digest"
+
+class DedupStore(object):
+    """
+    Maps payload digests to the (uri, date, record_id) of the record holding the payload.
+    The most recently used entries are kept in memory (LRU), every entry is also kept
+    in a sqlite database if a path is given (so it survives evictions and restarts).
+    """
+    def __init__(self, path:[str|None]=None, cache_size:int=DEFAULT_CACHE_SIZE):
+        self.cache = OrderedDict()
+        self.cache_size = cache_size
+        self.db = None
+        if path is not None:
+            self.db = sqlite3.connect(path)
+            self.db.execute("CREATE TABLE IF NOT EXISTS payloads (digest TEXT PRIMARY KEY, uri TEXT, date TEXT, record_id TEXT)")
+
+    def _cache(self, digest:str, entry:tuple):
+        self.cache[digest] = entry
+        self.cache.move_to_end(digest)
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+
+    def get(self, digest:str) -> [tuple|None]:
+        """ returns (uri, date, record_id) or None """
+        try:
+            entry = self.cache[digest]
+            self.cache.move_to_end(digest)
+            return entry
+        except KeyError:
+            pass
+
+        if self.db is None:
+            return None
+        row = self.db.execute("SELECT uri, date, record_id FROM payloads WHERE digest = ?", (digest,)).fetchone()
+        if row is None:
+            return None
+        entry = (row[0], datetime.fromisoformat(row[1]), row[2])
+        self._cache(digest, entry)
+        return entry
+
+    def put(self, digest:str, uri:str, date:datetime, record_id:str):
+        self._cache(digest, (uri, date, record_id))
+        if self.db is not None:
+            self.db.execute("INSERT OR IGNORE INTO payloads VALUES (?, ?, ?, ?)", (digest, uri, date.isoformat(), record_id))
+
+    def __len__(self) -> int:
+        if self.db is None:
+            return len(self.cache)
+        return self.db.execute("SELECT COUNT(*) FROM payloads").fetchone()[0]
+
+    def flush(self):
+        if self.db is not None:
+            self.db.commit()
+
+    def close(self):
+        if self.db is not None:
+            self.db.commit()
+            self.db.close()
+            self.db = None
+
+class DedupWarcWriter(object):
+    """
+    Writes response records through a WarcWriter, replacing the ones whose HTTP payload
+    was already written by revisit records (identical-payload-digest profile) only holding the HTTP headers.
+    Other records are written as is.
+    """
+    def __init__(self, writer:WarcWriter, store:[DedupStore|str|None]=None):
+        self.writer = writer
+        self.is_store_self_managed = not isinstance(store, DedupStore)
+        self.store = store if isinstance(store, DedupStore) else DedupStore(store)
+        self.digest_algorithm = writer.digest_algorithm or DEFAULT_DIGEST_ALGORITHM
+        self.revisits = 0 # how many records were deduplicated
+
+    def write_block(self, record_type:str, content:bytes, record_id:[str|None]=None, record_date:[datetime|None]=None, record_headers:dict={}) -> (int, int):
+        uri = record_headers.get("WARC-Target-URI")
+        if record_type != "response" or uri is None or not has_http_payload(record_type, record_headers.get("Content-Type")):
+            return self.writer.write_block(record_type, content, record_id=record_id, record_date=record_date, record_headers=record_headers)
+
+        digester = RecordDigester(self.digest_algorithm, http=True)
+        digester.update(content)
+        payload_digest = digester.payload_digest
+        headers_end = content.find(b"\r\n\r\n") + 4
+        if payload_digest is None or headers_end == len(content): # no (or empty) payload
+            return self.writer.write_block(record_type, content, record_id=record_id, record_date=record_date, record_headers=record_headers)
+
+        if record_id is None:
+            record_id = uuid4().urn
+        if record_date is None:
+            record_date = datetime.utcnow()
+
+        original = self.store.get(payload_digest)
+        if original is None:
+            self.store.put(payload_digest, uri, record_date, record_id)
+            return self.writer.write_block(record_type, content, record_id=record_id, record_date=record_date,
+                record_headers={**record_headers, **digester.digest_headers()})
+
+        self.revisits += 1
+        original_uri, original_date, original_id = original
+        # a block digest given by the caller covers the whole response, not the truncated revisit block
+        block_digester = RecordDigester(self.digest_algorithm)
+        block_digester.update(content[:headers_end])
+        return self.writer.write_block("revisit", content[:headers_end], record_id=record_id, record_date=record_date,
+            record_headers={
+                **record_headers,
+                "WARC-Block-Digest": block_digester.block_digest,
+                "WARC-Profile": REVISIT_PROFILE,
+                "WARC-Refers-To-Target-URI": original_uri,
+                "WARC-Refers-To-Date": original_date.isoformat(timespec='seconds')+"Z",
+                "WARC-Refers-To": "<"+original_id+">",
+                "WARC-Payload-Digest": payload_digest})
+
+    def flush(self):
+        self.writer.flush()
+        self.store.flush()
+
+    def close(self):
+        self.writer.close()
+        if self.is_store_self_managed:
+            self.store.close()
+        else:
+            self.store.flush()
@@ -0,0 +1,96 @@
+# Copyright (C) 2025 5IGI0 / Ethan L. C. Lorenzetti
+#
+# This file is part of PyWarc.
+# 
+# PyWarc is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License,
+# or (at your option) any later version.
+#
+# PyWarc is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+# without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License along with PyWarc.
+# If not, see <https://www.gnu.org/licenses/>. 
+
+import hashlib
+from base64 import b32encode, b32decode, b16decode
+from binascii import Error as BinasciiError
+
+DEFAULT_DIGEST_ALGORITHM = "sha1"
+
+def format_digest(algorithm:str, digest:bytes) -> str:
+    """ returns a WARC-*-Digest value: <algorithm>:<base32 digest> """
+    return f"{algorithm}:{b32encode(digest).decode()}"
+
+def parse_digest(value:str) -> [tuple|None]:
+    """ parses a WARC-*-Digest value (base32 or base16), returns None if it can't be checked """
+    algorithm, _, encoded = value.strip().partition(":")
+    algorithm = algorithm.lower().replace("-", "")
+    if algorithm not in hashlib.algorithms_available:
+        return None
+
+    size = hashlib.new(algorithm).digest_size
+    try:
+        if len(encoded) == size*2:
+            return (algorithm, b16decode(encoded.upper()))
+        digest = b32decode(encoded.upper() + "="*(-len(encoded) % 8))
+    except (BinasciiError, ValueError):
+        return None
+    if len(digest) != size:
+        return None
+    return (algorithm, digest)
+
+def has_http_payload(record_type:str, content_type:[str|None]) -> bool:
+    """ whether the record's block is an HTTP message with a payload to digest """
+    return record_type in ("response", "request") and content_type is not None and content_type.startswith("application/http")
+
+class RecordDigester(object):
+    """
+    Computes a record's block digest and, for HTTP messages, its payload digest
+    (the bytes following the HTTP headers) as the block is fed chunk by chunk.
+    """
+    def __init__(self, algorithm:str=DEFAULT_DIGEST_ALGORITHM, http:bool=False):
+        self.algorithm = algorithm
+        self.block_hash = hashlib.new(algorithm)
+        self.payload_hash = hashlib.new(algorithm) if http else None
+        self.in_payload = False
+        # end of the previous chunk, the header terminator may be split between chunks
+        self.tail = b""
+
+    def update(self, data:bytes):
+        self.block_hash.update(data)
+        if self.payload_hash is None:
+            return
+
+        if self.in_payload:
+            self.payload_hash.update(data)
+            return
+
+        data = self.tail + data
+        end = data.find(b"\r\n\r\n")
+        if end == -1:
+            self.tail = data[-3:]
+        else:
+            self.in_payload = True
+            self.tail = b""
+            self.payload_hash.update(data[end+4:])
+
+    @property
+    def block_digest(self) -> str:
+        return format_digest(self.algorithm, self.block_hash.digest())
+
+    @property
+    def payload_digest(self) -> [str|None]:
+        """ None if the block isn't an HTTP message or its headers never ended """
+        if not self.in_payload:
+            return None
+        return format_digest(self.algorithm, self.payload_hash.digest())
+
+    def digest_headers(self) -> dict:
+        """ returns the WARC-Block-Digest and WARC-Payload-Digest headers """
+        ret = {"WARC-Block-Digest": self.block_digest}
+        if self.payload_digest is not None:
+            ret["WARC-Payload-Digest"] = self.payload_digest
+        return ret
@@ -0,0 +1,150 @@
+# Copyright (C) 2025 5IGI0 / Ethan L. C. Lorenzetti
+#
+# This file is part of PyWarc.
+# 
+# PyWarc is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License,
+# or (at your option) any later version.
+#
+# PyWarc is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+# without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License along with PyWarc.
+# If not, see <https://www.gnu.org/licenses/>. 
+
+
+import os
+import zlib
+from collections import deque
+from io import BytesIO
+from multiprocessing import Pool
+
+from .reader import WarcReader, WarcBlock
+
+DEFAULT_RANGE_SIZE = 16 * 1024 * 1024
+GZIP_MAGIC = b"\x1f\x8b\x08"
+SCAN_BUF_SIZE = 65536
+# bodies a worker sends back for a range, the next ones are read again by the caller from their offsets
+DEFAULT_INLINE_SIZE = 32 * 1024 * 1024
+# ranges being parsed (or parsed but not consumed yet) per process
+PENDING_RANGES_PER_PROCESS = 2
+
+def _is_record_member(fp, at:int) -> bool:
+    """ checks that a gzip member starting with a WARC record is at the given offset """
+    fp.seek(at)
+    decompressor = zlib.decompressobj(31)
+    try:
+        data = decompressor.decompress(fp.read(512), 16)
+    except zlib.error:
+        return False
+    return data.startswith(b"WARC/1.")
+
+def find_next_member(fp, at:int, end:[int|None]=None) -> [int|None]:
+    """
+    Returns the offset of the first gzip member holding a WARC record starting at or after at (and before end).
+    It only works with one member per record (as written by WarcWriter).
+    """
+    while end is None or at < end:
+        fp.seek(at)
+        buf = fp.read(SCAN_BUF_SIZE + len(GZIP_MAGIC) - 1)
+        if len(buf) < len(GZIP_MAGIC):
+            return None
+
+        idx = buf.find(GZIP_MAGIC)
+        while idx != -1 and idx < SCAN_BUF_SIZE:
+            if end is not None and at + idx >= end:
+                return None
+            if _is_record_member(fp, at + idx):
+                return at + idx
+            idx = buf.find(GZIP_MAGIC, idx + 1)
+        at += SCAN_BUF_SIZE
+    return None
+
+def _scan_range(args):
+    path, start, end, map_func, inline_size = args
+    ret = []
+    with open(path, "rb") as fp:
+        start = find_next_member(fp, start, end) if start != 0 else 0
+        if start is None:
+            return ret
+
+        fp.seek(start)
+        reader = WarcReader(fp, compressed=True)
+        for block in reader:
+            offset = reader.get_compressed_offset(block.block_pos)
+            if offset is None:
+                raise ValueError("records are not stored in separate gzip members")
+            # records starting in the next range are handled by another worker
+            if offset >= end:
+                break
+            if map_func is not None:
+                ret.append(map_func(block))
+            elif block.content_length <= inline_size:
+                inline_size -= block.content_length
+                ret.append((block.headers, block.read(), offset))
+            else:
+                ret.append((block.headers, None, offset))
+    return ret
+
+class ParallelWarcScanner(object):
+    """
+    Splits a .warc.gz into byte ranges at gzip member boundaries and parses them in a process pool.
+    Iterating over it yields records in file order, or map_func(record) if provided.
+    map_func runs in the workers so it must be picklable (i.e. defined at module level)
+    and so must be its return value.
+    Only a few ranges are parsed ahead of the consumer and, without map_func, workers send back
+    up to inline_size bytes of bodies per range, the other records are read again when yielded.
+    """
+    def __init__(
+        self, file:str, map_func=None, processes:[int|None]=None,
+        range_size:int=DEFAULT_RANGE_SIZE, inline_size:int=DEFAULT_INLINE_SIZE
+    ):
+        self.file = file
+        self.map_func = map_func
+        self.processes = processes
+        self.range_size = range_size
+        self.inline_size = inline_size
+
+    def get_ranges(self) -> list:
+        size = os.path.getsize(self.file)
+        return [(self.file, start, min(start + self.range_size, size), self.map_func, self.inline_size)
+                for start in range(0, size, self.range_size)]
+
+    def _wrap(self, results):
+        if self.map_func is not None:
+            for result in results:
+                yield from result
+            return
+
+        reader = None
+        for result in results:
+            for headers, content, offset in result:
+                if content is not None:
+                    yield WarcBlock(WarcReader(BytesIO(content), compressed=False), headers, 0)
+                    continue
+                if reader is None:
+                    reader = WarcReader(self.file, compressed=True)
+                yield reader.read_record_at(offset)
+
+    def _pool_results(self, pool, ranges):
+        """ parses the ranges in the pool, with a bounded number of them pending """
+        ranges = iter(ranges)
+        pending = deque()
+        max_pending = PENDING_RANGES_PER_PROCESS * (self.processes or os.cpu_count() or 1)
+        for args in ranges:
+            pending.append(pool.apply_async(_scan_range, (args,)))
+            if len(pending) >= max_pending:
+                yield pending.popleft().get()
+        while pending:
+            yield pending.popleft().get()
+
+    def __iter__(self):
+        ranges = self.get_ranges()
+        if self.processes == 1 or len(ranges) <= 1:
+            yield from self._wrap(map(_scan_range, ranges))
+            return
+
+        with Pool(self.processes) as pool:
+            yield from self._wrap(self._pool_results(pool, ranges))
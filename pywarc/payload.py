@@ -0,0 +1,222 @@
+# Copyright (C) 2025 5IGI0 / Ethan L. C. Lorenzetti
+#
+# This file is part of PyWarc.
+# 
+# PyWarc is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License,
+# or (at your option) any later version.
+#
+# PyWarc is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+# without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License along with PyWarc.
+# If not, see <https://www.gnu.org/licenses/>. 
+
+
+import zlib
+from io import RawIOBase, BufferedReader
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+MAX_HTTP_LINE = 65536
+DECODE_CHUNK = 65536
+
+class InvalidHttpPayloadError(Exception):
+    pass
+
+class UnsupportedEncodingError(InvalidHttpPayloadError):
+    pass
+
+class ChunkedStream(RawIOBase):
+    """ removes the chunked transfer-encoding from a (buffered) stream """
+    def __init__(self, fp:BufferedReader):
+        self.fp = fp
+        self.chunk_remaining = 0
+        self.eof = False
+
+    def _next_chunk(self):
+        line = self.fp.readline(MAX_HTTP_LINE)
+        try:
+            self.chunk_remaining = int(line.split(b";", 1)[0].strip(), 16)
+        except ValueError:
+            # truncated or badly chunked payload, stop here
+            self.eof = True
+            return
+        if self.chunk_remaining == 0:
+            # skip trailers
+            while self.fp.readline(MAX_HTTP_LINE) not in (b"\r\n", b"\n", b""):
+                pass
+            self.eof = True
+
+    def readinto(self, b) -> int:
+        while not self.eof:
+            if self.chunk_remaining == 0:
+                self._next_chunk()
+                continue
+
+            nread = self.fp.readinto(memoryview(b)[:min(len(b), self.chunk_remaining)])
+            if nread == 0:
+                self.eof = True
+                break
+            self.chunk_remaining -= nread
+            if self.chunk_remaining == 0:
+                self.fp.readline(MAX_HTTP_LINE) # CRLF after the chunk
+            return nread
+        return 0
+
+    def readable(self) -> bool:
+        return True
+
+def _get_decompressor(encoding:str, first_bytes:bytes):
+    if encoding in ("gzip", "x-gzip"):
+        return zlib.decompressobj(47)
+    if encoding == "deflate":
+        # most servers send zlib streams but some send raw deflate
+        if len(first_bytes) >= 2 and (first_bytes[0] & 0x0f) == 8 and ((first_bytes[0] << 8) | first_bytes[1]) % 31 == 0:
+            return zlib.decompressobj(15)
+        return zlib.decompressobj(-15)
+    if encoding == "br":
+        if brotli is None:
+            raise UnsupportedEncodingError("brotli content-encoding needs the 'brotli' module")
+        return brotli.Decompressor()
+    raise UnsupportedEncodingError(f"unsupported content-encoding '{encoding}'")
+
+class DecodingStream(RawIOBase):
+    """ removes a content-encoding (gzip, deflate or br) from a (buffered) stream """
+    def __init__(self, fp:BufferedReader, encoding:str):
+        self.fp = fp
+        self.decompressor = _get_decompressor(encoding, fp.peek(2)[:2])
+        self.is_zlib = encoding != "br"
+        self.out = b""
+        self.eof = False
+
+    def _decompress(self, data:bytes) -> bytes:
+        if self.is_zlib:
+            ret = self.decompressor.decompress(self.decompressor.unconsumed_tail + data, DECODE_CHUNK)
+            if self.decompressor.eof:
+                self.eof = True
+            return ret
+        return self.decompressor.process(data)
+
+    def readinto(self, b) -> int:
+        while not self.out and not self.eof:
+            if self.is_zlib and self.decompressor.unconsumed_tail:
+                data = b""
+            else:
+                data = self.fp.read(DECODE_CHUNK)
+                if not data:
+                    self.eof = True
+                    if self.is_zlib:
+                        self.out = self.decompressor.flush()
+                    break
+            try:
+                self.out = self._decompress(data)
+            except Exception as e:
+                raise InvalidHttpPayloadError(f"can't decode payload: {e}")
+
+        nread = min(len(b), len(self.out))
+        b[:nread] = self.out[:nread]
+        self.out = self.out[nread:]
+        return nread
+
+    def readable(self) -> bool:
+        return True
+
+class HttpPayload(object):
+    """
+    HTTP view of a request/response block.
+    The status line and the headers are only parsed when accessed,
+    the entity body is streamed and decoded on the fly.
+    """
+    def __init__(self, block):
+        self.block = block
+        self.stream = None
+        self.parsed = False
+
+    def _parse(self):
+        if self.parsed:
+            return
+        self.stream = self.block.get_as_stream()
+
+        line = self.stream.readline(MAX_HTTP_LINE)
+        if not line.endswith(b"\n"):
+            raise InvalidHttpPayloadError(f"invalid HTTP status line: {line[:32]}")
+        self.status_line = line.rstrip(b"\r\n").decode("latin-1")
+
+        self.headers = {}
+        while True:
+            line = self.stream.readline(MAX_HTTP_LINE)
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, sep, value = line.partition(b":")
+            if not sep:
+                raise InvalidHttpPayloadError(f"invalid HTTP header: {line[:32]}")
+            name = name.strip().decode("latin-1").lower()
+            self.headers.setdefault(name, []).append(value.strip().decode("latin-1"))
+
+        self.body_pos = self.stream.tell()
+        self.parsed = True
+
+    def get_header(self, name:str) -> [str|None]:
+        """ returns the first value of a header (case-insensitive) """
+        self._parse()
+        values = self.headers.get(name.lower())
+        return values[0] if values else None
+
+    def _get_status_part(self, i:int) -> [str|None]:
+        self._parse()
+        parts = self.status_line.split(" ", 2)
+        return parts[i] if len(parts) > i else None
+
+    def get_body_stream(self, decode_transfer:bool=True, decode_content:bool=True) -> BufferedReader:
+        """
+        Returns a stream over the entity body, with the chunked transfer-encoding
+        and the content-encoding removed unless asked otherwise.
+        NOTE: for non-seekable files, the body can only be streamed once.
+        """
+        self._parse()
+        stream = self.stream
+        if stream is None or stream.tell() != self.body_pos:
+            stream = self.block.get_as_stream()
+            stream.seek(self.body_pos)
+
+        if decode_transfer and "chunked" in (self.get_header("Transfer-Encoding") or "").lower():
+            stream = BufferedReader(ChunkedStream(stream))
+
+        if decode_content:
+            encodings = [e.strip().lower() for e in (self.get_header("Content-Encoding") or "").split(",")]
+            for encoding in reversed(encodings):
+                if encoding not in ("", "identity"):
+                    stream = BufferedReader(DecodingStream(stream, encoding))
+
+        self.stream = None
+        return stream
+
+    def read(self, **kwargs) -> bytes:
+        """ reads the whole (decoded) entity body """
+        return self.get_body_stream(**kwargs).read()
+
+    @property
+    def is_response(self) -> bool:
+        return self._get_status_part(0).startswith("HTTP/")
+
+    @property
+    def status(self) -> [int|None]:
+        """ status code of a response """
+        if not self.is_response:
+            return None
+        try:
+            return int(self._get_status_part(1))
+        except (TypeError, ValueError):
+            return None
+
+    version=property(lambda self: self._get_status_part(0 if self.is_response else 2))
+    reason=property(lambda self: self._get_status_part(2) if self.is_response else None)
+    method=property(lambda self: None if self.is_response else self._get_status_part(0))
+    target=property(lambda self: None if self.is_response else self._get_status_part(1))
+    content_type=property(lambda self: self.get_header("Content-Type"))
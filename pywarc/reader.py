@@ -14,11 +14,23 @@
 # You should have received a copy of the GNU Lesser General Public License along with PyWarc.
 # If not, see <https://www.gnu.org/licenses/>. 
 
-from io import BytesIO
+from io import BytesIO, RawIOBase, BufferedIOBase, BufferedReader
 from datetime import datetime
-import gzip
+from collections.abc import Mapping
+from array import array
+import mmap
+import os
+import stat
+import sys
 
-MAX_SKIPBUF = 4096
+from .compression import SeekableGZipReader, SeekableZstdReader, ReadAt, ReadMember, RESYNC_READ_SIZE
+from .payload import HttpPayload
+from .digest import RecordDigester, parse_digest, has_http_payload
+
+MAX_SKIPBUF = 1 << 20
+HEADER_READ_SIZE = 16384
+# what is looked for to find the next record after a corrupted one (only WARC/1.1 is read)
+RECORD_MARKER = b"WARC/1.1\r\n"
 
 class InvalidWarcError(Exception):
     pass
@@ -32,7 +44,10 @@ class WarcHeaderBadValueError(InvalidWarcError):
 class NotSeekableError(Exception):
     pass
 
-def _get_header(header, is_mandatory, sanitize=lambda x: str(x)):
+class DigestMismatchError(InvalidWarcError):
+    pass
+
+def _get_header(header, is_mandatory, sanitize=lambda x: str(x), cache=None):
     def header_getter(self):
         try:
             val = self.headers[header][0]
@@ -46,20 +61,293 @@ def _get_header(header, is_mandatory, sanitize=lambda x: str(x)):
             return sanitize(val)
         except Exception as e:
             raise WarcHeaderBadValueError(f"'{header}' contains an invalid value")
-    return header_getter
+
+    if cache is None:
+        return header_getter
+
+    def cached_header_getter(self):
+        # the value is sanitized once, then stored in the cache attribute
+        try:
+            return getattr(self, cache)
+        except AttributeError:
+            ret = header_getter(self)
+            setattr(self, cache, ret)
+            return ret
+    return cached_header_getter
+
+# header names are interned so records share the same str objects
+_HEADER_NAMES = {}
+MAX_HEADER_NAMES = 4096
+
+def _header_name(name:bytes) -> str:
+    try:
+        return _HEADER_NAMES[name]
+    except KeyError:
+        ret = sys.intern(name.decode())
+        if len(_HEADER_NAMES) < MAX_HEADER_NAMES:
+            _HEADER_NAMES[name] = ret
+        return ret
+
+class WarcHeaders(Mapping):
+    """
+    Read-only mapping of a record's WARC headers (name -> list of values).
+    Values are kept as offsets in the raw header and only decoded when accessed.
+    """
+    __slots__ = ("raw", "fields", "offsets", "decoded")
+
+    def __init__(self, raw:bytes, fields:dict, offsets:array):
+        self.raw = raw
+        self.fields = fields # name -> index of its value (list of indexes if repeated)
+        self.offsets = offsets # start and end of each value in raw
+        self.decoded = None
+
+    def _get_values(self, name:str) -> list:
+        raw, offsets, i = self.raw, self.offsets, self.fields[name]
+        if isinstance(i, int):
+            return [raw[offsets[2*i]:offsets[2*i+1]]]
+        return [raw[offsets[2*j]:offsets[2*j+1]] for j in i]
+
+    def get_raw(self, name:str) -> [bytes|None]:
+        """ returns the first value of the header as bytes (not decoded) """
+        i = self.fields.get(name)
+        if i is None:
+            return None
+        if not isinstance(i, int):
+            i = i[0]
+        return self.raw[self.offsets[2*i]:self.offsets[2*i+1]]
+
+    def __getitem__(self, name:str) -> list:
+        if self.decoded is None:
+            self.decoded = {}
+        else:
+            try:
+                return self.decoded[name]
+            except KeyError:
+                pass
+        ret = [v.decode() for v in self._get_values(name)]
+        self.decoded[name] = ret
+        return ret
+
+    def __contains__(self, name) -> bool:
+        return name in self.fields
+
+    def __iter__(self):
+        return iter(self.fields)
+
+    def __len__(self) -> int:
+        return len(self.fields)
+
+    def __repr__(self) -> str:
+        return repr(dict(self.items()))
+
+def _parse_headers(raw:bytes) -> WarcHeaders:
+    """ raw must contain the whole header, from 'WARC/1.1' to the empty line """
+    start = raw.index(b"\r\n") + 2
+    end = raw.index(b"\r\n\r\n", start - 2)
+
+    fields = {}
+    offsets = []
+    names = _HEADER_NAMES
+    if end >= start:
+        pos = start
+        for line in raw[start:end].split(b"\r\n"):
+            name, sep, value = line.partition(b":")
+            if not sep:
+                raise InvalidWarcError(f"invalid WARC header: {line}")
+
+            pos += len(line)
+            i = len(offsets) >> 1
+            offsets.append(pos - len(value.lstrip(b" \t")))
+            offsets.append(pos)
+            pos += 2
+
+            name = names.get(name) or _header_name(name)
+            if name not in fields:
+                fields[name] = i
+            elif isinstance(fields[name], int):
+                fields[name] = [fields[name], i]
+            else:
+                fields[name].append(i)
+
+    if not "Content-Length" in fields:
+        raise InvalidWarcError("current record doesn't have 'Content-Length' header")
+
+    headers = WarcHeaders(raw, fields, array("I", offsets))
+    _content_length(headers.get_raw("Content-Length"))
+    return headers
+
+def _content_length(value:[bytes|None]) -> int:
+    """ checks a raw Content-Length value, a negative one would make the reader go backward """
+    if value is None:
+        raise InvalidWarcError("current record doesn't have 'Content-Length' header")
+    value = value.strip(b" \t")
+    if not value.isdigit():
+        raise InvalidWarcError(f"invalid 'Content-Length' header: {value[:32]}")
+    return int(value)
+
+def _raw_header_value(raw:bytes, name:bytes) -> [bytes|None]:
+    """ returns the first value of a header without parsing the whole header """
+    start = raw.find(b"\r\n" + name + b":")
+    if start == -1:
+        return None
+    start += len(name) + 3
+    return raw[start:raw.index(b"\r\n", start)].strip(b" \t")
 
 def _url_header_sanitizer(header):
     assert(header[0] == '<' and header[-1] == '>')
     return header[1:-1]
 
+STREAM_BUFFER_SIZE = 65536
+
+class WarcBlockStream(RawIOBase):
+    """ read-only raw stream over a record's body, data is read from the archive on demand """
+    def __init__(self, block):
+        self.block = block
+        self.pos = 0
+
+    def readinto(self, b) -> int:
+        nread = min(len(b), self.block.content_length - self.pos)
+        if nread <= 0:
+            return 0
+        data = self.block.warc_reader.read_at(nread, self.block.block_content_pos + self.pos)
+        if self.block.digester is not None:
+            self.block._check_digests(data, self.pos)
+        b[:len(data)] = data
+        self.pos += len(data)
+        return len(data)
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return self.block.warc_reader.is_seekable
+
+    def seek(self, offset, whence=0) -> int:
+        if whence == 1:
+            offset += self.pos
+        elif whence == 2:
+            offset += self.block.content_length
+        self.pos = max(0, min(offset, self.block.content_length))
+        return self.pos
+
+    def tell(self) -> int:
+        return self.pos
+
+class WarcBlockMapStream(BufferedIOBase):
+    """
+    read-only stream over a mmap'ed record's body, read(), read1() and peek() return slices of the map (no copy)
+    """
+    def __init__(self, block):
+        self.block = block
+        self.view = block.warc_reader.view[block.block_content_pos:block.block_content_pos + block.content_length]
+        self.pos = 0
+
+    def _consume(self, nread:int) -> memoryview:
+        data = self.view[self.pos:self.pos + nread]
+        if self.block.digester is not None:
+            self.block._check_digests(data, self.pos)
+        self.pos += len(data)
+        return data
+
+    def read(self, size=-1) -> memoryview:
+        if size is None or size < 0:
+            size = len(self.view) - self.pos
+        return self._consume(max(0, size))
+
+    read1 = read
+
+    def readinto(self, b) -> int:
+        data = self._consume(len(b))
+        b[:len(data)] = data
+        return len(data)
+
+    readinto1 = readinto
+
+    def peek(self, size=0) -> memoryview:
+        return self.view[self.pos:]
+
+    def readline(self, size=-1) -> bytes:
+        start = self.block.block_content_pos + self.pos
+        end = self.block.block_content_pos + len(self.view)
+        if size is not None and size >= 0:
+            end = min(end, start + size)
+        newline = self.block.warc_reader.map.find(b"\n", start, end)
+        return bytes(self._consume((end if newline == -1 else newline + 1) - start))
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def seek(self, offset, whence=0) -> int:
+        if whence == 1:
+            offset += self.pos
+        elif whence == 2:
+            offset += len(self.view)
+        self.pos = max(0, min(offset, len(self.view)))
+        return self.pos
+
+    def tell(self) -> int:
+        return self.pos
+
 class WarcBlock(object):
-    def __init__(self, warc_reader, headers, block_content_pos):
+    __slots__ = (
+        "warc_reader", "block_pos", "block_content_pos", "read_offset", "headers", "content_length",
+        "verified", "digester", "digest_pos",
+        # typed headers, set on first access
+        "_type", "_date", "_content_type", "_record_id", "_warcinfo_id")
+
+    def __init__(self, warc_reader, headers, block_content_pos, block_pos=None):
         self.warc_reader = warc_reader
+        self.block_pos = block_pos # where the record (its WARC headers) starts
         self.block_content_pos = block_content_pos
         self.read_offset = 0
         self.headers = headers
-        self.content_length = int(headers["Content-Length"][0])
-    
+        self.content_length = int(headers.get_raw("Content-Length"))
+        # True once the digests have been checked
+        self.verified = None
+        self.digester = None
+        if warc_reader.verify_digests:
+            self._init_digester()
+
+    def _init_digester(self):
+        block_digest = self.headers.get_raw("WARC-Block-Digest")
+        expected = parse_digest(block_digest.decode()) if block_digest is not None else None
+        if expected is None: # missing or unsupported, nothing to check
+            return
+        record_type = self.headers.get_raw("WARC-Type")
+        content_type = self.headers.get_raw("Content-Type")
+        self.digester = RecordDigester(expected[0], has_http_payload(
+            record_type.decode() if record_type is not None else None,
+            content_type.decode() if content_type is not None else None))
+        self.digest_pos = 0
+        if self.content_length == 0:
+            self._check_digests(b"", 0)
+
+    def _check_digests(self, data:bytes, at:int):
+        """ hashes the data as it is read (in order), checks the digests once the whole block was read """
+        if not at <= self.digest_pos <= at + len(data):
+            return
+        self.digester.update(data[self.digest_pos - at:])
+        self.digest_pos = at + len(data)
+        if self.digest_pos != self.content_length:
+            return
+
+        digester = self.digester
+        self.digester = None
+        for header, computed in (("WARC-Block-Digest", digester.block_hash), ("WARC-Payload-Digest", digester.payload_hash)):
+            value = self.headers.get_raw(header)
+            if value is None or computed is None or (header == "WARC-Payload-Digest" and not digester.in_payload):
+                continue
+            expected = parse_digest(value.decode())
+            if expected is None or expected[0] != digester.algorithm:
+                continue
+            if expected[1] != computed.digest():
+                self.verified = False
+                raise DigestMismatchError(f"'{header}' doesn't match the record's content")
+        self.verified = True
+
     def read(self, nread=None):
         unread_data = self.content_length - self.read_offset
 
@@ -67,103 +355,332 @@ class WarcBlock(object):
             nread = unread_data 
 
         ret = self.warc_reader.read_at(nread, self.block_content_pos + self.read_offset)
+        if self.digester is not None:
+            self._check_digests(ret, self.read_offset)
         self.read_offset += len(ret)
         return ret
 
-    def get_as_stream(self):
-        return BytesIO(self.warc_reader.read_at(self.content_length, self.block_content_pos))
+    def get_as_stream(self, buffer_size:int=STREAM_BUFFER_SIZE) -> BufferedIOBase:
+        """
+        Returns a buffered read-only stream over the body (read(), readline(), readinto(), peek(), iteration),
+        data is read from the archive as the stream is consumed, so it can be used on big blocks.
+        With use_mmap=True, the stream reads straight from the map (read() returns memoryviews, like WarcBlock.read()).
+        NOTE: for non-seekable files, the stream must be consumed before reading the next block.
+        """
+        if self.warc_reader.map is not None:
+            return WarcBlockMapStream(self)
+        return BufferedReader(WarcBlockStream(self), buffer_size)
+
+    def get_http_payload(self) -> HttpPayload:
+        """ returns an HttpPayload (lazily parsed) view of a request/response block """
+        return HttpPayload(self)
 
-    type=property(_get_header("WARC-Type", True))
-    date=property(_get_header("WARC-Date", True, datetime.fromisoformat))
-    content_type=property(_get_header("Content-Type", False))
-    record_id=property(_get_header("WARC-Record-ID", True, _url_header_sanitizer))
-    warcinfo_id=property(_get_header("WARC-Warcinfo-ID", False, _url_header_sanitizer))
+    type=property(_get_header("WARC-Type", True, cache="_type"))
+    date=property(_get_header("WARC-Date", True, datetime.fromisoformat, "_date"))
+    content_type=property(_get_header("Content-Type", False, cache="_content_type"))
+    record_id=property(_get_header("WARC-Record-ID", True, _url_header_sanitizer, "_record_id"))
+    warcinfo_id=property(_get_header("WARC-Warcinfo-ID", False, _url_header_sanitizer, "_warcinfo_id"))
 
 class WarcReader(object):
-    def __init__(self, file:[str|BytesIO], compressed=None):
+    def __init__(self, file:[str|BytesIO], compressed=None, use_mmap=False, verify_digests=False, skip_corrupt=False):
+        # if True, blocks' digests are checked as they are read, DigestMismatchError is raised when they don't match
+        self.verify_digests = verify_digests
+        # if True, corrupted data is skipped until the next record (and member for compressed files)
+        # instead of raising, the (start, end) positions of what was skipped are added to skipped.
+        self.skip_corrupt = skip_corrupt
+        self.skipped = []
         self.fp = None
+        self.raw_fp = None
+        self.map = None
+        self.skipbuf = None # reused by _discard()
         if isinstance(file, str):
             self.is_fp_self_managed = True
             self.fp = open(file, "rb")
             if compressed is None and file.endswith(".gz"):
                 compressed = True
+            elif compressed is None and file.endswith(".zst"):
+                compressed = "zstd"
         else:
             self.is_fp_self_managed = False
             self.fp = file
 
-        # Gzip python API assume the underlying file is seekable
-        # So we need to check the seekableness before sending it to gzip
+        self.raw_fp = self.fp
+        self.is_compressed = bool(compressed)
         self.is_seekable = self.fp.seekable()
+        if compressed == "zstd":
+            self.fp = SeekableZstdReader(self.fp)
+        elif compressed:
+            # keeps track of gzip members so seeking back doesn't restart from the beginning
+            self.fp = SeekableGZipReader(self.fp)
         if compressed:
-            self.fp = gzip.GzipFile(fileobj=self.fp)
+            self.fp.resync = skip_corrupt
         
         if self.is_seekable:
             self.current_pos = self.fp.tell()
         else:
             self.current_pos = 0
         self.next_block = self.current_pos
-        
 
-    def get_next_block(self):
-        headers = b""
+        # data read ahead of the headers, starts at buf_pos and ends at current_pos
+        # what is before buf_start (i.e. previous records) is considered as consumed
+        self.buf = b""
+        self.buf_pos = self.current_pos
+        self.buf_start = self.current_pos
+
+        if use_mmap:
+            if compressed:
+                raise ValueError("mmap can't be used on compressed files")
+            # the whole file is the buffer, blocks' reads return memoryviews of it
+            try:
+                fileno = self.fp.fileno()
+            except (AttributeError, OSError): # io.UnsupportedOperation for BytesIO
+                fileno = None
+            if fileno is None or not stat.S_ISREG(os.fstat(fileno).st_mode):
+                raise ValueError("use_mmap requires a real file")
+            if os.fstat(fileno).st_size == 0: # can't be mapped
+                self.map = b""
+            else:
+                self.map = mmap.mmap(fileno, 0, access=mmap.ACCESS_READ)
+            self.view = memoryview(self.map)
+            self.buf = self.map
+            self.buf_pos = self.buf_start = 0
+            self.current_pos = len(self.map)
+
+    def _fill(self, nread:int) -> int:
+        """ appends up to nread bytes to the buffer, returns the number of bytes read """
+        data = self.fp.read(nread)
+        self.buf += data
+        self.current_pos += len(data)
+        return len(data)
+
+    @property
+    def skipped_members(self) -> list:
+        """ (start, end) offsets in the underlying file of the corrupted members skipped (see skip_corrupt) """
+        return self.fp.skipped if self.is_compressed else []
 
+    def _resync(self, corrupted_pos:int):
+        """ skips to the next record marker after corrupted_pos, searching big chunks at once """
+        if self.map is not None:
+            end = self.map.find(RECORD_MARKER, corrupted_pos + 1)
+            if end == -1:
+                end = len(self.map)
+        else:
+            self.skip_to(corrupted_pos)
+            searched = corrupted_pos + 1 - self.buf_pos
+            while True:
+                idx = self.buf.find(RECORD_MARKER, searched)
+                if idx != -1:
+                    end = self.buf_pos + idx
+                    break
+                # the marker may be split between two reads
+                keep = min(len(self.buf), max(searched, len(self.buf) - len(RECORD_MARKER) + 1))
+                self.buf = self.buf[keep:]
+                self.buf_pos = self.buf_start = self.buf_pos + keep
+                searched = max(0, searched - keep)
+                if self._fill(RESYNC_READ_SIZE) == 0:
+                    end = self.current_pos
+                    break
+
+        if self.skipped and self.skipped[-1][1] == corrupted_pos:
+            corrupted_pos = self.skipped.pop()[0]
+        self.skipped.append((corrupted_pos, end))
+        self.next_block = end
+
+    def _next_raw_header(self) -> [tuple|None]:
+        """ finds the next record, returns its (unparsed) header and its position, None if there is no more record """
+        while True:
+            try:
+                return self._read_raw_header()
+            except InvalidWarcError:
+                if not self.skip_corrupt:
+                    raise
+                self._resync(self.next_block)
+
+    def _read_raw_header(self) -> [tuple|None]:
         self.skip_to(self.next_block)
 
+        start = searched = self.next_block - self.buf_pos
         while True:
-            tmp = self.fp.readline()
+            if len(self.buf) - start >= 10 and self.buf[start:start+10] != b"WARC/1.1\r\n":
+                raise InvalidWarcError(f"invalid WARC header: {self.buf[start:start+16]}")
+
+            end = self.buf.find(b"\r\n\r\n", searched)
+            if end != -1:
+                break
 
-            if headers == b"" and tmp == b"": # no block anymore
+            if self.map is None:
+                # drop what is before the record before reading more
+                self.buf = self.buf[start:]
+                self.buf_pos = self.buf_start = self.buf_pos + start
+                start = 0
+                searched = max(0, len(self.buf) - 3)
+                if self._fill(HEADER_READ_SIZE) != 0:
+                    continue
+
+            if len(self.buf) <= start: # no block anymore
                 return None
+            raise InvalidWarcError(f"truncated WARC header: {self.buf[start:start+16]}")
 
-            if headers == b"" and tmp != b"WARC/1.1\r\n":
-                raise InvalidWarcError(f"invalid WARC header: {tmp}")
+        block_pos = self.buf_pos + start
+        if self.map is None:
+            self.buf_start = block_pos
+        return (self.buf[start:end + 4], block_pos)
 
-            headers += tmp
-            if tmp == b"\r\n" or tmp == b"":
-                break
+    def get_next_block(self):
+        while True:
+            ret = self._next_raw_header()
+            if ret is None:
+                return None
+            raw, block_pos = ret
+            try:
+                headers = _parse_headers(raw)
+                content_length = _content_length(headers.get_raw("Content-Length"))
+            except (InvalidWarcError, ValueError):
+                if not self.skip_corrupt:
+                    raise
+                self._resync(block_pos)
+                continue
 
-        self.current_pos += len(headers)
-        headers_dict = {}
-        for header in  headers.splitlines()[1:]:
-            if header == b"":
-                break
-            shdr = header.split(b": ")
-            if len(shdr) == 1:
-                raise InvalidWarcError(f"invalid WARC header: {header}")
-            k = shdr[0].decode()
-            v = (b": ".join(shdr[1:])).decode()
-            headers_dict[k] = headers_dict[k].append(v) if k in headers_dict else [v]
+            content_pos = block_pos + len(raw)
+            self.next_block = content_pos + content_length + 4
+            return WarcBlock(self, headers, content_pos, block_pos)
+
+    def iter_records(self, types:[set|None]=None, url_prefix:[str|None]=None, filter=None):
+        """
+        Iterates over the next blocks matching every given condition:
+        types: the WARC-Types to keep (e.g. {"response"}), url_prefix: the WARC-Target-URI's prefix,
+        filter: a function called with the raw header (bytes, from 'WARC/1.1' to the empty line).
+        Conditions are checked against the raw header, so the other records are skipped
+        without being parsed.
+        """
+        if types is not None:
+            types = {t.encode() for t in types}
+        if url_prefix is not None:
+            url_prefix = url_prefix.encode()
+
+        while True:
+            ret = self._next_raw_header()
+            if ret is None:
+                return
+            raw, block_pos = ret
 
-        if not "Content-Length" in headers_dict:
-            raise InvalidWarcError("current record doesn't have 'Content-Length' header")
+            selected = ((types is None or _raw_header_value(raw, b"WARC-Type") in types)
+                and (url_prefix is None or (_raw_header_value(raw, b"WARC-Target-URI") or b"").lstrip(b"<").startswith(url_prefix))
+                and (filter is None or filter(raw)))
+            try:
+                if selected:
+                    headers = _parse_headers(raw)
+                    content_length = headers.get_raw("Content-Length")
+                else:
+                    content_length = _raw_header_value(raw, b"Content-Length")
+                self.next_block = block_pos + len(raw) + _content_length(content_length) + 4
+            except (InvalidWarcError, ValueError):
+                if not self.skip_corrupt:
+                    raise
+                self._resync(block_pos)
+                continue
 
-        self.next_block = self.current_pos + int(headers_dict["Content-Length"][0]) + 4
-        return WarcBlock(self, headers_dict, self.current_pos)
+            if selected:
+                yield WarcBlock(self, headers, block_pos + len(raw), block_pos)
+
+    def read_record_at(self, offset:int, length:[int|None]=None) -> WarcBlock:
+        """
+        Reads the record starting at the given offset without touching the reader's state.
+        The offset is the compressed_pos returned by WarcWriter.write_block() for compressed files
+        (only the gzip member holding the record is decompressed), the uncompressed_pos otherwise.
+        The record's total (compressed) length can be given to fetch it in a single read.
+        """
+        if not self.is_seekable:
+            raise NotSeekableError("read_record_at() needs a seekable file")
+
+        if self.is_compressed:
+            record = ReadMember(self.raw_fp, offset, length, self.fp.new_decompressor())
+            return WarcReader(BytesIO(record), compressed=False, verify_digests=self.verify_digests).get_next_block()
+
+        headers = b""
+        end = -1
+        while end == -1:
+            nread = HEADER_READ_SIZE if length is None else min(HEADER_READ_SIZE, length - len(headers))
+            tmp = ReadAt(self.raw_fp, nread, offset + len(headers)) if nread > 0 else b""
+            if tmp == b"":
+                raise InvalidWarcError(f"truncated WARC header at {offset}")
+            if headers == b"" and not tmp.startswith(b"WARC/1.1\r\n"):
+                raise InvalidWarcError(f"invalid WARC header: {tmp[:16]}")
+            headers += tmp
+            end = headers.find(b"\r\n\r\n", max(0, len(headers) - len(tmp) - 3))
+
+        headers = headers[:end + 4]
+        return WarcBlock(self, _parse_headers(headers), offset + len(headers), offset)
+
+    def get_compressed_offset(self, pos:int) -> [int|None]:
+        """
+        Returns the offset in the underlying file of the (uncompressed) position.
+        For compressed files it is only known for the start of gzip members already read.
+        """
+        if self.is_compressed:
+            return self.fp.compressed_offset(pos)
+        return pos
 
     def skip_to(self, at):
-        if at == self.current_pos:
+        if self.map is not None:
+            return
+        if self.buf_start <= at <= self.current_pos: # already buffered
             return
-        if at < self.current_pos:
+        if at < self.buf_start and not self.is_seekable:
             raise NotSeekableError("file not seekable (you can't read previous blocks once readed/skipped)")
-        
-        skip_nbytes = at - self.current_pos
 
-        while skip_nbytes > 0:
-            self.fp.read(MAX_SKIPBUF if skip_nbytes > MAX_SKIPBUF else skip_nbytes)
-            skip_nbytes -= MAX_SKIPBUF
-        
+        if self.is_seekable or self.is_compressed:
+            # SeekableGZipReader can seek forward on non-seekable files,
+            # data is decompressed and discarded without being buffered.
+            self.fp.seek(at)
+        else:
+            self._discard(at - self.current_pos)
+
         self.current_pos = at
+        self.buf = b""
+        self.buf_pos = self.buf_start = at
+
+    def _discard(self, skip_nbytes:int):
+        """ reads and throws skip_nbytes bytes away, reusing the same buffer """
+        if not hasattr(self.fp, 'readinto'):
+            while skip_nbytes > 0:
+                data = self.fp.read(min(skip_nbytes, MAX_SKIPBUF))
+                if not data:
+                    return
+                skip_nbytes -= len(data)
+            return
+
+        if self.skipbuf is None:
+            self.skipbuf = memoryview(bytearray(MAX_SKIPBUF))
+        while skip_nbytes > 0:
+            nread = self.fp.readinto(self.skipbuf[:skip_nbytes] if skip_nbytes < MAX_SKIPBUF else self.skipbuf)
+            if not nread:
+                return
+            skip_nbytes -= nread
 
     def read_at(self, nread, at):
+        if self.map is not None:
+            return self.view[at:at+nread]
+
+        start = at - self.buf_pos
+        if at >= self.buf_start and at + nread <= self.current_pos:
+            return self.buf[start:start+nread]
+
         if self.is_seekable:
             self.fp.seek(at)
             ret = self.fp.read(nread)
             self.fp.seek(self.current_pos)
             return ret
         else:
-            self.skip_to(at)
-            ret = self.fp.read(nread)
+            if self.buf_start <= at <= self.current_pos:
+                ret = self.buf[start:]
+                ret += self.fp.read(nread - len(ret))
+            else:
+                self.skip_to(at)
+                ret = self.fp.read(nread)
             self.current_pos = len(ret) + at
+            self.buf = b""
+            self.buf_pos = self.buf_start = self.current_pos
             return ret
 
     # Magic Methods
@@ -178,5 +695,11 @@ class WarcReader(object):
         return self
 
     def __del__(self):
+        if isinstance(self.map, mmap.mmap):
+            self.view.release()
+            try:
+                self.map.close()
+            except BufferError: # blocks' data still used, it will be unmapped once released
+                pass
         if self.is_fp_self_managed and self.fp is not None:
             self.fp.close()
\ No newline at end of file
@@ -0,0 +1,214 @@
+# Copyright (C) 2025 5IGI0 / Ethan L. C. Lorenzetti
+#
+# This file is part of PyWarc.
+# 
+# PyWarc is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License,
+# or (at your option) any later version.
+#
+# PyWarc is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+# without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License along with PyWarc.
+# If not, see <https://www.gnu.org/licenses/>. 
+
+
+import os
+
+from .compression import SeekableGZipReader, SeekableZstdReader, ZSTD_FRAME_MAGIC, GZIP_MEMBER_MAGIC, DECOMPRESSION_ERRORS
+from .reader import InvalidWarcError, RECORD_MARKER, _raw_header_value
+
+CHECKPOINT_SUFFIX = ".checkpoint"
+RECOVERY_READ_SIZE = 1 << 18
+MAX_HEADER_SIZE = 1 << 20
+# what stops the scan: everything after the last complete record is considered lost
+CORRUPTION_ERRORS = (InvalidWarcError, EOFError) + DECOMPRESSION_ERRORS
+
+class _RecordTracker(object):
+    """ follows the records of an uncompressed stream without keeping their bodies """
+    def __init__(self):
+        self.pos = 0 # how much was fed
+        self.header = b""
+        self.remaining = 0 # bytes left in the current record's body and trailer
+        self.ends = [] # where the records fed so far end, not yet consumed by the caller
+        self.last_end = 0 # where the last complete record ends, still right if feed() raised
+
+    def feed(self, data:bytes):
+        pos = 0
+        while pos < len(data):
+            if self.remaining:
+                n = min(self.remaining, len(data) - pos)
+                pos += n
+                self.remaining -= n
+                if self.remaining == 0:
+                    self.last_end = self.pos + pos
+                    self.ends.append(self.last_end)
+                continue
+
+            searched = max(0, len(self.header) - 3)
+            previous = len(self.header)
+            self.header += data[pos:pos+MAX_HEADER_SIZE]
+            if not self.header.startswith(b"WARC/1.1\r\n"[:len(self.header)]):
+                raise InvalidWarcError(f"invalid WARC header: {self.header[:16]}")
+
+            end = self.header.find(b"\r\n\r\n", searched)
+            if end == -1:
+                if len(self.header) >= MAX_HEADER_SIZE:
+                    raise InvalidWarcError("WARC header too big")
+                pos = len(data)
+                break
+
+            length = _raw_header_value(self.header[:end+4], b"Content-Length")
+            if length is None or not length.isdigit():
+                raise InvalidWarcError("current record doesn't have a valid 'Content-Length' header")
+            pos += end + 4 - previous
+            self.header = b""
+            self.remaining = int(length) + 4
+        self.pos += len(data)
+
+def read_checkpoint(path:str) -> [tuple|None]:
+    """ returns the (uncompressed_pos, compressed_pos) saved by write_checkpoint(), None if there is none """
+    try:
+        with open(path, "r") as fp:
+            upos, cpos = fp.read().split()
+        return (int(upos), int(cpos))
+    except (OSError, ValueError):
+        return None
+
+def write_checkpoint(path:str, uncompressed_pos:int, compressed_pos:int):
+    """ atomically replaces the checkpoint file """
+    with open(path + ".tmp", "w") as fp:
+        fp.write(f"{uncompressed_pos} {compressed_pos}\n")
+    os.replace(path + ".tmp", path)
+
+def _looks_like_record(fp, pos:int, compressed) -> bool:
+    """ whether something written by us (maybe truncated) starts at pos """
+    fp.seek(pos)
+    head = fp.read(10)
+    if not head:
+        return True
+    if compressed == "zstd":
+        expected = ZSTD_FRAME_MAGIC
+    elif compressed:
+        expected = GZIP_MEMBER_MAGIC
+    else:
+        expected = b"WARC/1.1\r\n"
+    return head.startswith(expected) or expected.startswith(head)
+
+def _scan_plain(fp, start:int) -> int:
+    fp.seek(start)
+    tracker = _RecordTracker()
+    try:
+        while True:
+            data = fp.read(RECOVERY_READ_SIZE)
+            if not data:
+                break
+            tracker.feed(data)
+            tracker.ends.clear()
+    except InvalidWarcError:
+        pass
+    return start + tracker.last_end
+
+def _scan_compressed(fp, compressed, start_upos:int, start_cpos:int) -> (int, int):
+    fp.seek(0)
+    # only used for its decompression hooks (and the zstd dictionary at the start of the file)
+    reader = SeekableZstdReader(fp) if compressed == "zstd" else SeekableGZipReader(fp)
+    if start_cpos != 0:
+        fp.seek(start_cpos)
+    reader.pending = b""
+    read_pos = fp.tell()
+
+    # a record is complete once both its data and its member are
+    end = (0, read_pos)
+    tracker = _RecordTracker()
+    member_started = False
+    need_data = True
+    try:
+        while True:
+            if need_data:
+                data = fp.read(RECOVERY_READ_SIZE)
+                if not data:
+                    break
+                read_pos += len(data)
+                reader.pending += data
+
+            if not member_started:
+                need_data = not reader._skip_padding()
+                if need_data:
+                    continue
+                member_started = True
+                reader.decompressor = reader.new_decompressor()
+
+            data, member_ended = reader._decompress()
+            tracker.feed(data)
+            if member_ended:
+                member_started = False
+                if tracker.ends and tracker.ends[-1] == tracker.pos:
+                    end = (tracker.pos, read_pos - len(reader.pending))
+                tracker.ends.clear()
+            need_data = not reader.pending
+    except CORRUPTION_ERRORS:
+        pass
+    return (start_upos + end[0], end[1])
+
+def _find_record_after(fp, pos:int, compressed) -> [int|None]:
+    """ returns where a complete record (in its member) starts after the corrupted data at pos, None if there is none """
+    magic = ZSTD_FRAME_MAGIC if compressed == "zstd" else GZIP_MEMBER_MAGIC if compressed else RECORD_MARKER
+    searched = pos + 1
+    while True:
+        fp.seek(searched)
+        chunk = fp.read(RECOVERY_READ_SIZE)
+        idx = chunk.find(magic)
+        if idx == -1:
+            if len(chunk) < RECOVERY_READ_SIZE:
+                return None
+            searched += len(chunk) - len(magic) + 1
+            continue
+
+        candidate = searched + idx
+        if compressed:
+            end = _scan_compressed(fp, compressed, 0, candidate)[1]
+        else:
+            end = _scan_plain(fp, candidate)
+        if end > candidate:
+            return candidate
+        searched = candidate + 1
+
+def recover_warc(path:str, compressed=None) -> (int, int):
+    """
+    Removes the interrupted record (if any) at the end of a warc file, so records can be appended again.
+    The scan starts at the position saved in the checkpoint file (see WarcWriter(recover=True))
+    when it is still valid, otherwise at the start of the file.
+    Returns the (uncompressed_pos, compressed_pos) of the end of the last complete record.
+    InvalidWarcError is raised (and nothing is removed) if complete records follow the corrupted data,
+    i.e. the file is damaged in the middle rather than at its end.
+    """
+    if compressed is None and path.endswith(".gz"):
+        compressed = True
+    elif compressed is None and path.endswith(".zst"):
+        compressed = "zstd"
+
+    try:
+        fp = open(path, "r+b")
+    except FileNotFoundError:
+        return (0, 0)
+
+    with fp:
+        size = fp.seek(0, os.SEEK_END)
+        start = read_checkpoint(path + CHECKPOINT_SUFFIX)
+        if start is None or start[1] > size or not _looks_like_record(fp, start[1], compressed):
+            start = (0, 0) # stale (or no) checkpoint
+
+        if compressed:
+            upos, cpos = _scan_compressed(fp, compressed, *start)
+        else:
+            upos = cpos = _scan_plain(fp, start[1])
+
+        if cpos < size:
+            following = _find_record_after(fp, cpos, compressed)
+            if following is not None:
+                raise InvalidWarcError(f"{path} is corrupted at {cpos} but records follow (at {following}), not truncating it")
+            fp.truncate(cpos)
+    return (upos, cpos)
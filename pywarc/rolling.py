@@ -0,0 +1,150 @@
+# Copyright (C) 2025 5IGI0 / Ethan L. C. Lorenzetti
+#
+# This file is part of PyWarc.
+# 
+# PyWarc is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License,
+# or (at your option) any later version.
+#
+# PyWarc is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+# without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License along with PyWarc.
+# If not, see <https://www.gnu.org/licenses/>. 
+
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from uuid import uuid4
+
+from .writer import WarcWriter
+
+DEFAULT_MAX_SIZE = 1 << 30
+# suffix of the files being written
+OPEN_SUFFIX = ".open"
+
+class RollingWarcWriter(object):
+    """
+    Writes records to a series of files named <prefix>-<UTC timestamp>-<run id>-<serial>.warc[.gz|.zst],
+    rolling over to a new one (with its own warcinfo record) before a record once the current file
+    is bigger than max_size bytes or older than max_age seconds.
+    Files are written with the ".open" suffix. Finishing them (close, fsync and rename) is done on a
+    background thread which then calls on_finished(path), it also opens the next file in advance.
+    Errors raised while finishing a file (or by on_finished) don't stop the writer, the first one is raised by close().
+    The run id is random, so writers (e.g. a restarted crawler) sharing a directory don't
+    overwrite each other's files. Other keyword arguments are given to each WarcWriter.
+    """
+    def __init__(
+        self, directory:str, prefix:str="pywarc",
+        max_size:[int|None]=DEFAULT_MAX_SIZE, max_age:[float|None]=None,
+        compress:[bool|str]=True, on_finished=None, **writer_kwargs
+    ):
+        self.directory = directory
+        self.prefix = prefix
+        self.max_size = max_size
+        self.max_age = max_age
+        self.compress = compress
+        self.on_finished = on_finished
+        self.writer_kwargs = writer_kwargs
+        self.suffix = ".warc.zst" if compress == "zstd" else ".warc.gz" if compress else ".warc"
+        self.run_id = uuid4().hex[:8]
+
+        # one thread so files are finished (and given to on_finished) in order
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.serial = 0
+        self.writer = None
+        self.finishing = [] # futures of the files being finished
+        self.error = None # first error raised while finishing a file
+        self.next_writer = self.executor.submit(self._open, self.serial)
+        self._roll()
+
+    def _open(self, serial:int) -> (WarcWriter, object, str):
+        tmp_path = os.path.join(self.directory, f"{self.prefix}-{self.run_id}-{serial:05d}{self.suffix}{OPEN_SUFFIX}")
+        fp = open(tmp_path, "xb") # never truncates a file left by another writer
+        return (WarcWriter(fp, compress=self.compress, **self.writer_kwargs), fp, tmp_path)
+
+    def _finish(self, writer:WarcWriter, fp, tmp_path:str, path:str):
+        writer.flush()
+        fp.flush()
+        os.fsync(fp.fileno())
+        writer.close()
+        os.rename(tmp_path, path)
+        if self.on_finished is not None:
+            self.on_finished(path)
+
+    def _roll(self):
+        """ finishes the current file (in background) and switches to the next one """
+        if self.writer is not None:
+            self.finishing.append(self.executor.submit(self._finish, self.writer, self.fp, self.tmp_path, self.path))
+            self.writer = None
+            self._reap()
+
+        self.writer, self.fp, self.tmp_path = self.next_writer.result()
+        self.path = os.path.join(self.directory, f"{self.prefix}-{time.strftime('%Y%m%d%H%M%S', time.gmtime())}-{self.run_id}-{self.serial:05d}{self.suffix}")
+        self.opened_at = time.monotonic()
+        self.is_empty = True
+        self.serial += 1
+        self.next_writer = self.executor.submit(self._open, self.serial)
+
+    def _reap(self):
+        """ forgets the finished files, keeping the first error for close() """
+        pending = []
+        for finishing in self.finishing:
+            if not finishing.done():
+                pending.append(finishing)
+            elif finishing.exception() is not None and self.error is None:
+                self.error = finishing.exception()
+        self.finishing = pending
+
+    def _before_record(self):
+        """ rolls over if needed, a file has at least one record and records are never split """
+        if self.writer.body_remaining_length != 0: # let the writer raise PreviousBlockNotTerminatedError
+            return
+        if not self.is_empty and (
+            (self.max_size is not None and self.fp.tell() >= self.max_size)
+            or (self.max_age is not None and time.monotonic() - self.opened_at >= self.max_age)):
+            self._roll()
+        self.is_empty = False
+
+    @property
+    def current_path(self) -> str:
+        """ final path of the file being written (it has the ".open" suffix until it is finished) """
+        return self.path
+
+    def write_block(self, record_type:str, content:bytes, **kwargs) -> (int, int):
+        """ same as WarcWriter.write_block(), positions are relative to current_path """
+        self._before_record()
+        return self.writer.write_block(record_type, content, **kwargs)
+
+    def start_block(self, record_type:str, content_length:int, **kwargs) -> (int, int):
+        self._before_record()
+        return self.writer.start_block(record_type, content_length, **kwargs)
+
+    def write_block_body(self, content:bytes):
+        self.writer.write_block_body(content)
+
+    def write_blocks(self, records):
+        """ same as WarcWriter.write_blocks(), they are all written in the current file """
+        self._before_record()
+        return self.writer.write_blocks(records)
+
+    def flush(self):
+        self.writer.flush()
+
+    def close(self):
+        """ finishes the current file and waits for every file to be finished """
+        if self.writer is None:
+            return
+        self.finishing.append(self.executor.submit(self._finish, self.writer, self.fp, self.tmp_path, self.path))
+        self.writer = None
+
+        # the next file was opened in advance, it is not needed
+        writer, fp, tmp_path = self.next_writer.result()
+        writer.close()
+        os.remove(tmp_path)
+        self.executor.shutdown(wait=True)
+        self._reap()
+        if self.error is not None:
+            raise self.error
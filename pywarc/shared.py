@@ -0,0 +1,151 @@
+# Copyright (C) 2025 5IGI0 / Ethan L. C. Lorenzetti
+#
+# This file is part of PyWarc.
+# 
+# PyWarc is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License,
+# or (at your option) any later version.
+#
+# PyWarc is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+# without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License along with PyWarc.
+# If not, see <https://www.gnu.org/licenses/>. 
+
+
+from datetime import datetime
+from concurrent.futures import Future
+from tempfile import SpooledTemporaryFile
+from threading import Thread
+from queue import Queue
+from uuid import uuid4
+import shutil
+
+from .writer import WarcWriter, CurrentBlockOverflowError, SPILL_MAX_MEMORY
+
+DEFAULT_MAX_PENDING = 64
+
+class StagedRecord(object):
+    """
+    A record being written by one producer (see SharedWarcWriter.start_block()).
+    Its body is kept in memory (then on disk above SPILL_MAX_MEMORY bytes) and digested
+    as it is written, nothing touches the archive until commit().
+    """
+    def __init__(self, shared:"SharedWarcWriter", record_type:str, content_length:[int|None], record_id:[str|None], record_date:[datetime|None], record_headers:dict):
+        self.shared = shared
+        self.record_type = record_type
+        self.content_length = content_length
+        self.record_id = uuid4().urn if record_id is None else record_id
+        self.record_date = datetime.utcnow() if record_date is None else record_date
+        self.record_headers = record_headers
+        self.body = SpooledTemporaryFile(SPILL_MAX_MEMORY)
+        self.length = 0
+        writer = shared.writer
+        self.digester = writer._new_digester(record_type, record_headers) if writer._needs_digests(record_headers) else None
+
+    def write_block_body(self, content:bytes):
+        if self.content_length is not None and self.length + len(content) > self.content_length:
+            raise CurrentBlockOverflowError(f"current block overflows by {self.length + len(content) - self.content_length} bytes")
+        self.body.write(content)
+        if self.digester is not None:
+            self.digester.update(content)
+        self.length += len(content)
+
+    def commit(self) -> Future:
+        """ queues the record to be appended, returns a future of (uncompressed_pos, compressed_pos) """
+        if self.content_length is not None and self.length != self.content_length:
+            raise ValueError(f"staged block not terminated: {self.content_length - self.length} bytes missing")
+        if self.digester is not None:
+            self.record_headers = {**self.record_headers, **self.digester.digest_headers()}
+            self.digester = None
+        self.body.seek(0)
+        return self.shared._submit(self._append)
+
+    def _append(self, writer:WarcWriter) -> (int, int):
+        try:
+            ret = writer.start_block(self.record_type, self.length,
+                record_id=self.record_id, record_date=self.record_date, record_headers=self.record_headers)
+            if self.length != 0:
+                shutil.copyfileobj(self.body, _BodyWriter(writer))
+            return ret
+        finally:
+            self.body.close()
+
+    def discard(self):
+        self.body.close()
+
+class _BodyWriter(object):
+    """ file-like write() to WarcWriter.write_block_body() for shutil.copyfileobj() """
+    def __init__(self, writer:WarcWriter):
+        self.writer = writer
+
+    def write(self, data) -> int:
+        self.writer.write_block_body(data)
+        return len(data)
+
+class SharedWarcWriter(object):
+    """
+    Thread-safe front-end of a WarcWriter.
+    Producers stage complete records on their side (digests included), then a single
+    committer thread appends them one at a time, so records are never interleaved and
+    a producer never waits for another one's body to be written.
+    Offsets are returned as futures of (uncompressed_pos, compressed_pos).
+    At most max_pending records are waiting to be appended at once.
+    """
+    def __init__(self, writer:WarcWriter, max_pending:int=DEFAULT_MAX_PENDING):
+        self.writer = writer
+        self.queue = Queue(max_pending)
+        self.committer = Thread(target=self._commit, daemon=True)
+        self.committer.start()
+
+    def _commit(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                self.queue.task_done()
+                return
+
+            append, offsets = item
+            try:
+                offsets.set_result(append(self.writer))
+            except BaseException as e:
+                offsets.set_exception(e)
+            self.queue.task_done()
+
+    def _submit(self, append) -> Future:
+        if self.committer is None:
+            raise ValueError("write to a closed SharedWarcWriter")
+        offsets = Future()
+        self.queue.put((append, offsets))
+        return offsets
+
+    def write_block(self, record_type:str, content:bytes, **kwargs) -> Future:
+        # digests are computed by the producer
+        kwargs["record_headers"] = self.writer._with_digests(record_type, content, kwargs.get("record_headers", {}))
+        if kwargs.get("record_id") is None:
+            kwargs["record_id"] = uuid4().urn
+        if kwargs.get("record_date") is None:
+            kwargs["record_date"] = datetime.utcnow()
+        return self._submit(lambda writer: writer.write_block(record_type, content, **kwargs))
+
+    def start_block(self, record_type:str, content_length:[int|None]=None, record_id:[str|None]=None, record_date:[datetime|None]=None, record_headers:dict={}) -> StagedRecord:
+        """
+        Returns a StagedRecord to give the body to (write_block_body()), then commit().
+        content_length can be left to None if it is not known in advance (e.g. chunked bodies).
+        """
+        return StagedRecord(self, record_type, content_length, record_id, record_date, record_headers)
+
+    def flush(self):
+        """ waits for every committed record to be appended, then flushes the writer """
+        self.queue.join()
+        self.writer.flush()
+
+    def close(self):
+        if self.committer is None:
+            return
+        self.queue.put(None)
+        self.committer.join()
+        self.committer = None
+        self.writer.close()
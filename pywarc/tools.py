@@ -0,0 +1,213 @@
+# Copyright (C) 2025 5IGI0 / Ethan L. C. Lorenzetti
+#
+# This file is part of PyWarc.
+# 
+# PyWarc is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License,
+# or (at your option) any later version.
+#
+# PyWarc is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+# without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License along with PyWarc.
+# If not, see <https://www.gnu.org/licenses/>. 
+
+
+import argparse
+import os
+import sys
+
+from .reader import WarcReader, _raw_header_value, _content_length
+from .compression import ZSTD_DICT_MAGIC
+
+COPY_CHUNK = 1 << 20
+DEFAULT_SPLIT_SIZE = 1 << 30
+
+def _compression(path:str, compressed):
+    if compressed is None and path.endswith(".gz"):
+        return True
+    elif compressed is None and path.endswith(".zst"):
+        return "zstd"
+    return compressed
+
+def _copy_range(src, dst, start:int, end:int):
+    """ copies src's [start, end) to dst, in the kernel when possible """
+    dst.flush()
+    if hasattr(os, "copy_file_range"):
+        try:
+            while start < end:
+                copied = os.copy_file_range(src.fileno(), dst.fileno(), end - start, start)
+                if copied == 0:
+                    break
+                start += copied
+            dst.seek(0, os.SEEK_END)
+            return
+        except OSError:
+            dst.seek(0, os.SEEK_END) # not supported (e.g. across filesystems), copies what is left
+
+    src.seek(start)
+    while start < end:
+        data = src.read(min(COPY_CHUNK, end - start))
+        if not data:
+            break
+        dst.write(data)
+        start += len(data)
+
+def _iter_records(path:str, compressed) -> tuple:
+    """
+    Returns the end of the file's preamble (e.g. zstd dictionary) and an iterator
+    over the (raw header, start, end) of its records, start/end being offsets in the file.
+    Bodies are skipped, not parsed.
+    """
+    reader = WarcReader(path, compressed=compressed)
+    preamble = reader.get_compressed_offset(0)
+
+    def records():
+        previous = None
+        while True:
+            ret = reader._next_raw_header()
+            pos = reader.next_block if ret is None else ret[1]
+            offset = reader.get_compressed_offset(pos)
+            if offset is None:
+                raise ValueError("records are not stored in separate gzip members, they can't be copied as is")
+            if previous is not None:
+                yield (previous[0], previous[1], offset)
+            if ret is None:
+                return
+
+            raw = ret[0]
+            reader.next_block = pos + len(raw) + _content_length(_raw_header_value(raw, b"Content-Length")) + 4
+            previous = (raw, offset)
+
+    return (preamble, records())
+
+def merge_warcs(inputs:list, output:str, compressed=None) -> int:
+    """
+    Concatenates warc files (all compressed the same way) into output, returns its size.
+    Files are copied as is: gzip members (and zstd frames) can be concatenated, but zstd
+    files having a dictionary can't since it is only looked for at the start of the file.
+    """
+    with open(output, "wb") as dst:
+        for path in inputs:
+            with open(path, "rb") as src:
+                if _compression(path, compressed) == "zstd" and int.from_bytes(src.read(4), "little") == ZSTD_DICT_MAGIC:
+                    raise ValueError(f"{path}: zstd files with a dictionary can't be merged")
+                _copy_range(src, dst, 0, os.fstat(src.fileno()).st_size)
+        return dst.tell()
+
+def split_warc(input:str, output_prefix:str, max_size:int=DEFAULT_SPLIT_SIZE, compressed=None) -> list:
+    """
+    Splits a warc file into <output_prefix>-<serial>.warc[.gz|.zst] files of at most max_size bytes
+    (unless a record is bigger), records' members are copied as is.
+    The preamble (zstd dictionary) and the first record, if it is a warcinfo, are repeated at the start
+    of every file. Returns the paths of the files.
+    """
+    compressed = _compression(input, compressed)
+    suffix = ".warc.zst" if compressed == "zstd" else ".warc.gz" if compressed else ".warc"
+    preamble, records = _iter_records(input, compressed)
+    repeated = [(0, preamble)] # ranges copied at the start of every file
+    header_size = preamble
+    paths = []
+    dst = None
+
+    with open(input, "rb") as src:
+        try:
+            for i, (raw, start, end) in enumerate(records):
+                if dst is not None and dst.tell() > header_size and dst.tell() + end - start > max_size:
+                    dst.close()
+                    dst = None
+                if dst is None:
+                    paths.append(f"{output_prefix}-{len(paths):05d}{suffix}")
+                    dst = open(paths[-1], "wb")
+                    for range_start, range_end in repeated:
+                        _copy_range(src, dst, range_start, range_end)
+
+                _copy_range(src, dst, start, end)
+                if i == 0 and _raw_header_value(raw, b"WARC-Type") == b"warcinfo":
+                    repeated.append((start, end))
+                    header_size = dst.tell()
+        finally:
+            if dst is not None:
+                dst.close()
+    return paths
+
+def filter_warc(
+    input:str, output:str, types:[set|None]=None, url_prefix:[str|None]=None,
+    filter=None, keep_warcinfo:bool=True, compressed=None
+) -> int:
+    """
+    Copies the records of input matching every given condition (see WarcReader.iter_records())
+    to output, their members are copied as is. warcinfo records are kept unless keep_warcinfo is False.
+    Returns the number of records copied.
+    """
+    compressed = _compression(input, compressed)
+    if types is not None:
+        types = {t.encode() for t in types}
+    if url_prefix is not None:
+        url_prefix = url_prefix.encode()
+
+    preamble, records = _iter_records(input, compressed)
+    copied = 0
+    with open(input, "rb") as src, open(output, "wb") as dst:
+        _copy_range(src, dst, 0, preamble)
+        # adjacent records are copied at once
+        run_start = run_end = None
+        for raw, start, end in records:
+            record_type = _raw_header_value(raw, b"WARC-Type")
+            if not (keep_warcinfo and record_type == b"warcinfo"):
+                if types is not None and record_type not in types:
+                    continue
+                if url_prefix is not None and not (_raw_header_value(raw, b"WARC-Target-URI") or b"").lstrip(b"<").startswith(url_prefix):
+                    continue
+                if filter is not None and not filter(raw):
+                    continue
+
+            copied += 1
+            if run_end != start:
+                if run_start is not None:
+                    _copy_range(src, dst, run_start, run_end)
+                run_start = start
+            run_end = end
+        if run_start is not None:
+            _copy_range(src, dst, run_start, run_end)
+    return copied
+
+def main(argv:[list|None]=None):
+    parser = argparse.ArgumentParser(prog="pywarc", description="copies warc records without recompressing them")
+    parser.add_argument("--compressed", choices=("gzip", "zstd", "none"), help="compression (default: from the file's suffix)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    merge_parser = commands.add_parser("merge", help="concatenates warc files")
+    merge_parser.add_argument("output")
+    merge_parser.add_argument("inputs", nargs="+")
+
+    split_parser = commands.add_parser("split", help="splits a warc file by size")
+    split_parser.add_argument("input")
+    split_parser.add_argument("output_prefix")
+    split_parser.add_argument("--max-size", type=int, default=DEFAULT_SPLIT_SIZE, help=f"files' maximum size in bytes (default: {DEFAULT_SPLIT_SIZE})")
+
+    filter_parser = commands.add_parser("filter", help="extracts some records of a warc file")
+    filter_parser.add_argument("input")
+    filter_parser.add_argument("output")
+    filter_parser.add_argument("--type", action="append", dest="types", help="WARC-Type to keep (can be repeated)")
+    filter_parser.add_argument("--url-prefix", help="WARC-Target-URI's prefix")
+    filter_parser.add_argument("--no-warcinfo", action="store_true", help="don't keep warcinfo records")
+
+    args = parser.parse_args(argv)
+    compressed = {None: None, "gzip": True, "zstd": "zstd", "none": False}[args.compressed]
+
+    if args.command == "merge":
+        print(f"{merge_warcs(args.inputs, args.output, compressed)} bytes written")
+    elif args.command == "split":
+        for path in split_warc(args.input, args.output_prefix, args.max_size, compressed):
+            print(path)
+    else:
+        copied = filter_warc(args.input, args.output,
+            types=set(args.types) if args.types else None, url_prefix=args.url_prefix,
+            keep_warcinfo=not args.no_warcinfo, compressed=compressed)
+        print(f"{copied} records copied")
+
+if __name__ == "__main__":
+    sys.exit(main())
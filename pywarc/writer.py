@@ -17,9 +17,17 @@
 from io import BytesIO
 from datetime import datetime
 from uuid import uuid4
+from concurrent.futures import Future
+from array import array
+from tempfile import SpooledTemporaryFile
+import os
+import shutil
 
 from .constants import PY_WARC_VERSION
-from .compression import SeekableGZipWriter, FakeSeekableWriter, MakeFakeTellable
+from .compression import SeekableGZipWriter, SeekableZstdWriter, ThreadedGZipWriter, FakeSeekableWriter, MakeFakeTellable, WriteParts, DEFAULT_ZSTD_LEVEL
+from .cdx import CdxjWriter
+from .digest import RecordDigester, has_http_payload
+from .recovery import recover_warc, write_checkpoint, CHECKPOINT_SUFFIX
 
 DEFAULT_META={
     "format": "WARC File Format 1.1",
@@ -30,6 +38,27 @@ DEFAULT_META={
 def _serialize_dict(d: dict) -> str:
     return ''.join([f"{k}: {v}\r\n" for k, v in d.items() if v is not None])
 
+def _serialize_block_header(record_type:str, content_length:int, record_id:str, record_date:datetime, warc_info_id:[str|None], record_headers:dict) -> bytes:
+    return ("WARC/1.1\r\n" + _serialize_dict({
+        "WARC-Type":      record_type,
+        "WARC-Record-ID": "<"+record_id+">",
+        "WARC-Warcinfo-ID": "<"+warc_info_id+">" if warc_info_id is not None else None,
+        "WARC-Date":      record_date.isoformat(timespec='seconds')+"Z",
+        **record_headers,
+        "Content-Length": content_length})+"\r\n").encode("utf8")
+
+def _serialize_warcinfo(software_name:str, software_version:str, warc_meta:dict) -> bytes:
+    actual_meta = {
+        "software": f"{software_name}/{software_version}",
+        **DEFAULT_META,
+        **warc_meta}
+    return _serialize_dict(actual_meta).encode("utf8")
+
+# how many records write_blocks() serializes before writing them
+WRITE_BATCH_SIZE = 1024
+# streamed bodies are kept until their digests are known, on disk above that size
+SPILL_MAX_MEMORY = 1 << 20
+
 class PreviousBlockNotTerminatedError(Exception):
     pass
 
@@ -41,35 +70,93 @@ class WarcWriter(object):
         self, file:[str|BytesIO],
         truncate=False, warc_meta={},
         software_name="unknown", software_version="unkown",
-        compress:[bool|None]=None, uncompress_pos:int=0
+        compress:[bool|str|None]=None, uncompress_pos:int=0,
+        index:[str|CdxjWriter|None]=None, compress_workers:[int|None]=None,
+        compresslevel:[int|None]=None, zstd_dict:[bytes|None]=None,
+        digest_algorithm:[str|None]=None, recover:bool=False
     ):
+        self.is_fp_self_managed = self.is_index_self_managed = False # for __del__() if we raise
+        if compress not in (None, False, True, "gzip", "zstd"):
+            raise ValueError(f"unknown compression: {compress!r}")
+
+        # if set, the end of the last complete record is saved there on flush() and close()
+        self.checkpoint_path = None
         if isinstance(file, str):
-            self.is_fp_self_managed = True
-            self.fp = open(file, "ab" if truncate == False else "wb")
             if compress is None and file.endswith(".gz"):
                 compress = True # if compression is not provided and it ends with .gz, then enable it
+            elif compress is None and file.endswith(".zst"):
+                compress = "zstd"
+            if recover:
+                self.checkpoint_path = file + CHECKPOINT_SUFFIX
+                if truncate == False:
+                    # drops the record interrupted by a crash (if any) and finds where we are
+                    recovered_pos, _ = recover_warc(file, compress)
+                    if compress:
+                        uncompress_pos = recovered_pos # otherwise the file's position is already right
+            self.is_fp_self_managed = True
+            self.fp = open(file, "ab" if truncate == False else "wb")
         else:
+            if recover:
+                raise ValueError("recover needs a path")
             self.is_fp_self_managed = False
             self.fp = file
 
-        if compress:
-            self.fp = MakeFakeTellable(SeekableGZipWriter(self.fp))
+        if compress == "zstd":
+            if compress_workers:
+                raise ValueError("compress_workers is only supported with gzip")
+            self.fp = MakeFakeTellable(SeekableZstdWriter(self.fp,
+                compresslevel=DEFAULT_ZSTD_LEVEL if compresslevel is None else compresslevel,
+                dictionary=zstd_dict))
+        elif compress and compress_workers:
+            # compressed_pos are returned as futures (concurrent.futures.Future)
+            self.fp = MakeFakeTellable(ThreadedGZipWriter(self.fp, workers=compress_workers,
+                compresslevel=9 if compresslevel is None else compresslevel))
+        elif compress:
+            self.fp = MakeFakeTellable(SeekableGZipWriter(self.fp, 9 if compresslevel is None else compresslevel))
         else:
             self.fp = MakeFakeTellable(FakeSeekableWriter(self.fp))
 
+        # CDXJ entries are appended as records get terminated
+        self.is_index_self_managed = False
+        if isinstance(index, CdxjWriter) or index is None:
+            self.index = index
+        else:
+            self.is_index_self_managed = True
+            self.index = CdxjWriter(index,
+                filename=file.rsplit("/", 1)[-1] if isinstance(file, str) else None,
+                truncate=truncate)
+
         self.uncompress_pos = uncompress_pos
         self.warc_info_id = uuid4().urn
+        self.current_block = None
+        # if set (e.g. "sha1"), WARC-Block-Digest/WARC-Payload-Digest are added to records not having them
+        self.digest_algorithm = digest_algorithm
+        # body of the current block while its digests are computed (see start_block())
+        self.spill = None
         # how many bytes we are waiting to complete the current block
         self.body_remaining_length = 0
+        # (uncompressed_pos, compressed_pos) of the end of the last terminated block
+        self.last_end = None
         
-        actual_meta = {
-            "software": f"{software_name}/{software_version}",
-            **DEFAULT_META,
-            **warc_meta}
-        encoded_meta = _serialize_dict(actual_meta).encode("utf8")
+        encoded_meta = _serialize_warcinfo(software_name, software_version, warc_meta)
         self.write_block("warcinfo", encoded_meta, record_id=self.warc_info_id, record_headers={"Content-Type": "application/warc-fields"})
 
+    def _needs_digests(self, record_headers:dict) -> bool:
+        return self.digest_algorithm is not None and "WARC-Block-Digest" not in record_headers
+
+    def _new_digester(self, record_type:str, record_headers:dict) -> RecordDigester:
+        return RecordDigester(self.digest_algorithm, has_http_payload(record_type, record_headers.get("Content-Type")))
+
+    def _with_digests(self, record_type:str, content:bytes, record_headers:dict) -> dict:
+        if not self._needs_digests(record_headers):
+            return record_headers
+        digester = self._new_digester(record_type, record_headers)
+        digester.update(content)
+        return {**record_headers, **digester.digest_headers()}
+
     def write_block(self, record_type: str, content: bytes, **kwargs):
+        # digests are computed before the header is written, so the body doesn't have to be kept
+        kwargs["record_headers"] = self._with_digests(record_type, content, kwargs.get("record_headers", {}))
         ret = self.start_block(record_type, len(content), **kwargs)
         self.write_block_body(content)
         return ret
@@ -81,45 +168,156 @@ class WarcWriter(object):
         uncompress_pos = self.fp.tell()
         compress_pos = self.fp.start_part()
 
-        self.fp.write(b"WARC/1.1\r\n")
-        
         if record_id is None:
             record_id = uuid4().urn
         if record_date is None:
             record_date = datetime.utcnow()
         
-        self.fp.write((_serialize_dict({
-            "WARC-Type":      record_type,
-            "WARC-Record-ID": "<"+record_id+">",
-            "WARC-Warcinfo-ID": "<"+self.warc_info_id+">",
-            "WARC-Date":      record_date.isoformat(timespec='seconds')+"Z",
-            **record_headers,
-            "Content-Length": content_length})+"\r\n").encode("utf8"))
+        if self._needs_digests(record_headers):
+            # the header is written once the body (kept in self.spill) has been digested
+            self.spill = (SpooledTemporaryFile(SPILL_MAX_MEMORY), self._new_digester(record_type, record_headers), content_length, record_id)
+        else:
+            self.fp.write(_serialize_block_header(record_type, content_length, record_id, record_date, self.warc_info_id, record_headers))
         
         self.body_remaining_length = content_length
+        self.current_block = (record_type, record_date, record_headers, compress_pos)
         if content_length == 0:
-            self.fp.write(b"\r\n\r\n")
-            self.fp.end_part()
+            self._end_block()
 
         return (uncompress_pos+self.uncompress_pos, compress_pos)
 
+    def write_blocks(self, records) -> (array, array):
+        """
+        Writes many records at once, each one is a (record_type, content) or
+        (record_type, content, kwargs) tuple, kwargs being write_block()'s optional arguments.
+        Records are serialized (and compressed) by batches written with a single call,
+        records without record_date get the batch's date.
+        Returns the uncompressed_pos and compressed_pos of every record as two arrays.
+        """
+        if self.body_remaining_length != 0:
+            raise PreviousBlockNotTerminatedError(f"previous blocks not terminated: {self.body_remaining_length} bytes missing")
+
+        uncompress_offsets = array("Q")
+        compress_offsets = array("Q")
+
+        if isinstance(self.fp, ThreadedGZipWriter):
+            # compressed by worker threads, the offsets are futures
+            futures = []
+            for record in records:
+                futures.append(self.write_block(record[0], record[1], **(record[2] if len(record) > 2 else {})))
+            self.fp.flush()
+            for uncompress_pos, compress_pos in futures:
+                uncompress_offsets.append(uncompress_pos)
+                compress_offsets.append(compress_pos.result())
+            return (uncompress_offsets, compress_offsets)
+
+        batch = []
+        for record in records:
+            batch.append(record)
+            if len(batch) == WRITE_BATCH_SIZE:
+                self._write_batch(batch, uncompress_offsets, compress_offsets)
+                batch = []
+        if batch:
+            self._write_batch(batch, uncompress_offsets, compress_offsets)
+        return (uncompress_offsets, compress_offsets)
+
+    def _write_batch(self, batch:list, uncompress_offsets:array, compress_offsets:array):
+        record_date = datetime.utcnow()
+        # one urandom() call for the whole batch's uuid4s
+        random = os.urandom(16*len(batch)).hex()
+        parts = []
+        metadata = []
+        for i, record in enumerate(batch):
+            record_type, content = record[0], record[1]
+            kwargs = record[2] if len(record) > 2 else {}
+            record_id = kwargs.get("record_id")
+            if record_id is None:
+                h = random[i*32:i*32+32]
+                record_id = f"urn:uuid:{h[:8]}-{h[8:12]}-4{h[13:16]}-{'89ab'[int(h[16], 16) & 3]}{h[17:20]}-{h[20:]}"
+            record_headers = self._with_digests(record_type, content, kwargs.get("record_headers", {}))
+            date = kwargs.get("record_date") or record_date
+
+            parts.append(_serialize_block_header(record_type, len(content), record_id, date, self.warc_info_id, record_headers) + content + b"\r\n\r\n")
+            metadata.append((record_type, date, record_headers))
+
+        uncompress_pos = self.fp.tell() + self.uncompress_pos
+        offsets = WriteParts(self.fp, parts)
+        for i, part in enumerate(parts):
+            uncompress_offsets.append(uncompress_pos)
+            compress_offsets.append(offsets[i])
+            uncompress_pos += len(part)
+            self._write_index_entry(*metadata[i], offsets[i], offsets[i+1])
+        self.last_end = (uncompress_pos, offsets[-1])
+
     def write_block_body(self, content:bytes):
         if len(content) == 0:
             return
         if self.body_remaining_length < len(content):
             raise CurrentBlockOverflowError(f"current block overflows by {len(content)-self.body_remaining_length} bytes")
-        self.fp.write(content)
+        if self.spill is not None:
+            self.spill[0].write(content)
+            self.spill[1].update(content)
+        else:
+            self.fp.write(content)
         self.body_remaining_length -= len(content)
         if self.body_remaining_length == 0:
-            self.fp.write(b"\r\n\r\n")
-            self.fp.end_part()
+            self._end_block()
+
+    def _end_block(self):
+        record_type, record_date, record_headers, compress_pos = self.current_block
+        self.current_block = None
+
+        if self.spill is not None:
+            body, digester, content_length, record_id = self.spill
+            self.spill = None
+            record_headers = {**record_headers, **digester.digest_headers()}
+            self.fp.write(_serialize_block_header(record_type, content_length, record_id, record_date, self.warc_info_id, record_headers))
+            body.seek(0)
+            shutil.copyfileobj(body, self.fp)
+            body.close()
+
+        self.fp.write(b"\r\n\r\n")
+        end_pos = self.fp.end_part()
+        self.last_end = (self.fp.tell() + self.uncompress_pos, end_pos)
+
+        self._write_index_entry(record_type, record_date, record_headers, compress_pos, end_pos)
+
+    def _write_index_entry(self, record_type, record_date, record_headers, start_pos, end_pos):
+        if self.index is not None and "WARC-Target-URI" in record_headers:
+            def write_entry(start, end):
+                self.index.write_entry(
+                    record_headers["WARC-Target-URI"], record_date, record_type,
+                    record_headers.get("WARC-Payload-Digest", record_headers.get("WARC-Block-Digest")),
+                    start, end - start)
+
+            if isinstance(end_pos, Future):
+                # entries are written by the sink thread, in order
+                end_pos.add_done_callback(lambda end_pos: write_entry(start_pos.result(), end_pos.result()))
+            else:
+                write_entry(start_pos, end_pos)
+
+    def _write_checkpoint(self):
+        uncompress_pos, compress_pos = self.last_end
+        if isinstance(compress_pos, Future):
+            compress_pos = compress_pos.result()
+        write_checkpoint(self.checkpoint_path, uncompress_pos, compress_pos)
 
     def flush(self):
         self.fp.flush()
+        if self.index is not None:
+            self.index.flush()
+        if self.checkpoint_path is not None:
+            self._write_checkpoint()
 
     def close(self):
         self.fp.close()
+        if self.is_index_self_managed:
+            self.index.close()
+        if self.checkpoint_path is not None:
+            self._write_checkpoint()
 
     def __del__(self):
         if self.is_fp_self_managed:
             self.fp.close()
+        if self.is_index_self_managed:
+            self.index.close()
@@ -6,6 +6,9 @@ setup(
     version=PY_WARC_VERSION,
     packages=["pywarc"],
     install_requires=[],
+    entry_points={
+        "console_scripts": ["pywarc=pywarc.tools:main"],
+    },
     author="5IGI0",
     author_email="5IGI0@protonmail.com",
     description="WARC file format library",
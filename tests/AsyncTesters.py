@@ -0,0 +1,134 @@
+# Copyright (C) 2025 5IGI0 / Ethan L. C. Lorenzetti
+#
+# This file is part of PyWarc.
+# 
+# PyWarc is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License,
+# or (at your option) any later version.
+#
+# PyWarc is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+# without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License along with PyWarc.
+# If not, see <https://www.gnu.org/licenses/>. 
+
+
+import unittest
+import asyncio
+import os
+
+from io import BytesIO
+from random import randint
+from pywarc import WarcReader, AsyncWarcReader, AsyncWarcWriter, NotSeekableError, CurrentBlockOverflowError
+
+class _FakeStreamWriter(object):
+    def __init__(self):
+        self.fp = BytesIO()
+        self.closed = False
+
+    def write(self, data):
+        self.fp.write(data)
+
+    async def drain(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+def _stream_reader(data):
+    stream = asyncio.StreamReader()
+    stream.feed_data(data)
+    stream.feed_eof()
+    return stream
+
+def AsyncTester(name, compress):
+    class AsyncTester(unittest.TestCase):
+        @classmethod
+        def setUpClass(cls):
+            cls.contents = [os.urandom(randint(0, 100000)) for _ in range(10)] + [b""]
+
+            async def write():
+                stream = _FakeStreamWriter()
+                writer = AsyncWarcWriter(stream, compress=compress, warc_meta={"a": "b"})
+                offsets = []
+                for i, content in enumerate(cls.contents):
+                    if i % 2:
+                        offsets.append(await writer.write_block("resource", content))
+                    else:
+                        offsets.append(await writer.start_block("resource", len(content)))
+                        await writer.write_block_body(content[:100])
+                        await writer.write_block_body(content[100:])
+                await writer.close()
+                assert stream.closed
+                return stream.fp.getvalue(), offsets
+
+            cls.data, cls.offsets = asyncio.run(write())
+
+        def test_sync_read(self):
+            reader = WarcReader(BytesIO(self.data), compressed=compress)
+            self.assertEqual(reader.get_next_block().type, "warcinfo")
+            for content, offsets in zip(self.contents, self.offsets):
+                block = reader.read_record_at(offsets[1 if compress else 0])
+                self.assertEqual(block.read(), content)
+
+        def test_async_read(self):
+            async def read():
+                reader = AsyncWarcReader(_stream_reader(self.data), compressed=compress)
+                warcinfo = await reader.get_next_block()
+                self.assertEqual(warcinfo.type, "warcinfo")
+
+                i = 0
+                async for block in reader:
+                    self.assertEqual(block.warcinfo_id, warcinfo.record_id)
+                    if i % 3 == 0:
+                        pass # skipped
+                    elif i % 3 == 1:
+                        self.assertEqual(await block.read(), self.contents[i])
+                    else:
+                        self.assertEqual(await block.read(10), self.contents[i][:10])
+                        self.assertEqual(await block.read(), self.contents[i][10:])
+                    i += 1
+                self.assertEqual(i, len(self.contents))
+
+                with self.assertRaises(NotSeekableError):
+                    await warcinfo.read()
+            asyncio.run(read())
+
+        def test_overflow(self):
+            async def write():
+                writer = AsyncWarcWriter(_FakeStreamWriter(), compress=compress)
+                await writer.start_block("resource", 2)
+                with self.assertRaises(CurrentBlockOverflowError):
+                    await writer.write_block_body(b"123")
+            asyncio.run(write())
+
+        def test_concurrent_writes(self):
+            contents = [os.urandom(randint(20000, 100000)) for _ in range(8)]
+            async def write():
+                stream = _FakeStreamWriter()
+                writer = AsyncWarcWriter(stream, compress=compress)
+                async def write_parts(content):
+                    await writer.start_block("resource", len(content))
+                    for i in range(0, len(content), 30000):
+                        await writer.write_block_body(content[i:i+30000])
+                offsets = await asyncio.gather(
+                    *(writer.write_block("resource", content) for content in contents[:4]),
+                    *(write_parts(content) for content in contents[4:]))
+                await writer.close()
+                return stream.fp.getvalue(), offsets[:4]
+
+            data, offsets = asyncio.run(write())
+            reader = WarcReader(BytesIO(data), compressed=compress)
+            self.assertEqual(reader.get_next_block().type, "warcinfo")
+            self.assertEqual(sorted(block.read() for block in reader), sorted(contents))
+            for content, offset in zip(contents, offsets):
+                self.assertEqual(reader.read_record_at(offset[1 if compress else 0]).read(), content)
+
+    AsyncTester.__name__ = name
+    AsyncTester.__qualname__ = name
+    return AsyncTester
+
+GzipAsyncTester = AsyncTester("GzipAsyncTester", True)
+AsyncTester = AsyncTester("AsyncTester", False)
@@ -0,0 +1,120 @@
+# Copyright (C) 2025 5IGI0 / Ethan L. C. Lorenzetti
+#
+# This file is part of PyWarc.
+# 
+# PyWarc is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License,
+# or (at your option) any later version.
+#
+# PyWarc is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+# without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License along with PyWarc.
+# If not, see <https://www.gnu.org/licenses/>. 
+
+
+import unittest
+import tempfile
+import shutil
+import os
+
+from datetime import datetime
+from io import BytesIO
+from pywarc import WarcReader, WarcWriter, index_warc, sort_cdxj, CdxjIndex, surt
+
+class SurtTester(unittest.TestCase):
+    def test_surt(self):
+        self.assertEqual(surt("http://www.Example.com/Path?b=2&a=1"), "com,example)/path?a=1&b=2")
+        self.assertEqual(surt("https://sub.example.com"), "com,example,sub)/")
+        self.assertEqual(surt("http://example.com:8080/a#frag"), "com,example:8080)/a")
+        self.assertEqual(surt("https://example.com:443/"), "com,example)/")
+        self.assertEqual(surt("dns:example.com"), "dns:example.com")
+
+def CdxjTester(name, compressed):
+    class CdxjTester(unittest.TestCase):
+        @classmethod
+        def setUpClass(cls):
+            cls.temp_dir = tempfile.mkdtemp()
+            cls.warc_path = cls.temp_dir + "/test.warc" + (".gz" if compressed else "")
+            cls.cdxj_path = cls.temp_dir + "/test.cdxj"
+
+            writer = WarcWriter(cls.warc_path, truncate=True)
+            cls.records = []
+            for i in range(30):
+                uri = f"http://example.com/{i % 10}"
+                content = os.urandom(100 + i)
+                date = datetime(2020, 1, 1 + i)
+                writer.write_block("response", content, record_date=date,
+                    record_headers={"WARC-Target-URI": uri})
+                cls.records.append((uri, date, content))
+            writer.write_block("metadata", b"not indexed")
+            writer.close()
+
+            cls.nindexed = index_warc(cls.warc_path, cls.cdxj_path)
+
+        @classmethod
+        def tearDownClass(cls):
+            shutil.rmtree(cls.temp_dir)
+
+        def test_sorted(self):
+            self.assertEqual(self.nindexed, len(self.records))
+            with open(self.cdxj_path, "rb") as fp:
+                lines = fp.readlines()
+            self.assertEqual(len(lines), len(self.records))
+            self.assertEqual(lines, sorted(lines))
+
+        def test_lookup(self):
+            index = CdxjIndex(self.cdxj_path)
+            reader = WarcReader(self.warc_path)
+
+            for i in range(10):
+                uri = f"http://example.com/{i}"
+                expected = [r for r in self.records if r[0] == uri]
+                entries = list(index.lookup(uri))
+                self.assertEqual(len(entries), len(expected))
+
+                for entry, (_, date, content) in zip(entries, expected):
+                    self.assertEqual(entry.url, uri)
+                    self.assertEqual(entry.type, "response")
+                    self.assertEqual(entry.timestamp, date.strftime("%Y%m%d%H%M%S"))
+                    self.assertEqual(entry.filename, os.path.basename(self.warc_path))
+
+                    block = reader.read_record_at(entry.offset, entry.length)
+                    self.assertEqual(block.read(), content)
+
+            self.assertEqual(list(index.lookup("http://example.com/missing")), [])
+            self.assertEqual(len(list(index.lookup("http://example.com/", match_prefix=True))), len(self.records))
+            index.close()
+
+        def test_writer_index(self):
+            warc_path = self.temp_dir + "/inline.warc" + (".gz" if compressed else "")
+            cdxj_path = self.temp_dir + "/inline.cdxj"
+
+            writer = WarcWriter(warc_path, truncate=True, index=cdxj_path)
+            for i, (uri, date, content) in enumerate(self.records):
+                headers = {"WARC-Target-URI": uri}
+                if i % 2:
+                    writer.write_block("response", content, record_date=date, record_headers=headers)
+                else:
+                    writer.start_block("response", len(content), record_date=date, record_headers=headers)
+                    writer.write_block_body(content[:10])
+                    writer.write_block_body(content[10:])
+            writer.write_block("metadata", b"not indexed")
+            writer.close()
+
+            sorted_index = BytesIO()
+            with open(cdxj_path, "rb") as fp:
+                sort_cdxj(fp, sorted_index)
+
+            expected_index = BytesIO()
+            index_warc(warc_path, expected_index)
+            self.assertEqual(sorted_index.getvalue(), expected_index.getvalue())
+
+    CdxjTester.__name__ = name
+    CdxjTester.__qualname__ = name
+    return CdxjTester
+
+GzipCdxjTester = CdxjTester("GzipCdxjTester", True)
+CdxjTester = CdxjTester("CdxjTester", False)
@@ -0,0 +1,114 @@
+# Copyright (C) 2025 5IGI0 / Ethan L. C. Lorenzetti
+#
+# This file is part of PyWarc.
+# 
+# PyWarc is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License,
+# or (at your option) any later version.
+#
+# PyWarc is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+# without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License along with PyWarc.
+# If not, see <https://www.gnu.org/licenses/>. 
+
+import unittest
+import tempfile
+import shutil
+import gzip
+import os
+
+from array import array
+from datetime import datetime, timezone
+from io import BytesIO
+from pywarc import WarcReader, WarcWriter, iter_column_batches, export_columns, read_columns
+from pywarc.columnar import NULL_DATE, OTHER_TYPE
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+HTTP_HEADERS = {"Content-Type": "application/http;msgtype=response"}
+
+def ColumnarTester(name, compressed):
+    class ColumnarTester(unittest.TestCase):
+        @classmethod
+        def setUpClass(cls):
+            cls.temp_dir = tempfile.mkdtemp()
+            cls.fp = BytesIO()
+            writer = WarcWriter(cls.fp, compress=compressed)
+            cls.date = datetime(2020, 1, 2, 3, 4, 5)
+            for i in range(25):
+                uri = f"http://example.com/{i}"
+                writer.write_block("request", b"GET / HTTP/1.1\r\n\r\n", record_date=cls.date,
+                    record_headers={"WARC-Target-URI": uri, "Content-Type": "application/http;msgtype=request"})
+                writer.write_block("response", b"HTTP/1.1 %d OK\r\nContent-Type: text/html; charset=utf-8\r\n\r\n<html>" % (200+i),
+                    record_date=cls.date, record_headers={"WARC-Target-URI": uri, **HTTP_HEADERS})
+            writer.write_block("metadata", b"a: b\r\n", record_date=cls.date, record_headers={"Content-Type": "application/warc-fields"})
+
+        @classmethod
+        def tearDownClass(cls):
+            shutil.rmtree(cls.temp_dir)
+
+        def test_batches(self):
+            batches = list(iter_column_batches(BytesIO(self.fp.getvalue()), compressed=compressed, batch_size=10))
+            self.assertEqual([len(batch["offset"]) for batch in batches], [10, 10, 10, 10, 10, 2])
+            columns = {name: sum((list(batch[name]) for batch in batches), []) for name in batches[0]}
+
+            self.assertEqual(columns["type"][:3], [0, 3, 1])
+            self.assertEqual(columns["type"][-1], 4)
+            self.assertEqual(columns["uri"][:3], [None, "http://example.com/0", "http://example.com/0"])
+            self.assertEqual(columns["status"][1:5], [-1, 200, -1, 201])
+            self.assertEqual(columns["mime"][1:3], [None, "text/html"])
+            self.assertEqual(columns["mime"][-1], "application/warc-fields")
+            self.assertEqual(set(columns["date"][1:]), {int(self.date.replace(tzinfo=timezone.utc).timestamp())})
+
+            # offsets and lengths are the ones of the underlying file
+            self.assertEqual(columns["offset"][0] + sum(columns["length"]), len(self.fp.getvalue()))
+            reader = WarcReader(BytesIO(self.fp.getvalue()), compressed=compressed)
+            for offset, length, content_length in zip(columns["offset"], columns["length"], columns["content_length"]):
+                self.assertEqual(reader.read_record_at(offset, length).content_length, content_length)
+
+        def test_missing_headers(self):
+            records = [
+                b"WARC/1.1\r\nContent-Length: 4\r\n\r\nAAAA\r\n\r\n",
+                b"WARC/1.1\r\nWARC-Type: response\r\nContent-Length: 0\r\n\r\n\r\n\r\n",
+                b"WARC/1.1\r\nWARC-Type: resource\r\nWARC-Date: yesterday\r\nContent-Length: 0\r\n\r\n\r\n\r\n"]
+            data = b"".join(gzip.compress(record) if compressed else record for record in records)
+            columns = next(iter_column_batches(BytesIO(data), compressed=compressed))
+            self.assertEqual(list(columns["type"]), [OTHER_TYPE, 1, 2])
+            self.assertEqual(list(columns["date"]), [NULL_DATE] * 3)
+
+        def test_export(self):
+            directory = os.path.join(self.temp_dir, "export")
+            self.assertEqual(export_columns(BytesIO(self.fp.getvalue()), directory, compressed=compressed, batch_size=7), 52)
+
+            status = array("h")
+            with open(os.path.join(directory, "status.bin"), "rb") as fp:
+                status.fromfile(fp, 52)
+            self.assertEqual(list(status[1:5]), [-1, 200, -1, 201])
+
+            offsets = array("q")
+            with open(os.path.join(directory, "uri.offsets"), "rb") as fp:
+                offsets.fromfile(fp, 53)
+            with open(os.path.join(directory, "uri.data"), "rb") as fp:
+                data = fp.read()
+            self.assertEqual(data[offsets[3]:offsets[4]], b"http://example.com/1")
+            self.assertEqual(offsets[-1], len(data))
+
+            if numpy is None:
+                return
+            columns = read_columns(directory)
+            self.assertEqual(int((columns["status"] >= 200).sum()), 25)
+            self.assertEqual(columns["uri"][3], "http://example.com/1")
+            self.assertEqual(list(read_columns(directory, ["type"])), ["type"])
+
+    ColumnarTester.__name__ = name
+    ColumnarTester.__qualname__ = name
+    return ColumnarTester
+
+GzipColumnarTester = ColumnarTester("GzipColumnarTester", True)
+ColumnarTester = ColumnarTester("ColumnarTester", False)
@@ -0,0 +1,124 @@
+# Copyright (C) 2025 5IGI0 / Ethan L. C. Lorenzetti
+#
+# This file is part of PyWarc.
+# 
+# PyWarc is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License,
+# or (at your option) any later version.
+#
+# PyWarc is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+# without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License along with PyWarc.
+# If not, see <https://www.gnu.org/licenses/>. 
+
+
+import unittest
+import os
+
+from io import BytesIO
+from pywarc import WarcReader, WarcWriter, InvalidWarcError
+from pywarc.compression import DECOMPRESSION_ERRORS
+from .utils import patch_BytesIo
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+GARBAGE = b"garbage" * 1000
+
+def CorruptionTester(name, compressed):
+    class CorruptionTester(unittest.TestCase):
+        @classmethod
+        def setUpClass(cls):
+            fp = BytesIO()
+            writer = WarcWriter(fp, compress=compressed)
+            cls.block_contents = [os.urandom(i * 1000) for i in range(10)]
+            positions = [writer.write_block("resource", b)[1] for b in cls.block_contents]
+
+            # the 4th record is damaged, garbage is inserted before the 8th one
+            data = bytearray(fp.getvalue())
+            data[positions[3]:positions[3]+4] = b"XXXX"
+            data[positions[7]:positions[7]] = GARBAGE
+            cls.data = bytes(data)
+            cls.expected_skipped = [(positions[3], positions[4]), (positions[7], positions[7] + len(GARBAGE))]
+            cls.expected_contents = cls.block_contents[:3] + cls.block_contents[4:]
+
+        def check(self, reader, blocks):
+            self.assertEqual([block.read() for block in blocks], self.expected_contents)
+            if compressed:
+                self.assertEqual(reader.skipped_members, self.expected_skipped)
+                self.assertEqual(reader.skipped, [])
+            else:
+                self.assertEqual(reader.skipped, self.expected_skipped)
+
+        def test_raises_by_default(self):
+            reader = WarcReader(BytesIO(self.data), compressed=compressed)
+            with self.assertRaises((InvalidWarcError,) + DECOMPRESSION_ERRORS):
+                list(reader)
+
+        def test_skip_corrupt(self):
+            reader = WarcReader(BytesIO(self.data), compressed=compressed, skip_corrupt=True)
+            self.assertEqual(reader.get_next_block().type, "warcinfo")
+            self.check(reader, list(reader))
+
+        def test_skip_corrupt_non_seekable(self):
+            reader = WarcReader(patch_BytesIo(False)(self.data), compressed=compressed, skip_corrupt=True)
+            reader.get_next_block()
+            contents = [block.read() for block in reader]
+            self.assertEqual(contents, self.expected_contents)
+
+        def test_iter_records(self):
+            reader = WarcReader(BytesIO(self.data), compressed=compressed, skip_corrupt=True)
+            self.check(reader, list(reader.iter_records(types={"resource"})))
+
+        def test_truncated(self):
+            reader = WarcReader(BytesIO(self.data[:-100]), compressed=compressed, skip_corrupt=True)
+            reader.get_next_block()
+            blocks = list(reader)
+            self.assertEqual([block.read() for block in blocks[:-1]], self.expected_contents[:-1])
+            if compressed:
+                self.assertEqual(reader.skipped_members[-1][1], len(self.data) - 100)
+
+    CorruptionTester.__name__ = name
+    CorruptionTester.__qualname__ = name
+    return CorruptionTester
+
+GzipCorruptionTester = CorruptionTester("GzipCorruptionTester", True)
+ZstdCorruptionTester = unittest.skipUnless(zstandard, "zstandard is not installed")(
+    CorruptionTester("ZstdCorruptionTester", "zstd"))
+CorruptionTester = CorruptionTester("CorruptionTester", False)
+
+class NegativeLengthTester(unittest.TestCase):
+    def corrupt(self, make_length):
+        fp = BytesIO()
+        writer = WarcWriter(fp)
+        positions = [writer.write_block("resource", b)[0] for b in (b"a" * 11, b"b" * 22, b"c" * 33)]
+        data = fp.getvalue()
+        header_len = data.index(b"\r\n\r\n", positions[1]) + 4 - positions[1] - len(b"22")
+        for digits in range(1, 6):
+            length = make_length(header_len + digits)
+            if len(b"%d" % length) == digits:
+                return data.replace(b"Content-Length: 22\r\n", b"Content-Length: %d\r\n" % length)
+        raise AssertionError("no length found")
+
+    def test_negative_length(self):
+        # pointing before the record, and exactly to its start (used to loop forever)
+        for make_length in (lambda header_len: -100, lambda header_len: -(header_len + 4)):
+            data = self.corrupt(make_length)
+            for read in (lambda reader: [b.read() for b in reader], lambda reader: [b.read() for b in reader.iter_records(types={"resource"})]):
+                reader = WarcReader(BytesIO(data))
+                reader.get_next_block()
+                self.assertRaises(InvalidWarcError, read, reader)
+
+                reader = WarcReader(BytesIO(data), skip_corrupt=True)
+                reader.get_next_block()
+                self.assertEqual(read(reader), [b"a" * 11, b"c" * 33])
+
+            # skipped without being parsed
+            reader = WarcReader(BytesIO(data))
+            self.assertRaises(InvalidWarcError, list, reader.iter_records(types={"metadata"}))
+
@@ -0,0 +1,127 @@
+# Copyright (C) 2025 5IGI0 / Ethan L. C. Lorenzetti
+#
+# This file is part of PyWarc.
+# 
+# PyWarc is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License,
+# or (at your option) any later version.
+#
+# PyWarc is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+# without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License along with PyWarc.
+# If not, see <https://www.gnu.org/licenses/>. 
+
+import unittest
+import tempfile
+import shutil
+import os
+
+from io import BytesIO
+from datetime import datetime
+from pywarc import WarcReader, WarcWriter, DedupWarcWriter, DedupStore, RecordDigester
+
+HTTP_HEADERS = {"Content-Type": "application/http;msgtype=response"}
+
+def _response(body):
+    return b"HTTP/1.1 200 OK\r\nContent-Length: %d\r\n\r\n" % len(body) + body
+
+class DedupTester(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.temp_dir = tempfile.mkdtemp()
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.temp_dir)
+
+    def write(self, writer, uri, body):
+        return writer.write_block("response", _response(body),
+            record_headers={"WARC-Target-URI": uri, **HTTP_HEADERS})
+
+    def test_revisits(self):
+        fp = BytesIO()
+        writer = DedupWarcWriter(WarcWriter(fp))
+        bodies = [os.urandom(1000) for _ in range(3)]
+        for i in range(3):
+            for j, body in enumerate(bodies):
+                self.write(writer, f"http://example.com/{j}?crawl={i}", body)
+        writer.write_block("response", _response(b""), record_headers={"WARC-Target-URI": "http://example.com/empty", **HTTP_HEADERS})
+        writer.write_block("resource", bodies[0], record_headers={"WARC-Target-URI": "http://example.com/resource"})
+        self.assertEqual(writer.revisits, 6)
+
+        fp.seek(0)
+        reader = WarcReader(fp)
+        reader.get_next_block()
+        originals = {}
+        for i in range(3):
+            for j, body in enumerate(bodies):
+                block = reader.get_next_block()
+                if i == 0:
+                    self.assertEqual(block.type, "response")
+                    self.assertEqual(block.read(), _response(body))
+                    originals[j] = block
+                    continue
+                self.assertEqual(block.type, "revisit")
+                self.assertEqual(block.headers["WARC-Target-URI"], [f"http://example.com/{j}?crawl={i}"])
+                self.assertEqual(block.headers["WARC-Refers-To-Target-URI"], [f"http://example.com/{j}?crawl=0"])
+                self.assertEqual(block.headers["WARC-Refers-To"], ["<"+originals[j].record_id+">"])
+                self.assertEqual(block.headers["WARC-Payload-Digest"], originals[j].headers["WARC-Payload-Digest"])
+                self.assertEqual(block.read(), _response(body)[:-len(body)])
+        self.assertEqual(reader.get_next_block().type, "response")
+        self.assertEqual(reader.get_next_block().type, "resource")
+
+    def test_revisit_block_digest(self):
+        fp = BytesIO()
+        writer = DedupWarcWriter(WarcWriter(fp))
+        body = os.urandom(1000)
+        content = _response(body)
+        digester = RecordDigester(http=True)
+        digester.update(content)
+        for i in range(2):
+            writer.write_block("response", content, record_headers={
+                "WARC-Target-URI": f"http://example.com/?crawl={i}", **HTTP_HEADERS, **digester.digest_headers()})
+        self.assertEqual(writer.revisits, 1)
+
+        fp.seek(0)
+        reader = WarcReader(fp, verify_digests=True)
+        reader.get_next_block()
+        self.assertEqual(reader.get_next_block().read(), content)
+        revisit = reader.get_next_block()
+        self.assertEqual(revisit.type, "revisit")
+        self.assertEqual(revisit.read(), content[:-len(body)])
+        self.assertNotEqual(revisit.headers["WARC-Block-Digest"], [digester.block_digest])
+
+    def test_store_tiers(self):
+        path = self.temp_dir+"/dedup.sqlite"
+        store = DedupStore(path, cache_size=2)
+        date = datetime(2020, 1, 2, 3, 4, 5)
+        for i in range(5):
+            store.put(f"sha1:{i}", f"http://example.com/{i}", date, f"urn:uuid:{i}")
+        self.assertEqual(len(store.cache), 2)
+        # evicted from memory, found on disk
+        self.assertEqual(store.get("sha1:0"), ("http://example.com/0", date, "urn:uuid:0"))
+        self.assertIsNone(store.get("sha1:5"))
+        store.close()
+
+        store = DedupStore(path)
+        self.assertEqual(len(store), 5)
+        self.assertEqual(store.get("sha1:4"), ("http://example.com/4", date, "urn:uuid:4"))
+        store.close()
+
+        store = DedupStore(cache_size=2)
+        for i in range(5):
+            store.put(f"sha1:{i}", f"http://example.com/{i}", date, f"urn:uuid:{i}")
+        self.assertIsNone(store.get("sha1:0"))
+        self.assertIsNotNone(store.get("sha1:4"))
+
+    def test_persistent_dedup(self):
+        path = self.temp_dir+"/persistent.sqlite"
+        body = os.urandom(1000)
+        for expected_revisits in (0, 1):
+            writer = DedupWarcWriter(WarcWriter(BytesIO()), path)
+            self.write(writer, "http://example.com/", body)
+            self.assertEqual(writer.revisits, expected_revisits)
+            writer.close()
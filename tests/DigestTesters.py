@@ -0,0 +1,122 @@
+# Copyright (C) 2025 5IGI0 / Ethan L. C. Lorenzetti
+#
+# This file is part of PyWarc.
+# 
+# PyWarc is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License,
+# or (at your option) any later version.
+#
+# PyWarc is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+# without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License along with PyWarc.
+# If not, see <https://www.gnu.org/licenses/>. 
+
+import unittest
+import hashlib
+import os
+
+from base64 import b32encode
+from io import BytesIO
+from random import randint
+from pywarc import WarcReader, WarcWriter, DigestMismatchError, RecordDigester, parse_digest
+from .utils import patch_BytesIo
+
+HTTP_HEADERS = {"Content-Type": "application/http;msgtype=response"}
+
+def _sha1(data):
+    return "sha1:" + b32encode(hashlib.sha1(data).digest()).decode()
+
+class RecordDigesterTester(unittest.TestCase):
+    def test_split_header_end(self):
+        message = b"HTTP/1.1 200 OK\r\nServer: test\r\n\r\n" + os.urandom(1000)
+        for size in (1, 2, 3, 7, 100):
+            digester = RecordDigester("sha1", http=True)
+            for i in range(0, len(message), size):
+                digester.update(message[i:i+size])
+            self.assertEqual(digester.block_digest, _sha1(message))
+            self.assertEqual(digester.payload_digest, _sha1(message[message.index(b"\r\n\r\n")+4:]))
+
+    def test_parse_digest(self):
+        digest = hashlib.sha256(b"hello").digest()
+        self.assertEqual(parse_digest("sha256:" + b32encode(digest).decode()), ("sha256", digest))
+        self.assertEqual(parse_digest("SHA-256:" + digest.hex()), ("sha256", digest))
+        self.assertIsNone(parse_digest("sha1:not a digest"))
+        self.assertIsNone(parse_digest("unknown:AAAA"))
+
+def DigestTester(name, PatchedBytesIO, compress):
+    class DigestTester(unittest.TestCase):
+        @classmethod
+        def setUpClass(cls):
+            cls.contents = [
+                b"HTTP/1.1 200 OK\r\nContent-Length: 5\r\n\r\nhello",
+                b"",
+                os.urandom(randint(0, 100000)),
+                b"HTTP/1.1 200 OK\r\n\r\n" + os.urandom(randint(0, 100000))]
+
+            cls.fp = PatchedBytesIO(b"")
+            writer = WarcWriter(cls.fp, compress=compress, digest_algorithm="sha1")
+            for content in cls.contents:
+                writer.write_block("response", content, record_headers=HTTP_HEADERS)
+            # streamed, the header is written once the body is digested
+            for content in cls.contents:
+                writer.start_block("response", len(content), record_headers=HTTP_HEADERS)
+                for i in range(0, len(content), 1000):
+                    writer.write_block_body(content[i:i+1000])
+            writer.write_blocks(("response", content, {"record_headers": HTTP_HEADERS}) for content in cls.contents)
+            writer.write_block("resource", b"already digested", record_headers={"WARC-Block-Digest": "sha1:AAAA"})
+
+        def get_reader(self, data=None):
+            self.fp.force_seek(0)
+            return WarcReader(PatchedBytesIO(self.fp.read() if data is None else data), compressed=compress, verify_digests=True)
+
+        def test_written_digests(self):
+            reader = self.get_reader()
+            self.assertIsNotNone(reader.get_next_block().headers.get("WARC-Block-Digest"))
+            for i in range(3):
+                for content in self.contents:
+                    block = reader.get_next_block()
+                    self.assertEqual(block.headers["WARC-Block-Digest"], [_sha1(content)])
+                    if b"\r\n\r\n" in content:
+                        self.assertEqual(block.headers["WARC-Payload-Digest"], [_sha1(content[content.index(b"\r\n\r\n")+4:])])
+                    else:
+                        self.assertNotIn("WARC-Payload-Digest", block.headers)
+                    self.assertEqual(block.read(), content)
+                    self.assertTrue(block.verified)
+            self.assertEqual(reader.get_next_block().headers["WARC-Block-Digest"], ["sha1:AAAA"])
+
+        def test_stream_verification(self):
+            reader = self.get_reader()
+            reader.get_next_block()
+            for content in self.contents:
+                block = reader.get_next_block()
+                self.assertEqual(block.get_as_stream(1000).read(), content)
+                self.assertTrue(block.verified)
+
+        def test_mismatch(self):
+            if compress:
+                self.skipTest("tampering is done on the uncompressed file")
+            self.fp.force_seek(0)
+            data = self.fp.read()
+            offset = data.index(self.contents[2][:100])
+            data = data[:offset] + bytes([data[offset] ^ 1]) + data[offset+1:]
+
+            reader = self.get_reader(data)
+            blocks = iter(reader)
+            for _ in range(3):
+                next(blocks).read()
+            block = next(blocks)
+            block.read(10)
+            with self.assertRaises(DigestMismatchError):
+                block.read()
+            self.assertFalse(block.verified)
+
+    DigestTester.__name__ = name
+    DigestTester.__qualname__ = name
+    return DigestTester
+
+SeekableDigestTester = DigestTester("SeekableDigestTester", patch_BytesIo(True), False)
+NonSeekableDigestTester = DigestTester("NonSeekableDigestTester", patch_BytesIo(False), False)
+GzipDigestTester = DigestTester("GzipDigestTester", patch_BytesIo(True), True)
@@ -0,0 +1,59 @@
+# Copyright (C) 2025 5IGI0 / Ethan L. C. Lorenzetti
+#
+# This file is part of PyWarc.
+# 
+# PyWarc is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License,
+# or (at your option) any later version.
+#
+# PyWarc is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+# without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License along with PyWarc.
+# If not, see <https://www.gnu.org/licenses/>. 
+
+
+import unittest
+import tempfile
+import shutil
+import os
+
+from random import randint
+from pywarc import WarcReader, WarcWriter, ParallelWarcScanner
+
+def _get_record_id(block):
+    return block.record_id
+
+class ParallelScannerTester(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.temp_dir = tempfile.mkdtemp()
+        cls.path = cls.temp_dir + "/test.warc.gz"
+
+        writer = WarcWriter(cls.path, truncate=True)
+        for _ in range(200):
+            writer.write_block("resource", os.urandom(randint(0, 5000)))
+        writer.close()
+
+        cls.expected = [(block.record_id, block.read()) for block in WarcReader(cls.path)]
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.temp_dir)
+
+    def test_records(self):
+        for processes in (1, 3):
+            with self.subTest(processes=processes):
+                scanner = ParallelWarcScanner(self.path, processes=processes, range_size=10000)
+                self.assertEqual([(block.record_id, block.read()) for block in scanner], self.expected)
+
+    def test_inline_size(self):
+        # most bodies are read again from their offsets
+        scanner = ParallelWarcScanner(self.path, processes=2, range_size=10000, inline_size=3000)
+        self.assertEqual([(block.record_id, block.read()) for block in scanner], self.expected)
+
+    def test_map(self):
+        scanner = ParallelWarcScanner(self.path, map_func=_get_record_id, processes=2, range_size=7777)
+        self.assertEqual(list(scanner), [record_id for record_id, _ in self.expected])
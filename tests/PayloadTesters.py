@@ -0,0 +1,95 @@
+# Copyright (C) 2025 5IGI0 / Ethan L. C. Lorenzetti
+#
+# This file is part of PyWarc.
+# 
+# PyWarc is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License,
+# or (at your option) any later version.
+#
+# PyWarc is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+# without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License along with PyWarc.
+# If not, see <https://www.gnu.org/licenses/>. 
+
+
+import unittest
+import gzip
+import zlib
+import os
+
+from io import BytesIO
+from pywarc import WarcReader, WarcWriter, InvalidHttpPayloadError, UnsupportedEncodingError
+from .utils import patch_BytesIo
+
+def _chunk(data, size):
+    return b"".join(b"%x\r\n" % len(data[i:i+size]) + data[i:i+size] + b"\r\n" for i in range(0, len(data), size)) + b"0\r\nX-Trailer: 1\r\n\r\n"
+
+def _deflate(data, wbits):
+    compressor = zlib.compressobj(wbits=wbits)
+    return compressor.compress(data) + compressor.flush()
+
+def PayloadTester(name, PatchedBytesIO):
+    class PayloadTester(unittest.TestCase):
+        @classmethod
+        def setUpClass(cls):
+            cls.body = os.urandom(50000) + b"\r\n0\r\n" + os.urandom(1000)
+            cls.bodies = [
+                (b"", cls.body),
+                (b"Content-Encoding: gzip\r\n", gzip.compress(cls.body)),
+                (b"Content-Encoding: deflate\r\n", _deflate(cls.body, 15)),
+                (b"Content-Encoding: deflate\r\n", _deflate(cls.body, -15)),
+                (b"Transfer-Encoding: chunked\r\n", _chunk(cls.body, 777)),
+                (b"Transfer-Encoding: chunked\r\nContent-Encoding: gzip\r\n", _chunk(gzip.compress(cls.body), 1000)),
+            ]
+
+            cls.fp = PatchedBytesIO(b"")
+            writer = WarcWriter(cls.fp)
+            writer.write_block("request", b"GET /path?a=b HTTP/1.1\r\nHost: example.com\r\n\r\n")
+            for headers, body in cls.bodies:
+                writer.write_block("response", b"HTTP/1.1 200 OK\r\nContent-Type: text/html\r\n" + headers + b"\r\n" + body)
+            writer.write_block("response", b"HTTP/1.1 200 OK\r\nContent-Encoding: compress\r\n\r\nAAAA")
+            writer.write_block("response", b"<html></html>")
+
+        def get_blocks(self):
+            self.fp.force_seek(0)
+            reader = WarcReader(self.fp)
+            reader.get_next_block()
+            return reader
+
+        def test_request(self):
+            reader = self.get_blocks()
+            payload = reader.get_next_block().get_http_payload()
+            self.assertEqual(payload.method, "GET")
+            self.assertEqual(payload.target, "/path?a=b")
+            self.assertEqual(payload.version, "HTTP/1.1")
+            self.assertIsNone(payload.status)
+            self.assertEqual(payload.get_header("host"), "example.com")
+            self.assertEqual(payload.read(), b"")
+
+        def test_responses(self):
+            reader = self.get_blocks()
+            reader.get_next_block()
+            for headers, _ in self.bodies:
+                with self.subTest(headers=headers):
+                    payload = reader.get_next_block().get_http_payload()
+                    self.assertEqual(payload.status, 200)
+                    self.assertEqual(payload.reason, "OK")
+                    self.assertEqual(payload.content_type, "text/html")
+                    self.assertEqual(payload.get_body_stream().read(), self.body)
+
+            payload = reader.get_next_block().get_http_payload()
+            self.assertRaises(UnsupportedEncodingError, payload.get_body_stream)
+            self.assertEqual(payload.read(decode_content=False), b"AAAA")
+
+            payload = reader.get_next_block().get_http_payload()
+            self.assertRaises(InvalidHttpPayloadError, lambda: payload.status)
+
+    PayloadTester.__name__ = name
+    PayloadTester.__qualname__ = name
+    return PayloadTester
+
+SeekablePayloadTester = PayloadTester("SeekablePayloadTester", patch_BytesIo(True))
+NonSeekablePayloadTester = PayloadTester("NonSeekablePayloadTester", patch_BytesIo(False))
@@ -20,10 +20,17 @@ import shutil
 import os
 import gzip
 
+from random import randint
 from pywarc import WarcReader, WarcWriter, InvalidWarcError, MissingWarcHeaderError, WarcHeaderBadValueError, NotSeekableError
 from io import BytesIO
+from pywarc.compression import MAX_UNSEEKABLE_MEMBERS
 from .utils import patch_BytesIo
 
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
 def ReaderTester(name, compressor, compressed):
     class ReaderTester(unittest.TestCase):
         def test_invalid_header_http(self):
@@ -75,6 +82,47 @@ def ReaderTester(name, compressor, compressed):
             self.assertRaises(WarcHeaderBadValueError, lambda: block.date)
             self.assertRaises(WarcHeaderBadValueError, lambda: block.warcinfo_id)
 
+        def test_headers(self):
+            long_value = b"A" * 40000 # bigger than what is read at once
+            fp = BytesIO(compressor(
+            b"WARC/1.1\r\nContent-Length: 4\r\n"
+            b"WARC-Concurrent-To: <urn:test:1>\r\n"
+            b"WARC-Concurrent-To:<urn:test:2>\r\n"
+            b"Long: " + long_value + b"\r\n"
+            b"\r\nAAAA\r\n\r\n"
+            b"WARC/1.1\r\nContent-Length: 0\r\n\r\n\r\n\r\n"))
+
+            reader = WarcReader(fp, compressed=compressed)
+            block = reader.get_next_block()
+            self.assertEqual(block.headers["WARC-Concurrent-To"], ["<urn:test:1>", "<urn:test:2>"])
+            self.assertEqual(block.headers["Long"], [long_value.decode()])
+            self.assertEqual(block.headers.get_raw("Content-Length"), b"4")
+            self.assertEqual(set(block.headers.keys()), {"Content-Length", "WARC-Concurrent-To", "Long"})
+            self.assertNotIn("Missing", block.headers)
+            self.assertEqual(block.read(), b"AAAA")
+
+            block = reader.get_next_block()
+            self.assertEqual(block.content_length, 0)
+            self.assertIsNone(reader.get_next_block())
+
+        def test_typed_headers(self):
+            fp = BytesIO(compressor(
+            b"WARC/1.1\r\nWARC-Type: resource\r\nWARC-Date: 2000-01-02T03:04:05Z\r\n"
+            b"WARC-Record-ID: <urn:test:1>\r\nWARC-Concurrent-To: <urn:test:2>\r\nWARC-Concurrent-To: <urn:test:3>\r\n"
+            b"WARC-Concurrent-To: <urn:test:4>\r\nContent-Length: 0\r\n\r\n\r\n\r\n"))
+
+            block = WarcReader(fp, compressed=compressed).get_next_block()
+            self.assertFalse(hasattr(block, "__dict__"))
+            self.assertEqual(block.type, "resource")
+            self.assertEqual(block.record_id, "urn:test:1")
+            self.assertIsNone(block.warcinfo_id)
+            self.assertIsNone(block.content_type)
+            # parsed once then cached
+            self.assertIs(block.date, block.date)
+            self.assertEqual(block.date.year, 2000)
+            self.assertEqual(block.headers["WARC-Concurrent-To"], ["<urn:test:2>", "<urn:test:3>", "<urn:test:4>"])
+            self.assertEqual(block.headers.get_raw("WARC-Concurrent-To"), b"<urn:test:2>")
+
     ReaderTester.__name__ = name
     ReaderTester.__qualname__ = name
     return ReaderTester
@@ -89,8 +137,8 @@ def SeekableReaderTester(name, compressed):
             cls.fp = BytesIO(b"")
             writer = WarcWriter(cls.fp, compress=compressed)
             cls.block_contents = [os.urandom(300) for _ in range(3)]
-            for b in cls.block_contents:
-                writer.write_block("resource", b)
+            cls.offsets = [writer.write_block("resource", b) for b in cls.block_contents]
+            cls.offsets.append((cls.fp.tell(), cls.fp.tell()))
 
         def test_proper_seek(self):
             self.fp.seek(0)
@@ -107,6 +155,39 @@ def SeekableReaderTester(name, compressed):
             self.assertEqual(second_block.read(), self.block_contents[1])
             self.assertEqual(third_block.read(), self.block_contents[2][20:])
 
+        def test_stream(self):
+            self.fp.seek(0)
+            reader = WarcReader(self.fp, compressed=compressed)
+            reader.get_next_block()
+            blocks = list(reader)
+
+            stream = blocks[1].get_as_stream(buffer_size=64)
+            self.assertEqual(stream.read(10), self.block_contents[1][:10])
+            self.assertEqual(blocks[0].read(), self.block_contents[0]) # reading another block doesn't disturb it
+            self.assertEqual(stream.peek(1)[:1], self.block_contents[1][10:11])
+
+            buf = bytearray(100)
+            self.assertEqual(stream.readinto(buf), 100)
+            self.assertEqual(buf, self.block_contents[1][10:110])
+            self.assertEqual(b"".join(stream), self.block_contents[1][110:])
+            self.assertEqual(stream.read(), b"")
+
+            expected = BytesIO(self.block_contents[1])
+            expected.seek(5)
+            stream.seek(5)
+            self.assertEqual(stream.readline(), expected.readline())
+
+        def test_read_record_at(self):
+            self.fp.seek(0)
+            reader = WarcReader(self.fp, compressed=compressed)
+
+            i = 1 if compressed else 0
+            for content, start, end in zip(self.block_contents, self.offsets, self.offsets[1:]):
+                self.assertEqual(reader.read_record_at(start[i]).read(), content)
+                self.assertEqual(reader.read_record_at(start[i], end[i] - start[i]).read(), content)
+
+            self.assertRaises((InvalidWarcError, gzip.BadGzipFile), lambda: reader.read_record_at(self.offsets[0][i] + 1))
+
     SeekableReaderTester.__name__ = name
     SeekableReaderTester.__qualname__ = name
     return SeekableReaderTester
@@ -138,9 +219,171 @@ def NonSeekableReaderTester(name, compressed):
 
             self.assertEqual(second_block.read(), self.block_contents[1])
 
+        def test_iter_records(self):
+            fp = BytesIO()
+            writer = WarcWriter(fp, compress=compressed)
+            records = []
+            for i in range(30):
+                record_type = ("request", "response", "metadata")[i % 3]
+                uri = f"http://example.com/{i % 2}/{i}"
+                content = os.urandom(randint(0, 1000))
+                writer.write_block(record_type, content, record_headers={"WARC-Target-URI": uri})
+                records.append((record_type, uri, content))
+
+            def check(expected, **kwargs):
+                reader = WarcReader(patch_BytesIo(False)(fp.getvalue()), compressed=compressed)
+                self.assertEqual([(block.type, block.headers["WARC-Target-URI"][0], block.read()) for block in reader.iter_records(**kwargs)], expected)
+
+            check([r for r in records if r[0] == "response"], types={"response"})
+            check([r for r in records if r[0] != "metadata"], types={"request", "response"})
+            check([r for r in records if r[1].startswith("http://example.com/1/")], url_prefix="http://example.com/1/")
+            check([r for r in records if r[0] == "response" and r[1].startswith("http://example.com/0/")],
+                types={"response"}, url_prefix="http://example.com/0/")
+            check([r for r in records if r[0] == "metadata"], filter=lambda raw: b"\r\nWARC-Type: metadata\r\n" in raw)
+            check([], types={"revisit"})
+
+        def test_skip_big_blocks(self):
+            fp = BytesIO()
+            writer = WarcWriter(fp, compress=compressed)
+            contents = [os.urandom(randint(0, 3_000_000)) for _ in range(5)]
+            for content in contents:
+                writer.write_block("resource", content)
+
+            class ShortReadPipe(patch_BytesIo(False)):
+                """ readinto() returns at most 1000 bytes per call """
+                def readinto(self, b):
+                    return super().readinto(memoryview(b)[:1000])
+
+            reader = WarcReader(ShortReadPipe(fp.getvalue()), compressed=compressed)
+            reader.get_next_block()
+            for i, content in enumerate(contents):
+                block = reader.get_next_block()
+                if i % 2: # others are skipped
+                    self.assertEqual(block.read(), content)
+            self.assertIsNone(reader.get_next_block())
+
     NonSeekableReaderTester.__name__ = name
     NonSeekableReaderTester.__qualname__ = name
     return NonSeekableReaderTester
 
 GzipNonSeekableReaderTester = NonSeekableReaderTester("GzipNonSeekableReaderTester", True)
-NonSeekableReaderTester = NonSeekableReaderTester("NonSeekableReaderTester", False)
\ No newline at end of file
+NonSeekableReaderTester = NonSeekableReaderTester("NonSeekableReaderTester", False)
+
+class GzipMemberReaderTester(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.fp = BytesIO(b"")
+        writer = WarcWriter(cls.fp, compress=True)
+        cls.block_contents = [os.urandom(randint(0, 3000)) for _ in range(20)]
+        cls.offsets = [writer.write_block("resource", b) for b in cls.block_contents]
+
+    def test_members_tracked(self):
+        self.fp.seek(0)
+        reader = WarcReader(self.fp, compressed=True)
+        for _ in reader:
+            pass
+
+        for uncompressed_pos, compressed_pos in self.offsets:
+            self.assertEqual(reader.fp.compressed_offset(uncompressed_pos), compressed_pos)
+
+    def test_backward_read(self):
+        self.fp.seek(0)
+        reader = WarcReader(self.fp, compressed=True)
+        reader.get_next_block()
+        blocks = list(reader)
+
+        for block, content in reversed(list(zip(blocks, self.block_contents))):
+            self.assertEqual(block.read(), content)
+
+
+    def test_non_seekable_members_bounded(self):
+        fp = BytesIO()
+        writer = WarcWriter(fp, compress=True)
+        _, compressed_offsets = writer.write_blocks(("resource", b"%d" % i) for i in range(3 * MAX_UNSEEKABLE_MEMBERS))
+
+        reader = WarcReader(patch_BytesIo(False)(fp.getvalue()), compressed=True)
+        first_pos = reader.get_next_block().block_pos
+        for block, compressed_pos in zip(reader, compressed_offsets):
+            # the current record's offset is still known
+            self.assertEqual(reader.get_compressed_offset(block.block_pos), compressed_pos)
+        self.assertLessEqual(len(reader.fp.member_upos), 2 * MAX_UNSEEKABLE_MEMBERS)
+        self.assertIsNone(reader.get_compressed_offset(first_pos)) # forgotten
+
+@unittest.skipUnless(zstandard, "zstandard is not installed")
+class ZstdMemberReaderTester(unittest.TestCase):
+    def test_non_seekable_offsets(self):
+        samples = [b"WARC-Type: resource %d\r\n" % i * 10 for i in range(1000)]
+        dictionary = zstandard.train_dictionary(2048, samples).as_bytes()
+        for zstd_dict in (None, dictionary):
+            fp = BytesIO()
+            writer = WarcWriter(fp, compress="zstd", zstd_dict=zstd_dict)
+            offsets = [writer.write_block("resource", content) for content in samples[:20]]
+
+            for seekable in (True, False):
+                reader = WarcReader(patch_BytesIo(seekable)(fp.getvalue()), compressed="zstd")
+                reader.get_next_block()
+                for block, (uncompressed_pos, compressed_pos) in zip(reader, offsets):
+                    self.assertEqual(block.block_pos, uncompressed_pos)
+                    self.assertEqual(reader.get_compressed_offset(block.block_pos), compressed_pos)
+
+class MmapReaderTester(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.temp_dir = tempfile.mkdtemp()
+        cls.path = cls.temp_dir + "/test.warc"
+        writer = WarcWriter(cls.path, truncate=True)
+        cls.block_contents = [os.urandom(randint(0, 3000)) for _ in range(20)]
+        for b in cls.block_contents:
+            writer.write_block("resource", b)
+        writer.close()
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.temp_dir)
+
+    def test_read(self):
+        reader = WarcReader(self.path, use_mmap=True)
+        reader.get_next_block()
+        blocks = list(reader)
+        self.assertEqual(len(blocks), len(self.block_contents))
+
+        for block, content in reversed(list(zip(blocks, self.block_contents))):
+            data = block.read()
+            self.assertIsInstance(data, memoryview)
+            self.assertEqual(data, content)
+
+        del reader
+        self.assertEqual(data, self.block_contents[0]) # still usable after the reader is gone
+
+    def test_stream(self):
+        reader = WarcReader(self.path, use_mmap=True)
+        reader.get_next_block()
+        for block, content in zip(reader, self.block_contents):
+            stream = block.get_as_stream()
+            data = stream.read(100)
+            self.assertIsInstance(data, memoryview) # no copy
+            self.assertEqual(data, content[:100])
+            self.assertEqual(stream.readline(), content[100:content.find(b"\n", 100)+1 or len(content)])
+            stream.seek(0)
+            self.assertEqual(b"".join(stream), content)
+            buf = bytearray(len(content))
+            stream.seek(0)
+            self.assertEqual(stream.readinto(buf), len(content))
+            self.assertEqual(buf, content)
+
+    def test_empty_file(self):
+        path = self.temp_dir + "/empty.warc"
+        open(path, "wb").close()
+        self.assertIsNone(WarcReader(path, use_mmap=True).get_next_block())
+
+    def test_compressed(self):
+        self.assertRaises(ValueError, lambda: WarcReader(self.path, compressed=True, use_mmap=True))
+
+    def test_not_a_file(self):
+        with open(self.path, "rb") as f:
+            data = f.read()
+        self.assertRaises(ValueError, lambda: WarcReader(BytesIO(data), use_mmap=True))
+        read_fd, write_fd = os.pipe()
+        with open(read_fd, "rb") as pipe:
+            os.close(write_fd)
+            self.assertRaises(ValueError, lambda: WarcReader(pipe, use_mmap=True))
@@ -0,0 +1,131 @@
+# Copyright (C) 2025 5IGI0 / Ethan L. C. Lorenzetti
+#
+# This file is part of PyWarc.
+# 
+# PyWarc is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License,
+# or (at your option) any later version.
+#
+# PyWarc is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+# without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License along with PyWarc.
+# If not, see <https://www.gnu.org/licenses/>. 
+
+
+import unittest
+import tempfile
+import shutil
+import os
+
+from pywarc import WarcReader, WarcWriter, InvalidWarcError, recover_warc
+from pywarc.recovery import read_checkpoint, write_checkpoint, CHECKPOINT_SUFFIX
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+def RecoveryTester(name, compressed, suffix):
+    class RecoveryTester(unittest.TestCase):
+        def setUp(self):
+            self.temp_dir = tempfile.mkdtemp()
+
+        def tearDown(self):
+            shutil.rmtree(self.temp_dir)
+
+        def crash(self, name):
+            """ writes records, then copies the file (and its checkpoint) while a record is being written """
+            path = os.path.join(self.temp_dir, "archive" + suffix)
+            writer = WarcWriter(path, compress=compressed, recover=True)
+            for i in range(10):
+                writer.write_block("resource", os.urandom(i * 1000))
+            writer.flush() # the checkpoint is written here
+            for i in range(5):
+                writer.write_block("resource", os.urandom(i * 1000))
+            interrupted = writer.start_block("resource", 100000)
+            writer.write_block_body(os.urandom(50000))
+            writer.fp.flush()
+
+            crashed = os.path.join(self.temp_dir, name + suffix)
+            shutil.copy(path, crashed)
+            shutil.copy(path + CHECKPOINT_SUFFIX, crashed + CHECKPOINT_SUFFIX)
+            writer.write_block_body(os.urandom(50000))
+            writer.close()
+            return crashed, interrupted
+
+        def test_recover(self):
+            crashed, interrupted = self.crash("crashed")
+            checkpoint = read_checkpoint(crashed + CHECKPOINT_SUFFIX)
+            self.assertLess(checkpoint[1], interrupted[1])
+
+            self.assertEqual(recover_warc(crashed, compressed), interrupted)
+            self.assertEqual(os.path.getsize(crashed), interrupted[1])
+            # nothing to remove anymore
+            self.assertEqual(recover_warc(crashed, compressed), interrupted)
+
+        def test_recover_without_checkpoint(self):
+            crashed, interrupted = self.crash("no_checkpoint")
+            os.remove(crashed + CHECKPOINT_SUFFIX)
+            self.assertEqual(recover_warc(crashed), interrupted)
+
+            # stale checkpoints are ignored
+            crashed, interrupted = self.crash("stale_checkpoint")
+            write_checkpoint(crashed + CHECKPOINT_SUFFIX, 10, 1 << 30)
+            self.assertEqual(recover_warc(crashed), interrupted)
+            write_checkpoint(crashed + CHECKPOINT_SUFFIX, 10, 10)
+            self.assertEqual(recover_warc(crashed), interrupted)
+
+        def write(self, name):
+            path = os.path.join(self.temp_dir, name + suffix)
+            writer = WarcWriter(path, compress=compressed, truncate=True)
+            positions = [writer.write_block("resource", os.urandom(i * 1000))[1] for i in range(10)]
+            writer.close()
+            return path, positions
+
+        def test_junk_tail(self):
+            for tail in (b"\0" * 4096, b"garbage"):
+                path, _ = self.write("junk")
+                size = os.path.getsize(path)
+                with open(path, "ab") as fp:
+                    fp.write(tail)
+                self.assertEqual(recover_warc(path)[1], size)
+                self.assertEqual(os.path.getsize(path), size)
+                self.assertEqual(len(list(WarcReader(path))), 11)
+
+        def test_corrupted_middle(self):
+            path, positions = self.write("middle")
+            size = os.path.getsize(path)
+            with open(path, "r+b") as fp:
+                fp.seek(positions[5])
+                fp.write(b"XXXX")
+            with self.assertRaises(InvalidWarcError):
+                recover_warc(path)
+            self.assertEqual(os.path.getsize(path), size)
+
+        def test_append_after_crash(self):
+            crashed, interrupted = self.crash("append")
+            writer = WarcWriter(crashed, recover=True)
+            positions = writer.write_block("resource", b"Hello, World!")
+            writer.close()
+            self.assertEqual(read_checkpoint(crashed + CHECKPOINT_SUFFIX)[1], os.path.getsize(crashed))
+
+            blocks = [(block.type, len(block.read()), block.block_pos) for block in WarcReader(crashed)]
+            self.assertEqual([block[:2] for block in blocks], [("warcinfo", blocks[0][1])] + [("resource", i * 1000) for i in range(10)]
+                + [("resource", i * 1000) for i in range(5)] + [("warcinfo", blocks[0][1]), ("resource", 13)])
+            # uncompressed positions are restored too
+            self.assertEqual(blocks[-1][2], positions[0])
+
+            block = WarcReader(crashed).read_record_at(positions[1] if compressed else positions[0])
+            self.assertEqual(block.read(), b"Hello, World!")
+
+    RecoveryTester.__name__ = name
+    RecoveryTester.__qualname__ = name
+    return RecoveryTester
+
+GzipRecoveryTester = RecoveryTester("GzipRecoveryTester", True, ".warc.gz")
+ZstdRecoveryTester = unittest.skipUnless(zstandard, "zstandard is not installed")(
+    RecoveryTester("ZstdRecoveryTester", "zstd", ".warc.zst"))
+RecoveryTester = RecoveryTester("RecoveryTester", False, ".warc")
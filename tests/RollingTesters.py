@@ -0,0 +1,116 @@
+# Copyright (C) 2025 5IGI0 / Ethan L. C. Lorenzetti
+#
+# This file is part of PyWarc.
+# 
+# PyWarc is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License,
+# or (at your option) any later version.
+#
+# PyWarc is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+# without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License along with PyWarc.
+# If not, see <https://www.gnu.org/licenses/>. 
+
+import unittest
+import tempfile
+import shutil
+import threading
+import os
+
+from pywarc import WarcReader, RollingWarcWriter
+
+class RollingWriterTester(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def read_all(self, paths):
+        records = []
+        for path in paths:
+            reader = WarcReader(path)
+            first = reader.get_next_block()
+            self.assertEqual(first.type, "warcinfo")
+            for block in reader:
+                self.assertEqual(block.warcinfo_id, first.record_id)
+                records.append(block.read())
+        return records
+
+    def test_size_rotation(self):
+        finished = []
+        threads = set()
+        def on_finished(path):
+            finished.append(path)
+            threads.add(threading.current_thread())
+
+        for compress in (False, True):
+            finished.clear()
+            writer = RollingWarcWriter(self.temp_dir, prefix=f"test{int(compress)}", max_size=50000,
+                compress=compress, on_finished=on_finished, software_name="tester")
+            contents = [os.urandom(10000) for _ in range(30)]
+            paths = []
+            for i, content in enumerate(contents):
+                if i % 2:
+                    writer.write_block("resource", content)
+                else:
+                    writer.start_block("resource", len(content))
+                    writer.write_block_body(content[:100])
+                    writer.write_block_body(content[100:])
+                if writer.current_path not in paths:
+                    paths.append(writer.current_path)
+            writer.close()
+
+            self.assertGreater(len(paths), 4)
+            self.assertEqual(finished, paths)
+            self.assertEqual(self.read_all(paths), contents)
+            self.assertNotIn(threading.current_thread(), threads)
+            for path in paths:
+                self.assertTrue(path.endswith(".warc.gz" if compress else ".warc"))
+                self.assertLess(os.path.getsize(path), 50000 + 20000)
+
+        self.assertFalse([f for f in os.listdir(self.temp_dir) if f.endswith(".open")])
+
+    def test_age_rotation(self):
+        writer = RollingWarcWriter(self.temp_dir, max_size=None, max_age=0)
+        for i in range(3):
+            writer.write_block("resource", b"%d" % i)
+        writer.close()
+        paths = sorted(os.path.join(self.temp_dir, f) for f in os.listdir(self.temp_dir))
+        self.assertEqual(len(paths), 3)
+        self.assertEqual(self.read_all(paths), [b"0", b"1", b"2"])
+
+    def test_restart(self):
+        crashed = RollingWarcWriter(self.temp_dir)
+        crashed.write_block("resource", b"crashed")
+        crashed.flush()
+        open_files = {f: os.path.getsize(os.path.join(self.temp_dir, f)) for f in os.listdir(self.temp_dir)}
+
+        # same directory and prefix, the files left by the crashed one are kept as they are
+        writer = RollingWarcWriter(self.temp_dir)
+        writer.write_block("resource", b"restarted")
+        writer.close()
+        for f, size in open_files.items():
+            self.assertEqual(os.path.getsize(os.path.join(self.temp_dir, f)), size)
+        self.assertEqual(self.read_all([writer.current_path]), [b"restarted"])
+        crashed.close()
+
+    def test_finish_error(self):
+        finished = []
+        def on_finished(path):
+            finished.append(path)
+            if len(finished) == 1:
+                raise OSError("upload failed")
+
+        writer = RollingWarcWriter(self.temp_dir, max_size=None, max_age=0, on_finished=on_finished)
+        paths = []
+        for i in range(5):
+            writer.write_block("resource", b"%d" % i)
+            paths.append(writer.current_path)
+        self.assertRaises(OSError, writer.close)
+        self.assertEqual(finished, paths)
+        self.assertEqual(self.read_all(paths), [b"%d" % i for i in range(5)])
+        self.assertFalse([f for f in os.listdir(self.temp_dir) if f.endswith(".open")])
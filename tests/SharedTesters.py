@@ -0,0 +1,87 @@
+# Copyright (C) 2025 5IGI0 / Ethan L. C. Lorenzetti
+#
+# This file is part of PyWarc.
+# 
+# PyWarc is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License,
+# or (at your option) any later version.
+#
+# PyWarc is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+# without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License along with PyWarc.
+# If not, see <https://www.gnu.org/licenses/>. 
+
+
+import unittest
+import threading
+import os
+
+from io import BytesIO
+from pywarc import WarcReader, WarcWriter, SharedWarcWriter
+from pywarc.writer import CurrentBlockOverflowError
+
+PRODUCERS = 8
+RECORDS_PER_PRODUCER = 50
+
+class SharedWriterTester(unittest.TestCase):
+    def test_concurrent_producers(self):
+        fp = BytesIO()
+        writer = SharedWarcWriter(WarcWriter(fp, compress=True, digest_algorithm="sha1"))
+        expected = {}
+        offsets = {}
+
+        def produce(producer):
+            for i in range(RECORDS_PER_PRODUCER):
+                uri = f"http://example.com/{producer}/{i}"
+                body = os.urandom(i * 100)
+                expected[uri] = body
+                if i % 2:
+                    offsets[uri] = writer.write_block("resource", body, record_headers={"WARC-Target-URI": uri})
+                    continue
+                # chunked, the length is only known once committed
+                record = writer.start_block("resource", record_headers={"WARC-Target-URI": uri})
+                for j in range(0, len(body), 333):
+                    record.write_block_body(body[j:j+333])
+                offsets[uri] = record.commit()
+
+        threads = [threading.Thread(target=produce, args=(i,)) for i in range(PRODUCERS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        writer.flush()
+
+        fp.seek(0)
+        reader = WarcReader(fp, compressed=True, verify_digests=True)
+        for uri, body in expected.items():
+            block = reader.read_record_at(offsets[uri].result()[1])
+            self.assertEqual(block.headers["WARC-Target-URI"], [uri])
+            self.assertEqual(block.read(), body)
+            self.assertTrue(block.verified)
+
+        fp.seek(0)
+        reader = WarcReader(fp, compressed=True)
+        self.assertEqual(reader.get_next_block().type, "warcinfo")
+        self.assertEqual(sum(1 for _ in reader), PRODUCERS * RECORDS_PER_PRODUCER)
+
+    def test_staged_length(self):
+        fp = BytesIO()
+        writer = SharedWarcWriter(WarcWriter(fp))
+        record = writer.start_block("resource", 10)
+        record.write_block_body(b"01234")
+        with self.assertRaises(CurrentBlockOverflowError):
+            record.write_block_body(b"567890")
+        with self.assertRaises(ValueError):
+            record.commit()
+        record.write_block_body(b"56789")
+        uncompressed_pos, _ = record.commit().result()
+        writer.flush()
+
+        fp.seek(uncompressed_pos)
+        self.assertEqual(WarcReader(fp).get_next_block().read(), b"0123456789")
+        writer.close()
+        with self.assertRaises(ValueError):
+            writer.write_block("resource", b"")
@@ -0,0 +1,108 @@
+# Copyright (C) 2025 5IGI0 / Ethan L. C. Lorenzetti
+#
+# This file is part of PyWarc.
+# 
+# PyWarc is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License,
+# or (at your option) any later version.
+#
+# PyWarc is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+# without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License along with PyWarc.
+# If not, see <https://www.gnu.org/licenses/>. 
+
+
+import unittest
+import tempfile
+import shutil
+import os
+
+from io import StringIO
+from contextlib import redirect_stdout
+
+from pywarc import WarcReader, WarcWriter, merge_warcs, split_warc, filter_warc
+from pywarc.tools import main
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+def ToolsTester(name, compressed, suffix):
+    class ToolsTester(unittest.TestCase):
+        @classmethod
+        def setUpClass(cls):
+            cls.temp_dir = tempfile.mkdtemp()
+            cls.paths = []
+            cls.block_contents = []
+            for i in range(2):
+                cls.paths.append(os.path.join(cls.temp_dir, f"input{i}{suffix}"))
+                writer = WarcWriter(cls.paths[-1], compress=compressed, truncate=True)
+                for j in range(10):
+                    content = os.urandom(j * 100)
+                    cls.block_contents.append(content)
+                    writer.write_block("resource" if j % 2 else "metadata", content,
+                        record_headers={"WARC-Target-URI": f"http://example.com/{i}/{j}"})
+                writer.close()
+
+        @classmethod
+        def tearDownClass(cls):
+            shutil.rmtree(cls.temp_dir)
+
+        def read(self, path):
+            return [(block.type, block.read()) for block in WarcReader(path, compressed=compressed)]
+
+        def test_merge(self):
+            output = os.path.join(self.temp_dir, "merged" + suffix)
+            size = merge_warcs(self.paths, output)
+            self.assertEqual(size, sum(os.path.getsize(path) for path in self.paths))
+            self.assertEqual(self.read(output), self.read(self.paths[0]) + self.read(self.paths[1]))
+
+        def test_split(self):
+            max_size = os.path.getsize(self.paths[0]) // 3
+            paths = split_warc(self.paths[0], os.path.join(self.temp_dir, "part"), max_size)
+            self.assertGreater(len(paths), 2)
+            self.assertEqual(paths[0], os.path.join(self.temp_dir, "part-00000" + suffix))
+
+            records = self.read(self.paths[0])
+            split_records = []
+            for path in paths:
+                part = self.read(path)
+                # every file starts with the warcinfo record
+                self.assertEqual(part[0], records[0])
+                self.assertLessEqual(os.path.getsize(path), max_size)
+                split_records += part[1:]
+            self.assertEqual(split_records, records[1:])
+
+        def test_filter(self):
+            output = os.path.join(self.temp_dir, "filtered" + suffix)
+            self.assertEqual(filter_warc(self.paths[1], output, types={"resource"}), 6)
+            records = self.read(output)
+            self.assertEqual([record[0] for record in records], ["warcinfo"] + ["resource"] * 5)
+            self.assertEqual([record[1] for record in records[1:]], self.block_contents[11:20:2])
+
+            self.assertEqual(filter_warc(self.paths[1], output, url_prefix="http://example.com/1/1", keep_warcinfo=False), 1)
+            self.assertEqual(self.read(output), [("resource", self.block_contents[11])])
+
+            self.assertEqual(filter_warc(self.paths[1], output, filter=lambda raw: b"/1/2\r\n" in raw or b"/1/3\r\n" in raw), 3)
+            self.assertEqual([record[1] for record in self.read(output)[1:]], self.block_contents[12:14])
+
+        def test_main(self):
+            output = os.path.join(self.temp_dir, "main" + suffix)
+            stdout = StringIO()
+            with redirect_stdout(stdout):
+                main(["filter", self.paths[0], output, "--type", "metadata", "--no-warcinfo"])
+            self.assertEqual(stdout.getvalue(), "5 records copied\n")
+            self.assertEqual(self.read(output), [("metadata", content) for content in self.block_contents[0:10:2]])
+
+    ToolsTester.__name__ = name
+    ToolsTester.__qualname__ = name
+    return ToolsTester
+
+GzipToolsTester = ToolsTester("GzipToolsTester", True, ".warc.gz")
+ZstdToolsTester = unittest.skipUnless(zstandard, "zstandard is not installed")(
+    ToolsTester("ZstdToolsTester", "zstd", ".warc.zst"))
+ToolsTester = ToolsTester("ToolsTester", False, ".warc")
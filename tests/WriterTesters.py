@@ -21,10 +21,16 @@ import re
 import os
 
 from datetime import datetime
-from pywarc import WarcReader, WarcWriter, CurrentBlockOverflowError, PreviousBlockNotTerminatedError
+from io import BytesIO
+from pywarc import WarcReader, WarcWriter, CdxjWriter, CdxjEntry, CurrentBlockOverflowError, PreviousBlockNotTerminatedError
 from random import choices, randint
 from .utils import patch_BytesIo
 
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
 MAX_CONTENT_LENGTH=5_000_000
 
 class WriterTester(unittest.TestCase):
@@ -65,6 +71,109 @@ class WriterTester(unittest.TestCase):
         for _ in reader:
             pass
 
+class ThreadedWriterTester(unittest.TestCase):
+    def test_threaded_compression(self):
+        for PatchedBytesIO in (patch_BytesIo(True), patch_BytesIo(False)):
+            underlying_fp = PatchedBytesIO(b"")
+            index = BytesIO()
+            writer = WarcWriter(underlying_fp, compress=True, compress_workers=4, index=CdxjWriter(index))
+
+            contents = [os.urandom(randint(0, 100000)) for _ in range(50)]
+            offsets = []
+            for i, content in enumerate(contents):
+                headers = {"WARC-Target-URI": f"http://example.com/{i}"}
+                if i % 2:
+                    offsets.append(writer.write_block("resource", content, record_headers=headers))
+                else:
+                    offsets.append(writer.start_block("resource", len(content), record_headers=headers))
+                    writer.write_block_body(content[:10])
+                    writer.write_block_body(content[10:])
+            writer.flush()
+
+            compressed_offsets = [compressed_pos.result() for _, compressed_pos in offsets]
+            self.assertEqual(compressed_offsets, sorted(compressed_offsets))
+
+            underlying_fp.force_seek(0)
+            reader = WarcReader(BytesIO(underlying_fp.read()), compressed=True)
+            for content, compressed_pos in zip(contents, compressed_offsets):
+                self.assertEqual(reader.read_record_at(compressed_pos).read(), content)
+
+            entries = [CdxjEntry(line) for line in index.getvalue().splitlines()]
+            self.assertEqual([entry.offset for entry in entries], compressed_offsets)
+
+    def test_threaded_write_blocks(self):
+        underlying_fp = BytesIO()
+        writer = WarcWriter(underlying_fp, compress=True, compress_workers=2)
+        contents = [os.urandom(randint(0, 1000)) for _ in range(100)]
+        _, compressed_offsets = writer.write_blocks(("resource", content) for content in contents)
+
+        reader = WarcReader(BytesIO(underlying_fp.getvalue()), compressed=True)
+        for content, compressed_pos in zip(contents, compressed_offsets):
+            self.assertEqual(reader.read_record_at(compressed_pos).read(), content)
+
+    def test_threaded_write_error(self):
+        class FailingBytesIO(BytesIO):
+            members = 0
+            def write(self, data):
+                # members can be written in several pieces, the 3rd one (b"x1") fails
+                if data.startswith(b"\x1f\x8b\x08"):
+                    self.members += 1
+                if self.members == 3:
+                    raise OSError("no space left on device")
+                return super().write(data)
+
+        underlying_fp = FailingBytesIO()
+        writer = WarcWriter(underlying_fp, compress=True, compress_workers=2)
+        offsets = [writer.write_block("resource", b"x%d" % i) for i in range(3)]
+        with self.assertRaises(OSError):
+            writer.flush()
+        # nothing is written after the failed record
+        for _, compressed_pos in offsets[1:]:
+            self.assertRaises(OSError, compressed_pos.result)
+        self.assertEqual(len(list(WarcReader(BytesIO(underlying_fp.getvalue()), compressed=True))), 2)
+        with self.assertRaises(OSError):
+            writer.close()
+
+class CompressionTester(unittest.TestCase):
+    def test_compresslevel(self):
+        content = b"Hello, World! " * 10000
+        sizes = []
+        for level in (1, 9):
+            fp = BytesIO()
+            writer = WarcWriter(fp, compress=True, compresslevel=level)
+            writer.write_block("resource", content)
+            writer.flush()
+            sizes.append(len(fp.getvalue()))
+            fp.seek(0)
+            blocks = list(WarcReader(fp, compressed=True))
+            self.assertEqual(blocks[-1].read(), content)
+        self.assertGreaterEqual(sizes[0], sizes[1])
+
+    def test_unknown_compression(self):
+        self.assertRaises(ValueError, lambda: WarcWriter(BytesIO(), compress="lzma"))
+
+    @unittest.skipUnless(zstandard, "zstandard is not installed")
+    def test_zstd_dictionary(self):
+        samples = [f"HTTP/1.1 200 OK\r\nServer: test\r\nX-Id: {i}\r\n\r\n".encode()*randint(1, 5) for i in range(1000)]
+        dictionary = zstandard.train_dictionary(4096, samples).as_bytes()
+
+        for PatchedBytesIO in (patch_BytesIo(True), patch_BytesIo(False)):
+            fp = PatchedBytesIO(b"")
+            writer = WarcWriter(fp, compress="zstd", zstd_dict=dictionary)
+            offsets = [writer.write_block("response", sample) for sample in samples[:50]]
+            writer.flush()
+
+            fp.force_seek(0)
+            data = fp.read()
+            reader = WarcReader(PatchedBytesIO(data), compressed="zstd")
+            self.assertEqual(next(reader).type, "warcinfo")
+            for sample, blk in zip(samples, reader):
+                self.assertEqual(blk.read(), sample)
+
+            reader = WarcReader(BytesIO(data), compressed="zstd")
+            for sample, (_, compressed_pos) in zip(samples, offsets):
+                self.assertEqual(reader.read_record_at(compressed_pos).read(), sample)
+
 def gen_tester(name, PatchedBytesIO, compress):
     class WriterTester(unittest.TestCase):
         @classmethod
@@ -182,6 +291,30 @@ def gen_tester(name, PatchedBytesIO, compress):
             underlying_fp.force_seek(0) # do not use it in your code to bypass the tests.
             self.check_content(underlying_fp)
         
+        def test_write_blocks(self):
+            underlying_fp = PatchedBytesIO(b"")
+            writer = WarcWriter(
+                underlying_fp,
+                software_name="unittester",
+                software_version="0.0.0",
+                warc_meta=self.warcinfo,
+                compress=self.compress)
+
+            uncompressed_offsets, compressed_offsets = writer.write_blocks(
+                ("resource", block["content"], {"record_headers": block["custom_headers"]}) for block in self.testset)
+            self.assertEqual(len(uncompressed_offsets), len(self.testset))
+            self.assertEqual(list(compressed_offsets), sorted(compressed_offsets))
+
+            underlying_fp.force_seek(0) # do not use it in your code to bypass the tests.
+            self.validate_warc(underlying_fp)
+            underlying_fp.force_seek(0) # do not use it in your code to bypass the tests.
+            self.check_content(underlying_fp)
+
+            underlying_fp.force_seek(0)
+            reader = WarcReader(BytesIO(underlying_fp.read()), compressed=self.compress)
+            for block, uncompressed_pos, compressed_pos in zip(self.testset, uncompressed_offsets, compressed_offsets):
+                self.assertEqual(reader.read_record_at(compressed_pos if self.compress else uncompressed_pos).read(), block["content"])
+
         def test_write_chunked_block(self):
             underlying_fp = PatchedBytesIO(b"")
             writer = WarcWriter(
@@ -232,4 +365,8 @@ def gen_tester(name, PatchedBytesIO, compress):
 SeekableWriterTester = gen_tester("SeekableWriteTester", patch_BytesIo(True), False)
 NotSeekableWriterTester = gen_tester("NonSeekableWriteTester", patch_BytesIo(False), False)
 CompressedSeekableWriteTester = gen_tester("CompressedSeekableWriteTester", patch_BytesIo(True), True)
-CompressedNonSeekableWriteTester = gen_tester("CompressedNonSeekableWriteTester", patch_BytesIo(False), True)
\ No newline at end of file
+CompressedNonSeekableWriteTester = gen_tester("CompressedNonSeekableWriteTester", patch_BytesIo(False), True)
+ZstdSeekableWriteTester = unittest.skipUnless(zstandard, "zstandard is not installed")(
+    gen_tester("ZstdSeekableWriteTester", patch_BytesIo(True), "zstd"))
+ZstdNonSeekableWriteTester = unittest.skipUnless(zstandard, "zstandard is not installed")(
+    gen_tester("ZstdNonSeekableWriteTester", patch_BytesIo(False), "zstd"))
\ No newline at end of file
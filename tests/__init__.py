@@ -14,5 +14,17 @@
 # You should have received a copy of the GNU Lesser General Public License along with PyWarc.
 # If not, see <https://www.gnu.org/licenses/>. 
 
-from .WriterTesters import SeekableWriterTester, NotSeekableWriterTester, WriterTester, CompressedSeekableWriteTester, CompressedNonSeekableWriteTester
-from .ReaderTesters import ReaderTester, SeekableReaderTester, NonSeekableReaderTester, GzipReaderTester, GzipSeekableReaderTester, GzipNonSeekableReaderTester
\ No newline at end of file
+from .WriterTesters import SeekableWriterTester, NotSeekableWriterTester, WriterTester, ThreadedWriterTester, CompressedSeekableWriteTester, CompressedNonSeekableWriteTester, CompressionTester, ZstdSeekableWriteTester, ZstdNonSeekableWriteTester
+from .ReaderTesters import ReaderTester, SeekableReaderTester, NonSeekableReaderTester, GzipReaderTester, GzipSeekableReaderTester, GzipNonSeekableReaderTester, GzipMemberReaderTester, ZstdMemberReaderTester, MmapReaderTester
+from .CdxTesters import SurtTester, CdxjTester, GzipCdxjTester
+from .ParallelTesters import ParallelScannerTester
+from .PayloadTesters import SeekablePayloadTester, NonSeekablePayloadTester
+from .AsyncTesters import AsyncTester, GzipAsyncTester
+from .DigestTesters import RecordDigesterTester, SeekableDigestTester, NonSeekableDigestTester, GzipDigestTester
+from .DedupTesters import DedupTester
+from .ColumnarTesters import ColumnarTester, GzipColumnarTester
+from .RollingTesters import RollingWriterTester
+from .SharedTesters import SharedWriterTester
+from .RecoveryTesters import RecoveryTester, GzipRecoveryTester, ZstdRecoveryTester
+from .CorruptionTesters import CorruptionTester, GzipCorruptionTester, ZstdCorruptionTester, NegativeLengthTester
+from .ToolsTesters import ToolsTester, GzipToolsTester, ZstdToolsTester
\ No newline at end of file